@@ -0,0 +1,28 @@
+"""Add board version
+
+Revision ID: 4d852728e9b6
+Revises: 3539dc4708a3
+Create Date: 2026-10-18 10:00:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d852728e9b6'
+down_revision: Union[str, None] = '3539dc4708a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('boards', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('boards', 'version')
@@ -0,0 +1,116 @@
+"""Fractional order keys for cards and sections
+
+Revision ID: e3f0b6d2c874
+Revises: a91c5e07d3b2
+Create Date: 2026-10-18 11:00:27.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f0b6d2c874'
+down_revision: Union[str, None] = 'a91c5e07d3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 5000
+
+# Замороженная копия генератора ключей из app.crud.ordering на момент миграции:
+# keys_between(None, None, n) — это "a0" и дальше инкремент целой части.
+# Приложение может сменить алфавит или алгоритм, а эта миграция должна
+# и дальше выдавать те же ключи.
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def _increment_integer(x: str) -> str:
+    head, digits = x[0], list(x[1:])
+    carry = True
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) + 1
+        if d == len(DIGITS):
+            digits[i] = DIGITS[0]
+        else:
+            digits[i] = DIGITS[d]
+            carry = False
+            break
+
+    if carry:
+        if head == "z":
+            raise ValueError("cannot increment any more")
+        head = chr(ord(head) + 1)
+        digits.append(DIGITS[0])
+    return head + "".join(digits)
+
+
+class _KeySequence:
+    """Ключ для порядкового номера внутри родителя: "a0", "a1", ..."""
+
+    def __init__(self):
+        self._keys = ["a0"]
+
+    def __getitem__(self, index: int) -> str:
+        while len(self._keys) <= index:
+            self._keys.append(_increment_integer(self._keys[-1]))
+        return self._keys[index]
+
+
+def _convert_to_keys(table: str, parent: str) -> None:
+    """Целые позиции -> дробные ключи в том же порядке внутри каждого родителя."""
+    conn = op.get_bind()
+    op.add_column(table, sa.Column('position_key', sa.String(length=255, collation='C'), nullable=True))
+    op.add_column(table, sa.Column('position_rank', sa.Integer(), nullable=True))
+
+    # порядковый номер внутри родителя считает Postgres одним UPDATE,
+    # а ключи пишутся пачками по id — в памяти не больше BATCH_SIZE строк
+    op.execute(
+        f'UPDATE {table} t SET position_rank = r.rn '
+        f'FROM (SELECT id, row_number() OVER (PARTITION BY {parent} ORDER BY position, id) - 1 AS rn '
+        f'FROM {table}) r WHERE t.id = r.id'
+    )
+
+    keys = _KeySequence()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(f'SELECT id, position_rank FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            sa.text(f'UPDATE {table} SET position_key = :key WHERE id = :id'),
+            [{'id': row_id, 'key': keys[rank]} for row_id, rank in rows],
+        )
+        last_id = rows[-1][0]
+
+    op.drop_column(table, 'position_rank')
+    op.drop_column(table, 'position')
+    op.alter_column(table, 'position_key', new_column_name='position', nullable=False)
+
+
+def _convert_to_integers(table: str, parent: str) -> None:
+    op.add_column(table, sa.Column('position_int', sa.Integer(), nullable=True))
+    op.execute(
+        f'UPDATE {table} t SET position_int = r.rn '
+        f'FROM (SELECT id, row_number() OVER (PARTITION BY {parent} ORDER BY position, id) - 1 AS rn '
+        f'FROM {table}) r WHERE t.id = r.id'
+    )
+    op.drop_column(table, 'position')
+    op.alter_column(table, 'position_int', new_column_name='position', nullable=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _convert_to_keys('sections', 'board_id')
+    _convert_to_keys('cards', 'section_id')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _convert_to_integers('cards', 'section_id')
+    _convert_to_integers('sections', 'board_id')
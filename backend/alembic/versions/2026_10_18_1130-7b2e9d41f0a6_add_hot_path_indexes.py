@@ -0,0 +1,40 @@
+"""Add hot path indexes
+
+Revision ID: 7b2e9d41f0a6
+Revises: e3f0b6d2c874
+Create Date: 2026-10-18 11:30:05.214877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e9d41f0a6'
+down_revision: Union[str, None] = 'e3f0b6d2c874'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_cards_section_id_position', 'cards', ['section_id', 'position']),
+    ('ix_sections_board_id_position', 'sections', ['board_id', 'position']),
+    ('ix_boards_customer_id_id', 'boards', ['customer_id', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,37 @@
+"""Denormalize board_id on cards
+
+Revision ID: 5c7a13e8b9d0
+Revises: 7b2e9d41f0a6
+Create Date: 2026-10-18 12:00:48.093316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7a13e8b9d0'
+down_revision: Union[str, None] = '7b2e9d41f0a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cards', sa.Column('board_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE cards SET board_id = sections.board_id '
+        'FROM sections WHERE sections.id = cards.section_id'
+    )
+    op.alter_column('cards', 'board_id', nullable=False)
+    op.create_foreign_key('cards_board_id_fkey', 'cards', 'boards', ['board_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_cards_board_id', 'cards', ['board_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cards_board_id', table_name='cards')
+    op.drop_constraint('cards_board_id_fkey', 'cards', type_='foreignkey')
+    op.drop_column('cards', 'board_id')
@@ -0,0 +1,28 @@
+"""Add board template flag
+
+Revision ID: c4e81f5a27d6
+Revises: 5c7a13e8b9d0
+Create Date: 2026-10-18 12:30:21.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81f5a27d6'
+down_revision: Union[str, None] = '5c7a13e8b9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('boards', sa.Column('is_template', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('boards', 'is_template')
@@ -0,0 +1,83 @@
+"""Soft delete for boards, sections and cards
+
+Revision ID: f19d0a6c3e58
+Revises: c4e81f5a27d6
+Create Date: 2026-10-18 13:00:37.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19d0a6c3e58'
+down_revision: Union[str, None] = 'c4e81f5a27d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['boards', 'sections', 'cards']
+
+# индексы горячих чтений становятся частичными — по живым строкам
+LIVE_INDEXES = [
+    ('ix_cards_section_id_position', 'cards', ['section_id', 'position']),
+    ('ix_sections_board_id_position', 'sections', ['board_id', 'position']),
+    ('ix_boards_customer_id_id', 'boards', ['customer_id', 'id']),
+]
+
+# полные индексы по внешним ключам: раньше их роль играли составные индексы выше,
+# а ON DELETE CASCADE и очистка ищут и удалённые строки
+FK_INDEXES = [
+    ('ix_sections_board_id', 'sections', ['board_id']),
+    ('ix_cards_section_id', 'cards', ['section_id']),
+]
+
+LIVE = sa.text('deleted_at IS NULL')
+DEAD = sa.text('deleted_at IS NOT NULL')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('deleted_at', sa.TIMESTAMP(), nullable=True))
+
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in FK_INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        # новый частичный индекс строится рядом со старым, чтобы чтения не остались без индекса
+        for name, table, columns in LIVE_INDEXES:
+            op.create_index(f'{name}_live', table, columns, unique=False, postgresql_where=LIVE,
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.execute(f'ALTER INDEX {name}_live RENAME TO {name}')
+
+        for table in TABLES:
+            op.create_index(f'ix_{table}_deleted_at', table, ['deleted_at'], unique=False, postgresql_where=DEAD,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_deleted_at', table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+
+        for name, table, columns in reversed(LIVE_INDEXES):
+            op.create_index(f'{name}_full', table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.execute(f'ALTER INDEX {name}_full RENAME TO {name}')
+
+        for name, table, _ in reversed(FK_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    # мягко удалённые строки после отката стали бы снова видны
+    for table in TABLES:
+        op.execute(f'DELETE FROM {table} WHERE deleted_at IS NOT NULL')
+        op.drop_column(table, 'deleted_at')
@@ -0,0 +1,50 @@
+"""Full-text search vector on cards
+
+Revision ID: 8a3f27c1d9e4
+Revises: f19d0a6c3e58
+Create Date: 2026-10-18 13:30:09.871542
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f27c1d9e4'
+down_revision: Union[str, None] = 'f19d0a6c3e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # STORED-колонка переписывает таблицу cards под эксклюзивной блокировкой —
+    # на большой базе запускать в окно обслуживания
+    op.add_column('cards', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR, persisted=True),
+    ))
+
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index('ix_cards_search_vector', 'cards', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_where=sa.text('deleted_at IS NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_cards_search_vector', table_name='cards',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('cards', 'search_vector')
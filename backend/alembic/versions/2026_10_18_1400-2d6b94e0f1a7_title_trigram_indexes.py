@@ -0,0 +1,43 @@
+"""Trigram indexes on board, section and card titles
+
+Revision ID: 2d6b94e0f1a7
+Revises: 8a3f27c1d9e4
+Create Date: 2026-10-18 14:00:44.129863
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d6b94e0f1a7'
+down_revision: Union[str, None] = '8a3f27c1d9e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['boards', 'sections', 'cards']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_title_trgm', table, ['title'], unique=False,
+                            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+                            postgresql_where=sa.text('deleted_at IS NULL'),
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_title_trgm', table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+    # расширение не удаляем: им могут пользоваться и другие объекты базы
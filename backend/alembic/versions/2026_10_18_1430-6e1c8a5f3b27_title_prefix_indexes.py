@@ -0,0 +1,44 @@
+"""Btree indexes for short title prefixes
+
+Revision ID: 6e1c8a5f3b27
+Revises: 2d6b94e0f1a7
+Create Date: 2026-10-18 14:30:12.584316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1c8a5f3b27'
+down_revision: Union[str, None] = '2d6b94e0f1a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# pg_trgm не помогает префиксам из 1-2 символов; для них lower(title) LIKE 'ab%'
+# внутри досок пользователя идёт по btree с text_pattern_ops
+INDEXES = [
+    ('ix_boards_customer_id_title_prefix', 'boards', 'customer_id'),
+    ('ix_sections_board_id_title_prefix', 'sections', 'board_id'),
+    ('ix_cards_board_id_title_prefix', 'cards', 'board_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} ({column}, lower(title) text_pattern_ops) WHERE deleted_at IS NULL'
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,49 @@
+"""Add id tiebreak to position indexes
+
+Revision ID: 9b4d2e7a1c53
+Revises: 6e1c8a5f3b27
+Create Date: 2026-10-18 15:00:41.207385
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4d2e7a1c53'
+down_revision: Union[str, None] = '6e1c8a5f3b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# снимок, выгрузка и раскладка сортируют по (position, id): без id в индексе
+# порядок не приходит из индекса, и в плане появляется Sort
+INDEXES = [
+    ('ix_cards_section_id_position', 'cards', 'section_id'),
+    ('ix_sections_board_id_position', 'sections', 'board_id'),
+]
+
+LIVE = sa.text('deleted_at IS NULL')
+
+
+def _rebuild(columns_of) -> None:
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        # новый индекс строится рядом со старым, чтобы чтения не остались без индекса
+        for name, table, parent in INDEXES:
+            op.create_index(f'{name}_next', table, columns_of(parent), unique=False, postgresql_where=LIVE,
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.execute(f'ALTER INDEX {name}_next RENAME TO {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild(lambda parent: [parent, 'position', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild(lambda parent: [parent, 'position'])
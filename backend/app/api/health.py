@@ -0,0 +1,23 @@
+from fastapi import APIRouter, status
+from fastapi.responses import ORJSONResponse
+
+from app.workers.warmup import warmup_state
+
+
+health_router = APIRouter()
+
+
+@health_router.get("/health/live")
+async def live():
+    return {"status": "ok"}
+
+
+@health_router.get("/health/ready")
+async def ready():
+    # балансировщик не шлёт трафик, пока пул и кэши не прогреты
+    if not warmup_state.ready:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming up", **warmup_state.stats()},
+        )
+    return {"status": "ready", **warmup_state.stats()}
@@ -0,0 +1,31 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core import settings
+
+
+metrics_router = APIRouter()
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def require_metrics_token(credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme)):
+    # метрики раскрывают маршруты, нагрузку и состояние пулов — без токена их не отдаём вовсе
+    token = settings.metrics.token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@metrics_router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    # без сессии БД: коллекторы читают состояние пулов и stats() из памяти
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
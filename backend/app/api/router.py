@@ -1,70 +1,157 @@
+from typing import Literal
+
 from fastapi import (
     Depends,
     APIRouter,
     status,
     HTTPException,
     Query,
-    Form
+    Form,
+    Request,
+    Response,
 )
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from fastapi import Body
+from fastapi.responses import StreamingResponse
 
 from app.core.db import db_helper
-from app.crud.auth import login_user, get_current_user
-from app.crud.board import get_boards_for_user, create_board, get_board, update_board, delete_board, \
-    get_board_with_sections
+from app.core.statement_budget import QueryCounter, statement_budget
+from app.crud.auth import login_user, get_current_user, rotate_refresh_token
+from app.crud.board import get_boards_for_user, create_board, update_board, delete_board, \
+    get_board_summaries_for_user, get_board_version, get_board_snapshot_cached, \
+    get_boards_fingerprint, clone_board
+from app.crud.batch import run_batch
+from app.crud.changes import get_changes_since
+from app.crud.export import get_board_header, stream_board_export
+from app.crud.importer import import_board, limit_size
+from app.crud.layout import apply_board_layout
+from app.crud.quickfind import quickfind
+from app.crud.search import decode_cursor, encode_cursor, search_cards
 from app.crud.card import create_card, delete_card, move_card, update_card
 from app.crud.section import delete_section, update_section, create_section
-from app.domain import schemas, Section
-from app.security.utils import create_access_token
+from app.domain import schemas
+from app.core import settings
+from app.security.utils import create_access_token, create_refresh_token
 from app.crud.section import move_section
 
 
 router = APIRouter()
 
 
-@router.post("/sign-in", response_model=schemas.Token)
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# rows в бюджетах — все строки, вернувшиеся из базы за запрос: пользователь при холодном кэше,
+# RETURNING записи, версии досок и журнала. Роуты, где строк столько, сколько в ответе
+# (списки, поиск, раскладка), ограничены только числом statement-ов.
+@router.post("/sign-in", response_model=schemas.Token, dependencies=[Depends(statement_budget(3, rows=1))])
 async def login(user: schemas.User, session: AsyncSession = Depends(db_helper.session_getter)):
     db_user = await login_user(user.username, user.password, session)
 
-    access_token = create_access_token(data={"sub": user.username})
+    claims = {"sub": db_user.username, "uid": db_user.id}
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(data=claims)
 
-    return {"token": access_token, "token_type": "bearer"}
+    return {"token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
-@router.get("/boards", response_model=list[schemas.BoardRead])
-async def get_my_boards(session: AsyncSession = Depends(db_helper.session_getter), current_user = Depends(get_current_user)):
-    boards = await get_boards_for_user(session, current_user.id)
+@router.post("/token/refresh", response_model=schemas.Token, dependencies=[Depends(statement_budget(2, rows=1))])
+async def refresh_token_route(
+    body: schemas.TokenRefresh,
+    session: AsyncSession = Depends(db_helper.session_getter),
+):
+    db_user = await rotate_refresh_token(body.refresh_token, session)
 
-    if not boards:
+    claims = {"sub": db_user.username, "uid": db_user.id}
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(data=claims)
+
+    return {"token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.get("/boards", response_model=list[schemas.BoardSummary] | list[schemas.BoardRead], dependencies=[Depends(statement_budget(5))])
+async def get_my_boards(
+    request: Request,
+    response: Response,
+    view: Literal["summary", "full"] = Query("summary"),
+    after: int | None = Query(None, description="id последней доски предыдущей страницы"),
+    limit: int = Query(100, ge=1, le=500),
+    template: bool | None = Query(None, description="только шаблоны / только обычные доски"),
+    session: AsyncSession = Depends(db_helper.read_session_getter),
+    current_user = Depends(get_current_user)
+):
+    fingerprint = await get_boards_fingerprint(session, current_user.id)
+    etag = f'"{fingerprint}-{view}-{after}-{limit}-{template}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # полное дерево (секции + карточки) только по явному запросу;
+    # лишняя доска сверх limit показывает, есть ли следующая страница
+    if view == "full":
+        boards = await get_boards_for_user(session, current_user.id, after, limit + 1, template)
+    else:
+        boards = await get_board_summaries_for_user(session, current_user.id, after, limit + 1, template)
+    has_more = len(boards) > limit
+    boards = boards[:limit]
+
+    if not boards and after is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No boards found for the current user"
         )
 
+    if has_more:
+        response.headers["X-Next-Cursor"] = str(boards[-1].id)
+
     return boards
 
 
-@router.post("/boards", response_model=schemas.BoardBase)
+@router.post("/boards", response_model=schemas.BoardBase, dependencies=[Depends(statement_budget(3, rows=3))])
 async def create_board_route(
     title: str = Query(...),
+    template: bool = Query(False),
     session: AsyncSession = Depends(db_helper.session_getter),
     current_user = Depends(get_current_user)
 ):
-    board_data = schemas.BoardCreate(title=title)
+    board_data = schemas.BoardCreate(title=title, is_template=template)
     db_board = await create_board(session, board_data, current_user.id)
     return db_board
 
 
-@router.get("/boards/{board_id}", response_model=schemas.BoardRead)
+@router.post("/boards/import", response_model=schemas.BoardImportResult, dependencies=[Depends(statement_budget(9, rows=3))])
+async def import_board_route(
+    request: Request,
+    format: Literal["trello", "csv"] | None = Query(None),
+    title: str | None = Query(None),
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user = Depends(get_current_user)
+):
+    # тело читается потоком, без загрузки файла целиком
+    max_bytes = settings.imports.max_upload_bytes
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Import is larger than {max_bytes} bytes")
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "trello"
+    chunks = limit_size(request.stream(), max_bytes)
+    return await import_board(session, current_user.id, chunks, format, title)
+
+
+@router.get("/boards/{board_id}", response_model=schemas.BoardRead, dependencies=[Depends(statement_budget(3, rows=3))])
 async def get_board_route(
         board_id: int,
-        session: AsyncSession = Depends(db_helper.session_getter),
+        request: Request,
+        session: AsyncSession = Depends(db_helper.read_session_getter),
         current_user=Depends(get_current_user)
 ):
-    db_board = await get_board_with_sections(session, board_id)
+    db_board = await get_board_version(session, board_id)
     if not db_board:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
 
@@ -72,44 +159,132 @@ async def get_board_route(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="You do not have permission to view this board")
 
-    return db_board
+    etag = f'"{board_id}-{db_board.version}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    snapshot = await get_board_snapshot_cached(session, board_id, db_board.version)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+
+    version, content = snapshot
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"ETag": f'"{board_id}-{version}"'},
+    )
+
+
+@router.get("/boards/{board_id}/changes", response_model=schemas.BoardChanges, dependencies=[Depends(statement_budget(4, rows=settings.changelog.retain + 4))])
+async def get_board_changes_route(
+    board_id: int,
+    since: int = Query(..., ge=0),
+    session: AsyncSession = Depends(db_helper.read_session_getter),
+    current_user=Depends(get_current_user)
+):
+    db_board = await get_board_version(session, board_id)
+    if not db_board:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+
+    if db_board.customer_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="You do not have permission to view this board")
+
+    if since == db_board.version:
+        return {"version": db_board.version, "changes": []}
+
+    if since < db_board.version:
+        changes = await get_changes_since(session, board_id, since, settings.changelog.retain + 1)
+        # журнал непрерывен от since+1 и клиент отстал не слишком сильно
+        if changes and changes[0].version == since + 1 and len(changes) <= settings.changelog.retain:
+            return {"version": changes[-1].version, "changes": changes}
+
+    # клиент отстал дальше компактированного журнала — отдаём доску целиком
+    snapshot = await get_board_snapshot_cached(session, board_id, db_board.version)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+
+    version, content = snapshot
+    return Response(
+        content=b'{"version":%d,"reset":true,"changes":[],"snapshot":%s}' % (version, content),
+        media_type="application/json",
+    )
+
 
+@router.get("/boards/{board_id}/export", dependencies=[Depends(statement_budget(2, rows=2))])
+async def export_board_route(
+    board_id: int,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False),
+    session: AsyncSession = Depends(db_helper.read_session_getter),
+    current_user=Depends(get_current_user)
+):
+    db_board = await get_board_header(session, board_id)
+    if not db_board:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+
+    if db_board.customer_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="You do not have permission to export this board")
+
+    filename = f"board-{board_id}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
 
-@router.put("/boards/{board_id}", response_model=schemas.BoardBase)
+    return StreamingResponse(
+        stream_board_export({"id": db_board.id, "title": db_board.title}, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.put("/boards/{board_id}", response_model=schemas.BoardBase, dependencies=[Depends(statement_budget(5, rows=4))])
 async def update_board_route(
     board_id: int,
     newTitle: str = Query(...),
+    template: bool | None = Query(None),
     session: AsyncSession = Depends(db_helper.session_getter),
     current_user = Depends(get_current_user)
 ):
-    db_board = await get_board(session, board_id)
+    db_board = await update_board(session, board_id,  schemas.BoardUpdate(title=newTitle, is_template=template), current_user.id)
 
-    if db_board is None:
-        raise HTTPException(status_code=404, detail="Board not found")
+    return db_board
 
-    if db_board.customer_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You do not have permission to edit this board")
 
-    db_board = await update_board(session, board_id,  schemas.BoardUpdate(title=newTitle), current_user.id)
+@router.post("/boards/{board_id}/clone", response_model=schemas.BoardSummary, dependencies=[Depends(statement_budget(3, rows=2))])
+async def clone_board_route(
+    board_id: int,
+    title: str | None = Query(None, description="по умолчанию — название исходной доски"),
+    template: bool = Query(False, description="сделать копию шаблоном"),
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user = Depends(get_current_user)
+):
+    return await clone_board(session, board_id, current_user.id, title, template)
 
-    return db_board
 
+@router.put("/boards/{board_id}/layout", response_model=schemas.BoardLayoutResult, dependencies=[Depends(statement_budget(9))])
+async def update_board_layout_route(
+    board_id: int,
+    layout: schemas.BoardLayout = Body(...),
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user=Depends(get_current_user)
+):
+    version = await apply_board_layout(session, board_id, layout, current_user.id)
+    return {"version": version}
 
-@router.delete("/boards/{board_id}", response_model=schemas.BoardRead)
-async def get_board_route(
+
+@router.delete("/boards/{board_id}", response_model=schemas.BoardBase, dependencies=[Depends(statement_budget(5, rows=4))])
+async def delete_board_route(
     board_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
     current_user=Depends(get_current_user)
 ):
-    board = await get_board_with_sections(session, board_id)
-    if not board:
-        raise HTTPException(404, "Board not found")
-    if board.customer_id != current_user.id:
-        raise HTTPException(403, "Forbidden")
-    return board
+    return await delete_board(session, board_id, current_user.id)
 
 
-@router.post("/sections", response_model=schemas.SectionRead)
+@router.post("/sections", response_model=schemas.SectionRead, dependencies=[Depends(statement_budget(7, rows=5))])
 async def create_section_route(
     title: str = Form(...),
     boardId: int = Form(...),
@@ -119,7 +294,7 @@ async def create_section_route(
     section_in = schemas.SectionCreate(title=title, boardId=boardId)
     return await create_section(session, section_in, current_user.id)
 
-@router.put("/sections/{section_id}", response_model=schemas.SectionRead)
+@router.put("/sections/{section_id}", response_model=schemas.SectionRead, dependencies=[Depends(statement_budget(5, rows=4))])
 async def update_section_route(
     section_id: int,
     title: str = Query(..., alias="newTitle"),
@@ -128,7 +303,7 @@ async def update_section_route(
 ):
     return await update_section(session, section_id, title, current_user.id)
 
-@router.delete("/sections/{section_id}", response_model=schemas.SectionRead)
+@router.delete("/sections/{section_id}", response_model=schemas.SectionRead, dependencies=[Depends(statement_budget(5, rows=4))])
 async def delete_section_route(
     section_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -138,7 +313,7 @@ async def delete_section_route(
     return db_section
 
 
-@router.post("/cards", response_model=schemas.CardRead)
+@router.post("/cards", response_model=schemas.CardRead, dependencies=[Depends(statement_budget(6, rows=5))])
 async def create_card_route(
     sectionId: int = Query(...),
     title:     str = Query(...),
@@ -148,7 +323,7 @@ async def create_card_route(
     card = await create_card(session, sectionId, schemas.CardCreate(title=title), user.id)
     return card
 
-@router.put("/cards/{card_id}", response_model=schemas.CardRead)
+@router.put("/cards/{card_id}", response_model=schemas.CardRead, dependencies=[Depends(statement_budget(5, rows=4))])
 async def update_card_route(
     card_id: int,
     card_in: schemas.CardUpdate = Body(...),
@@ -159,7 +334,7 @@ async def update_card_route(
 
 
 
-@router.delete("/cards/{card_id}", response_model=schemas.CardRead)
+@router.delete("/cards/{card_id}", response_model=schemas.CardRead, dependencies=[Depends(statement_budget(5, rows=4))])
 async def delete_card_route(
     card_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -168,35 +343,64 @@ async def delete_card_route(
     return await delete_card(session, card_id, user.id)
 
 
-@router.put("/cards/{card_id}/move", response_model=schemas.CardRead)
+@router.put("/cards/{card_id}/move", response_model=schemas.CardRead, dependencies=[Depends(statement_budget(10, rows=8))])
 async def move_card_route(
     card_id: int,
     sectionId:   int = Query(...),
-    position:    int = Query(...),
+    position:    int = Query(..., description="индекс среди карточек секции"),
     session: AsyncSession = Depends(db_helper.session_getter),
     user = Depends(get_current_user),
 ):
     return await move_card(session, card_id, sectionId, position, user.id)
 
-@router.put("/sections/{section_id}/move", response_model=schemas.SectionRead)
+@router.put("/sections/{section_id}/move", response_model=schemas.SectionRead, dependencies=[Depends(statement_budget(8, rows=7))])
 async def move_section_route(
     section_id: int,
-    position: int = Query(...),
+    position: int = Query(..., description="индекс среди секций доски"),
     session: AsyncSession = Depends(db_helper.session_getter),
     current_user = Depends(get_current_user)
 ):
-    # Получаем секцию
-    section = await session.get(Section, section_id)
-    if not section:
-        raise HTTPException(status_code=404, detail="Section not found")
+    return await move_section(session, section_id, position, current_user.id)
+
 
-    # Проверка доступа
-    if section.board.customer_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+@router.get("/search", response_model=list[schemas.CardSearchHit], dependencies=[Depends(statement_budget(2))])
+async def search_route(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    after: str | None = Query(None, description="X-Next-Cursor предыдущей страницы"),
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(db_helper.read_session_getter),
+    current_user = Depends(get_current_user)
+):
+    cursor = decode_cursor(after) if after is not None else None
+    hits = await search_cards(session, current_user.id, q, cursor, limit)
 
-    # Обновляем позицию
-    section.position = position
-    await session.commit()
-    await session.refresh(section)
+    if len(hits) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(hits[-1]["rank"], hits[-1]["id"])
 
-    return section
+    return hits
+
+
+@router.get("/quickfind", response_model=list[schemas.QuickFindHit], dependencies=[Depends(statement_budget(2))])
+async def quickfind_route(
+    prefix: str = Query(..., min_length=1, max_length=128),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(db_helper.read_session_getter),
+    current_user = Depends(get_current_user)
+):
+    return await quickfind(session, current_user.id, prefix, limit)
+
+
+# на операцию: SAVEPOINT и RELEASE, flush журнала, позиция (до двух запросов),
+# старая секция, сама запись, две версии досок при переносе между досками, компактирование
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def batch_route(
+    # первым, как dependencies=[...] у остальных роутов: считает и запросы авторизации
+    budget: QueryCounter = Depends(statement_budget(3, per_item=10)),
+    batch: schemas.BatchRequest = Body(...),
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user = Depends(get_current_user),
+):
+    budget.items = len(batch.operations)
+    committed, results = await run_batch(session, batch.operations, current_user.id, batch.continue_on_error)
+    return {"committed": committed, "results": results}
@@ -0,0 +1,69 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+
+from app.core.db import db_helper
+from app.crud.auth import authenticate_token
+from app.crud.board import get_board_version
+from app.realtime.hub import board_hub, Subscription
+
+
+ws_router = APIRouter()
+
+
+@ws_router.websocket("/ws/boards/{board_id}")
+async def board_updates(
+    websocket: WebSocket,
+    board_id: int,
+    token: str = Query(...),
+):
+    # Браузер не умеет ставить Authorization на WebSocket, поэтому токен в query
+    async with db_helper.session_factory() as session:
+        try:
+            principal = await authenticate_token(token, session)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        db_board = await get_board_version(session, board_id)
+
+    if db_board is None or db_board.customer_id != principal.id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = board_hub.subscribe(board_id)
+    try:
+        # клиент сравнивает версию со своей и при расхождении идёт в /changes
+        await websocket.send_json({"type": "hello", "v": db_board.version})
+
+        sender = asyncio.create_task(_send_events(websocket, subscription))
+        receiver = asyncio.create_task(_drain_incoming(websocket))
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            # разрыв соединения здесь штатная ситуация, просто забираем исключение
+            task.exception()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        board_hub.unsubscribe(subscription)
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription):
+    while True:
+        message = await subscription.queue.get()
+        if message is None:
+            # не успевал читать — пусть переподключится и догонит через /changes
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        await websocket.send_text(message)
+
+
+async def _drain_incoming(websocket: WebSocket):
+    # входящие сообщения не нужны, читаем только чтобы заметить отключение
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        return
@@ -21,6 +21,16 @@ class DataBaseConfig(BaseModel):
     echo_pool: bool
     pool_size: int
     max_overflow: int
+    # превышение бюджета SQL роута (app.core.statement_budget): False — только warning в лог,
+    # True — исключение StatementBudgetExceeded (тесты, dev)
+    enforce_statement_budgets: bool = False
+    # реплики для GET-роутов (db_helper.read_session_getter); пусто — всё читается с primary
+    replica_urls: list[PostgresDsn] = []
+    # сколько после своей записи пользователь читает с primary, пока реплики догоняют.
+    # Отметка о записи уходит клиенту cookie (app.middleware.read_your_writes), поэтому
+    # работает и при нескольких воркерах; клиент без cookie (fetch без credentials)
+    # защищён только в пределах воркера, принявшего запись
+    read_your_writes_seconds: float = 5.0
 
 
 class JWTConfig(BaseModel):
@@ -30,6 +40,83 @@ class JWTConfig(BaseModel):
     refresh_token_expire_days: int
 
 
+class PasswordConfig(BaseModel):
+    bcrypt_rounds: int = 12
+    hash_workers: int = 2
+    max_pending: int = 64
+
+
+class CacheConfig(BaseModel):
+    principal_max_size: int = 10_000
+    principal_ttl_seconds: int = 300
+    snapshot_max_entries: int = 512
+    snapshot_max_bytes: int = 64 * 1024 * 1024
+    # быстрый поиск (/quickfind): пользователи в LRU, префиксы на пользователя,
+    # время жизни и сколько кандидатов держать на префикс
+    quickfind_max_users: int = 10_000
+    quickfind_prefixes_per_user: int = 16
+    quickfind_ttl_seconds: int = 30
+    quickfind_candidates: int = 500
+
+
+class ChangeLogConfig(BaseModel):
+    # сколько последних изменений хранить на доску
+    retain: int = 1000
+    # компактировать журнал на каждой N-й версии доски
+    compact_every: int = 100
+
+
+class RealtimeConfig(BaseModel):
+    # сколько событий может накопиться у одного подписчика, прежде чем его отключат
+    subscriber_queue_size: int = 256
+
+
+class OrderingConfig(BaseModel):
+    # ключи длиннее этого переписываются фоновым ребалансировщиком
+    max_key_length: int = 24
+    rebalance_interval_seconds: int = 300
+    rebalance_batch: int = 50
+
+
+class PurgeConfig(BaseModel):
+    # как часто фоновая задача ищет мягко удалённые доски, секции и карточки
+    interval_seconds: int = 30
+    # строк за одну транзакцию DELETE — ограничивает время удержания блокировок
+    batch_size: int = 1000
+
+
+class ProfilerConfig(BaseModel):
+    # выключенный профайлер не ставит хуков вовсе
+    enabled: bool = False
+    # доля запросов, у которых запоминаются SQL и параметры для лога медленных
+    sample_rate: float = 0.1
+    slow_request_ms: float = 500
+    max_logged_statements: int = 50
+
+
+class WarmupConfig(BaseModel):
+    # при старте открыть pool_size соединений на каждый движок и прогнать горячие запросы
+    enabled: bool = True
+    # дольше — считаем прогрев неудачным и всё равно объявляем готовность
+    timeout_seconds: float = 30
+
+
+class MetricsConfig(BaseModel):
+    # Prometheus предъявляет его как Authorization: Bearer <token> (bearer_token в scrape_config);
+    # пусто — GET /metrics выключен и отвечает 404
+    token: str = ""
+
+
+class BatchConfig(BaseModel):
+    # операций в одном POST /batch: пакет держит транзакцию и соединение пула до конца
+    max_operations: int = 100
+
+
+class ImportConfig(BaseModel):
+    # больше — 413; тело читается потоком, так что лимит защищает базу, а не память
+    max_upload_bytes: int = 256 * 1024 * 1024
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -42,6 +129,17 @@ class Settings(BaseSettings):
     run: RunConfig
     db: DataBaseConfig
     jwt: JWTConfig
+    password: PasswordConfig = PasswordConfig()
+    cache: CacheConfig = CacheConfig()
+    changelog: ChangeLogConfig = ChangeLogConfig()
+    realtime: RealtimeConfig = RealtimeConfig()
+    ordering: OrderingConfig = OrderingConfig()
+    purge: PurgeConfig = PurgeConfig()
+    profiler: ProfilerConfig = ProfilerConfig()
+    warmup: WarmupConfig = WarmupConfig()
+    imports: ImportConfig = ImportConfig()
+    batch: BatchConfig = BatchConfig()
+    metrics: MetricsConfig = MetricsConfig()
 
 
 settings = Settings()
\ No newline at end of file
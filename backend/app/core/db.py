@@ -1,10 +1,52 @@
+import itertools
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
     async_sessionmaker,
     AsyncSession,
 )
+from sqlalchemy.orm import Session
+
 from app.core.config import settings
+from app.core.metrics import InstrumentedQueuePool, instrument_engine
+from app.core.profiler import install_query_timer
+from app.core.statement_budget import install_statement_counter
+
+
+# пользователь текущего запроса — выставляет get_current_user
+request_user_id: ContextVar[int | None] = ContextVar("request_user_id", default=None)
+
+
+class WriteMarker:
+    """
+    Отметка read-your-writes текущего запроса: до какого момента (time.time())
+    клиент читает с primary по своей cookie и был ли в запросе коммит.
+    Память процесса есть только у своего воркера, а cookie приходит в любой.
+    """
+
+    def __init__(self, read_primary_until: float = 0.0):
+        self.read_primary_until = read_primary_until
+        self.wrote = False
+
+
+request_write_marker: ContextVar[WriteMarker | None] = ContextVar("request_write_marker", default=None)
+
+
+class ReadSession(Session):
+    """
+    Сессия только для чтения: движок (реплика или primary) выбирается один раз,
+    при первом запросе, — к этому моменту пользователь запроса уже известен.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        engine = self.info.get("engine")
+        if engine is None:
+            engine = self.info["engine"] = self.info["db_helper"].read_engine(request_user_id.get())
+        return engine.sync_engine
 
 
 class DataBaseHelper:
@@ -15,28 +57,103 @@ class DataBaseHelper:
             echo_pool: bool = False,
             pool_size: int = 5,
             max_overflow: int = 10,
+            replica_urls: list[str] = (),
+            read_your_writes_seconds: float = 5.0,
     ):
-        self.engine: AsyncEngine = create_async_engine(
-            url,
+        engine_options = dict(
             echo=echo,
             echo_pool=echo_pool,
             pool_size=pool_size,
             max_overflow=max_overflow,
+            poolclass=InstrumentedQueuePool,
         )
+        self.engine: AsyncEngine = create_async_engine(url, pool_logging_name="primary", **engine_options)
+        # у каждой реплики свой пул
+        self.replica_engines: list[AsyncEngine] = [
+            create_async_engine(replica_url, pool_logging_name=f"replica{number}", **engine_options)
+            for number, replica_url in enumerate(replica_urls)
+        ]
+        for name, engine in self.engines().items():
+            install_statement_counter(engine)
+            install_query_timer(engine)
+            instrument_engine(engine, name)
+        self._replicas = itertools.cycle(self.replica_engines)
+
+        # кто недавно писал: user_id -> момент, до которого читать только с primary
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._recent_writers: dict[int, float] = {}
+        self.reads = {"primary": 0, "replica": 0}
+
         self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
         )
+        self.read_session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=self.engine,
+            sync_session_class=ReadSession,
+            info={"db_helper": self},
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+        )
+
+    def engines(self) -> dict[str, AsyncEngine]:
+        """Все движки по имени пула: primary, replica0, replica1, ..."""
+        return {
+            "primary": self.engine,
+            **{f"replica{number}": engine for number, engine in enumerate(self.replica_engines)},
+        }
+
+    def note_write(self, user_id: int):
+        now = time.monotonic()
+        self._recent_writers[user_id] = now + self.read_your_writes_seconds
+        if len(self._recent_writers) > 10_000:
+            self._recent_writers = {
+                writer: until for writer, until in self._recent_writers.items() if until > now
+            }
+
+    def wrote_recently(self, user_id: int | None) -> bool:
+        if user_id is None:
+            return False
+        until = self._recent_writers.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def read_engine(self, user_id: int | None) -> AsyncEngine:
+        """
+        Реплика по кругу; primary — если реплик нет или пользователь только что писал
+        (реплика могла ещё не догнать его изменения): по памяти этого воркера
+        или по cookie клиента.
+        """
+        marker = request_write_marker.get()
+        client_wrote = marker is not None and marker.read_primary_until > time.time()
+        if not self.replica_engines or client_wrote or self.wrote_recently(user_id):
+            self.reads["primary"] += 1
+            return self.engine
+        self.reads["replica"] += 1
+        return next(self._replicas)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replica_engines),
+            "recent_writers": len(self._recent_writers),
+            "reads": dict(self.reads),
+        }
 
     async def dispose(self):
-        await self.engine.dispose()
+        for engine in self.engines().values():
+            await engine.dispose()
 
     async def session_getter(self):
         async with self.session_factory() as session:
             yield session
 
+    async def read_session_getter(self):
+        """Для GET-роутов: ничего не пишет и не коммитит."""
+        async with self.read_session_factory() as session:
+            yield session
+
 
 db_helper = DataBaseHelper(
     url=str(settings.db.url),
@@ -44,4 +161,21 @@ db_helper = DataBaseHelper(
     echo=settings.db.echo,
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
-)
\ No newline at end of file
+    replica_urls=[str(url) for url in settings.db.replica_urls],
+    read_your_writes_seconds=settings.db.read_your_writes_seconds,
+)
+
+
+# Коммит в запросе пользователя — дальше он какое-то время читает с primary.
+# Сессии чтения не коммитят, фоновые задачи идут без пользователя.
+# Отпущенный SAVEPOINT (after_commit срабатывает и на него) записью не считается.
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session: Session):
+    if session.in_nested_transaction():
+        return
+    user_id = request_user_id.get()
+    if user_id is not None:
+        db_helper.note_write(user_id)
+    marker = request_write_marker.get()
+    if marker is not None:
+        marker.wrote = True
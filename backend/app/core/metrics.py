@@ -0,0 +1,128 @@
+"""
+Метрики Prometheus, отдаются на GET /metrics.
+
+Счётчики и гистограммы обновляются по ходу работы (middleware, пул, bcrypt),
+а состояние пулов и существующие stats() компонентов снимаются коллекторами
+в момент опроса — без фоновых задач.
+"""
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened",
+    "New DBAPI connections opened by the pool",
+    ["pool"],
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "bcrypt time in the hashing thread pool, excluding queueing",
+    ["op"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1, 2),
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который замеряет ожидание соединения. У событий пула нет хука
+    «начали ждать» (checkout срабатывает уже после), поэтому время берётся
+    вокруг _do_get. Имя пула — pool_logging_name движка.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_ACQUIRE_SECONDS.labels(self.logging_name or "default").observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Подписывает движок на события пула (подписка переживает engine.dispose())."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_OPENED.labels(name).inc()
+
+
+class PoolCollector(Collector):
+    """Занятость пулов на момент опроса: по ним подбираются pool_size и max_overflow."""
+
+    def __init__(self, engines: Callable[[], dict[str, AsyncEngine]]):
+        self.engines = engines
+
+    def collect(self):
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["pool"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["pool"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open above pool_size", labels=["pool"])
+        size = GaugeMetricFamily("db_pool_size", "Configured pool_size", labels=["pool"])
+        max_overflow = GaugeMetricFamily("db_pool_max_overflow", "Configured max_overflow", labels=["pool"])
+
+        for name, engine in self.engines().items():
+            pool = engine.pool
+            checked_out.add_metric([name], pool.checkedout())
+            checked_in.add_metric([name], pool.checkedin())
+            # QueuePool считает overflow от -pool_size
+            overflow.add_metric([name], max(pool.overflow(), 0))
+            size.add_metric([name], pool.size())
+            max_overflow.add_metric([name], pool._max_overflow)
+
+        yield from (checked_out, checked_in, overflow, size, max_overflow)
+
+
+def _flatten(prefix: str, stats: dict):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+class StatsCollector(Collector):
+    """stats() компонентов (кэши, bcrypt-пул, WebSocket-хаб) как gauge app_<компонент>_<ключ>."""
+
+    def __init__(self, sources: dict[str, Callable[[], dict]]):
+        self.sources = sources
+
+    def collect(self):
+        for component, stats in self.sources.items():
+            for name, value in _flatten(f"app_{component}", stats()):
+                yield GaugeMetricFamily(name, f"{component} stats(): {name}", value=value)
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+
+class PrefixCache:
+    """
+    LRU результатов быстрого поиска: пользователь -> последние префиксы и их кандидаты.
+
+    Кандидаты префикса p — все строки, где заголовок содержит p. Поэтому ответ
+    для более длинного запроса, содержащего p («pro» -> «proj»), можно получить
+    фильтрацией кэша, если набор для p полный (не обрезан лимитом).
+    Записи живут ttl_seconds; свои изменения пользователь видит сразу —
+    app.crud.quickfind сбрасывает его записи после каждого коммита.
+    """
+
+    def __init__(self, max_users: int, prefixes_per_user: int, ttl_seconds: int):
+        self.max_users = max_users
+        self.prefixes_per_user = prefixes_per_user
+        self.ttl_seconds = ttl_seconds
+        self._users: OrderedDict[int, OrderedDict[str, tuple[float, bool, list]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, prefix: str) -> list | None:
+        """Кандидаты для prefix из самого длинного подходящего полного набора или None."""
+        entries = self._users.get(user_id)
+        best = None
+        if entries is not None:
+            now = time.time()
+            for cached, (expires_at, complete, candidates) in list(entries.items()):
+                if expires_at <= now:
+                    del entries[cached]
+                    continue
+                if cached == prefix or (complete and cached in prefix):
+                    if best is None or len(cached) > len(best[0]):
+                        best = (cached, candidates)
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self._users.move_to_end(user_id)
+        entries.move_to_end(best[0])
+        self.hits += 1
+        cached, candidates = best
+        if cached == prefix:
+            return candidates
+        return [candidate for candidate in candidates if prefix in candidate["title"].lower()]
+
+    def put(self, user_id: int, prefix: str, candidates: list, complete: bool):
+        if self.max_users <= 0:
+            return
+        entries = self._users.setdefault(user_id, OrderedDict())
+        entries[prefix] = (time.time() + self.ttl_seconds, complete, candidates)
+        entries.move_to_end(prefix)
+        while len(entries) > self.prefixes_per_user:
+            entries.popitem(last=False)
+
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._users),
+            "prefixes": sum(len(entries) for entries in self._users.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,110 @@
+"""
+Профиль запроса: сколько statement-ов, сколько времени в БД, в ORM
+(разбор строк, selectin-догрузки без самих запросов) и в сериализации ответа.
+
+Итог уходит в заголовок Server-Timing, а медленные запросы из выборки
+(sample_rate) — в лог вместе с SQL и параметрами.
+Включается BACK_CONFIG__PROFILER__ENABLED=True; выключенный профайлер
+не ставит ни одного хука, так что обычный запрос за него не платит.
+"""
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+import fastapi.routing
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+
+
+@dataclass
+class RequestProfile:
+    # запоминать ли SQL с параметрами — решается один раз, при входе запроса
+    capture: bool = False
+    statements: int = 0
+    db_seconds: float = 0.0
+    orm_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    executed: list[tuple[float, str, Any]] = field(default_factory=list)
+    _orm_depth: int = 0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} statements"',
+            f"orm;dur={self.orm_seconds * 1000:.1f}",
+            f"serialize;dur={self.serialize_seconds * 1000:.1f}",
+            f"total;dur={total_seconds * 1000:.1f}",
+        ])
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+
+def install_query_timer(engine: AsyncEngine):
+    if not settings.profiler.enabled:
+        return
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            context._profiler_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        started = getattr(context, "_profiler_started", None)
+        if profile is None or started is None:
+            return
+        elapsed = time.perf_counter() - started
+        profile.statements += 1
+        profile.db_seconds += elapsed
+        if profile.capture and len(profile.executed) < settings.profiler.max_logged_statements:
+            profile.executed.append((elapsed, statement, parameters))
+
+
+def _time_orm_execute(orm_execute_state: ORMExecuteState):
+    """
+    Session.execute целиком минус время в БД. Асинхронная сессия буферизует
+    ORM-строки внутри execute, так что сюда попадает и сборка объектов;
+    вложенные selectin-догрузки считаются внешним вызовом.
+    """
+    profile = current_profile.get()
+    if profile is None or profile._orm_depth:
+        return None
+
+    profile._orm_depth += 1
+    db_before = profile.db_seconds
+    started = time.perf_counter()
+    try:
+        return orm_execute_state.invoke_statement()
+    finally:
+        profile._orm_depth -= 1
+        profile.orm_seconds += time.perf_counter() - started - (profile.db_seconds - db_before)
+
+
+def _timed_serialize(serialize_response):
+    async def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return await serialize_response(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            profile.serialize_seconds += time.perf_counter() - started
+
+    return wrapper
+
+
+def install_request_hooks():
+    """
+    Хуки ORM и сериализации. У FastAPI нет события вокруг валидации
+    response_model, поэтому оборачивается fastapi.routing.serialize_response —
+    обработчик роута берёт её из модуля при каждом вызове.
+    Ответы, собранные в Postgres (снимок доски), сериализации не проходят.
+    """
+    event.listen(Session, "do_orm_execute", _time_orm_execute)
+    fastapi.routing.serialize_response = _timed_serialize(fastapi.routing.serialize_response)
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+class SnapshotCache:
+    """
+    LRU сериализованных снимков досок, ключ — (board_id, version).
+    Ограничен и числом записей, и суммарным размером в байтах.
+    Старые версии не удаляются явно: на них просто никто больше не попадает.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[int, int], bytes] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board_id: int, version: int) -> bytes | None:
+        key = (board_id, version)
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, board_id: int, version: int, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        key = (board_id, version)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+
+        self._entries[key] = data
+        self._size += len(data)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,97 @@
+"""
+Бюджеты SQL на эндпоинт.
+
+Хуки SQLAlchemy считают выполненные statement-ы (before_cursor_execute)
+и строки, которые они вернули (after_cursor_execute, rowcount курсора), в счётчик
+текущего запроса — одинаково для ORM, Core с RETURNING и text().
+Роут объявляет бюджет через dependencies=[Depends(statement_budget(...))];
+если работа зависит от размера запроса (POST /batch), роут берёт счётчик
+параметром и выставляет counter.items, а бюджет растёт на per_item за элемент;
+при превышении — только предупреждение в лог, а с BACK_CONFIG__DB__ENFORCE_STATEMENT_BUDGETS=True
+(тесты, dev) — исключение StatementBudgetExceeded.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryCounter:
+    statements: int = 0
+    rows: int = 0
+    # элементов в запросе, для бюджетов с per_item
+    items: int = 0
+    executed: list[str] = field(default_factory=list)
+
+
+class StatementBudgetExceeded(AssertionError):
+    pass
+
+
+_current: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries():
+    """Считает SQL внутри блока; удобно и в тестах: with count_queries() as counter: ..."""
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def check_budget(counter: QueryCounter, name: str, statements: int, rows: int | None = None, per_item: int = 0):
+    statements += per_item * counter.items
+    problems = []
+    if counter.statements > statements:
+        problems.append(f"{counter.statements} statements > {statements}")
+    if rows is not None and counter.rows > rows:
+        problems.append(f"{counter.rows} rows > {rows}")
+    if not problems:
+        return
+
+    message = f"{name}: " + ", ".join(problems) + "\n" + "\n".join(counter.executed)
+    if settings.db.enforce_statement_budgets:
+        raise StatementBudgetExceeded(message)
+    logger.warning("statement budget exceeded: %s", message)
+
+
+def statement_budget(statements: int, rows: int | None = None, per_item: int = 0):
+    """
+    Зависимость FastAPI: сколько statement-ов и возвращённых ими строк может потратить эндпоинт;
+    per_item — сколько ещё statement-ов на каждый элемент counter.items.
+    """
+    async def dependency(request: Request):
+        with count_queries() as counter:
+            yield counter
+        check_budget(counter, f"{request.method} {request.url.path}", statements, rows, per_item)
+
+    return dependency
+
+
+def install_statement_counter(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter = _current.get()
+        if counter is not None:
+            counter.statements += 1
+            counter.executed.append(statement)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _count_rows(conn, cursor, statement, parameters, context, executemany):
+        counter = _current.get()
+        # rowcount asyncpg берёт из статуса команды: SELECT n, UPDATE n (с RETURNING — те же строки);
+        # у серверного курсора (stream) он -1 — такие строки бюджетом не ограничиваются
+        if counter is not None and cursor.description is not None and cursor.rowcount > 0:
+            counter.rows += cursor.rowcount
@@ -0,0 +1,102 @@
+"""
+Проверки «может ли пользователь трогать карточку/секцию/доску».
+Один индексный запрос, наружу только id — никаких ORM-объектов и их связей.
+
+Для записей условие владения встраивается прямо в UPDATE/DELETE/INSERT
+(*_owned_by), а *_access вызываются только если запись не затронула ни одной
+строки — чтобы отличить 404 от 403.
+
+Мягко удалённая строка (или строка под удалённой секцией/доской) для всех
+проверок не существует — 404. Так же и карточка, чей денормализованный board_id
+расходится с доской её секции: владелец определяется по обоим путям сразу.
+"""
+from typing import NoReturn
+
+from sqlalchemy import and_, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi import HTTPException, status
+
+from app.domain import Board, Card, Section
+
+
+def alive(*models) -> tuple:
+    """Условия «не удалено мягко» для каждой из моделей."""
+    return tuple(model.deleted_at.is_(None) for model in models)
+
+
+def _check(row, customer_id: int, not_found: str):
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    if row.customer_id != customer_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return row
+
+
+async def card_access(db: AsyncSession, card_id: int, customer_id: int):
+    """(card_id, section_id, board_id) карточки пользователя; иначе 404/403."""
+    result = await db.execute(
+        select(Card.id, Card.section_id, Card.board_id, Board.customer_id)
+        .join(Section, and_(Section.id == Card.section_id, Section.board_id == Card.board_id))
+        .join(Board, Board.id == Card.board_id)
+        .where(Card.id == card_id, *alive(Card, Section, Board))
+    )
+    return _check(result.one_or_none(), customer_id, "Card not found")
+
+
+async def section_access(db: AsyncSession, section_id: int, customer_id: int):
+    """(section_id, board_id) секции пользователя; иначе 404/403."""
+    result = await db.execute(
+        select(Section.id, Section.board_id, Board.customer_id)
+        .join(Board, Board.id == Section.board_id)
+        .where(Section.id == section_id, *alive(Section, Board))
+    )
+    return _check(result.one_or_none(), customer_id, "Section not found")
+
+
+async def board_access(db: AsyncSession, board_id: int, customer_id: int):
+    """(board_id,) доски пользователя; иначе 404/403."""
+    result = await db.execute(
+        select(Board.id, Board.customer_id).where(Board.id == board_id, *alive(Board))
+    )
+    return _check(result.one_or_none(), customer_id, "Board not found")
+
+
+def board_owned_by(customer_id: int):
+    return and_(Board.customer_id == customer_id, *alive(Board))
+
+
+def card_owned_by(customer_id: int):
+    return and_(
+        *alive(Card),
+        exists().where(
+            Section.id == Card.section_id,
+            Section.board_id == Card.board_id,
+            Board.id == Card.board_id,
+            Board.customer_id == customer_id,
+            *alive(Section, Board),
+        ),
+    )
+
+
+def section_owned_by(customer_id: int):
+    return and_(
+        *alive(Section),
+        exists().where(Board.id == Section.board_id, Board.customer_id == customer_id, *alive(Board)),
+    )
+
+
+async def raise_card_miss(db: AsyncSession, card_id: int, customer_id: int) -> NoReturn:
+    await card_access(db, card_id, customer_id)
+    # строка была, но исчезла между запросами
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card not found")
+
+
+async def raise_section_miss(db: AsyncSession, section_id: int, customer_id: int) -> NoReturn:
+    await section_access(db, section_id, customer_id)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
+
+
+async def raise_board_miss(db: AsyncSession, board_id: int, customer_id: int) -> NoReturn:
+    await board_access(db, board_id, customer_id)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
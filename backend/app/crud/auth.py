@@ -6,9 +6,10 @@ from jwt import PyJWTError, ExpiredSignatureError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core import settings
-from app.core.db import db_helper
+from app.core.db import db_helper, request_user_id
 from app.domain import Customer
-from app.security.utils import verify_password
+from app.security.principal_cache import Principal, principal_cache
+from app.security.utils import password_hasher, PasswordHasherBusy, refresh_denylist
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -21,7 +22,7 @@ async def get_user_by_username(username: str, session: AsyncSession):
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     session: AsyncSession = Depends(db_helper.session_getter),
-) -> Customer:
+) -> Principal:
     """
     Достаём пользователя из JWT.
     """
@@ -36,7 +37,21 @@ async def get_current_user(
         raise cred_exc
 
     # ② извлекаем сам токен
-    token = credentials.credentials
+    principal = await authenticate_token(credentials.credentials, session)
+    # по нему сессии чтения решают, можно ли идти на реплику
+    request_user_id.set(principal.id)
+    return principal
+
+
+async def authenticate_token(token: str, session: AsyncSession) -> Principal:
+    """
+    Проверка access-токена без привязки к HTTP-заголовку (нужна и для WebSocket).
+    """
+    cred_exc = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
     # ③ декодируем JWT
     try:
@@ -48,23 +63,97 @@ async def get_current_user(
     except (ExpiredSignatureError, PyJWTError):
         raise cred_exc
 
+    # refresh-токен не годится как access-токен
+    if payload.get("type", "access") != "access":
+        raise cred_exc
+
+    user_id: int | None = payload.get("uid")
     username: str | None = payload.get("sub")
-    if username is None:
+    if user_id is None and username is None:
         raise cred_exc
 
-    # ④ ищем пользователя в БД
-    user = await get_user_by_username(username, session)
+    # ④ сначала кэш, в БД идём только при промахе
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    if user_id is not None:
+        user = await session.get(Customer, user_id)
+    else:
+        # токены, выпущенные до появления uid в claims
+        user = await get_user_by_username(username, session)
     if user is None:
         raise cred_exc
 
-    return user
+    principal = Principal(id=user.id, username=user.username)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 async def login_user(username: str, password: str, session: AsyncSession):
     user = await get_user_by_username(username, session)
-    if user is None or not verify_password(password, user.password):
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
\ No newline at end of file
+
+    try:
+        is_valid, new_hash = await password_hasher.verify_and_update(password, user.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # стоимость bcrypt поменялась в настройках — тихо перехэшируем пароль
+    if new_hash is not None:
+        user.password = new_hash
+        await session.commit()
+
+    return user
+
+
+async def rotate_refresh_token(refresh_token: str, session: AsyncSession) -> Customer:
+    """
+    Проверяет refresh-токен (подпись + denylist, без bcrypt) и отзывает его,
+    чтобы каждый refresh-токен можно было использовать ровно один раз.
+    """
+    cred_exc = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    try:
+        payload = jwt.decode(
+            refresh_token,
+            settings.jwt.secret_key,
+            algorithms=[settings.jwt.algorithm],
+        )
+    except (ExpiredSignatureError, PyJWTError):
+        raise cred_exc
+
+    jti: str | None = payload.get("jti")
+    user_id: int | None = payload.get("uid")
+    if payload.get("type") != "refresh" or jti is None or user_id is None:
+        raise cred_exc
+
+    # отзываем до первого await: иначе параллельные запросы с тем же токеном
+    # успевают пройти проверку, пока первый ждёт базу
+    if not refresh_denylist.revoke_if_unrevoked(jti, payload["exp"]):
+        raise cred_exc
+
+    user = await session.get(Customer, user_id)
+    if user is None:
+        raise cred_exc
+
+    return user
@@ -0,0 +1,278 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, insert, literal, union_all, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi import HTTPException, status
+
+from app.crud.access import alive, card_owned_by
+from app.crud.card import CARD_COLUMNS
+from app.crud.changes import record_change
+from app.crud.ordering import key_between, key_for_index, last_key
+from app.crud.section import SECTION_COLUMNS
+from app.domain import Board, Card, Section
+from app.domain.schemas import BatchOperation
+
+logger = logging.getLogger(__name__)
+
+async def resolve_owners(db: AsyncSession, operations: list[BatchOperation]) -> dict[tuple[str, int], tuple[int, int]]:
+    """
+    Одним запросом: (вид, id) -> (board_id, customer_id) для всех карточек,
+    секций и досок, на которые ссылается пакет.
+    """
+    card_ids, section_ids, board_ids = set(), set(), set()
+    for operation in operations:
+        if operation.entity == "card":
+            if operation.id is not None:
+                card_ids.add(operation.id)
+            if operation.section_id is not None:
+                section_ids.add(operation.section_id)
+        else:
+            if operation.id is not None:
+                section_ids.add(operation.id)
+            if operation.board_id is not None:
+                board_ids.add(operation.board_id)
+
+    parts = []
+    if card_ids:
+        parts.append(
+            select(literal("card").label("kind"), Card.id, Card.board_id, Board.customer_id)
+            .join(Section, and_(Card.section_id == Section.id, Section.board_id == Card.board_id))
+            .join(Board, Card.board_id == Board.id)
+            .where(Card.id.in_(card_ids), *alive(Card, Section, Board))
+        )
+    if section_ids:
+        parts.append(
+            select(literal("section").label("kind"), Section.id, Section.board_id, Board.customer_id)
+            .join(Board, Section.board_id == Board.id)
+            .where(Section.id.in_(section_ids), *alive(Section, Board))
+        )
+    if board_ids:
+        parts.append(
+            select(literal("board").label("kind"), Board.id, Board.id, Board.customer_id)
+            .where(Board.id.in_(board_ids), *alive(Board))
+        )
+    if not parts:
+        return {}
+
+    result = await db.execute(union_all(*parts))
+    return {(kind, entity_id): (board_id, customer_id) for kind, entity_id, board_id, customer_id in result.all()}
+
+
+class BatchExecutor:
+    def __init__(self, db: AsyncSession, customer_id: int, owners: dict[tuple[str, int], tuple[int, int]]):
+        self.db = db
+        self.customer_id = customer_id
+        self.owners = owners
+
+    def _board_of(self, kind: str, entity_id: int | None) -> int:
+        if entity_id is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"{kind} id is required")
+        owner = self.owners.get((kind, entity_id))
+        if owner is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{kind.capitalize()} not found")
+        board_id, customer_id = owner
+        if customer_id != self.customer_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+        return board_id
+
+    async def _position(self, position_column, index: int | None, *criteria) -> str:
+        # без индекса — в конец
+        criteria = (*criteria, position_column.class_.deleted_at.is_(None))
+        if index is None:
+            return key_between(await last_key(self.db, position_column, *criteria), None)
+        return await key_for_index(self.db, position_column, index, *criteria)
+
+    @staticmethod
+    def _require_title(operation: BatchOperation):
+        if operation.title is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="title is required")
+
+    async def _returning_one(self, stmt, kind: str):
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            # удалено раньше в этом же пакете
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{kind.capitalize()} not found")
+        return row
+
+    async def execute(self, operation: BatchOperation) -> tuple[int, int]:
+        """Выполняет операцию без коммита, возвращает (entity_id, новая версия доски)."""
+        handler = getattr(self, f"_{operation.op}_{operation.entity}")
+        return await handler(operation)
+
+    async def _create_card(self, operation: BatchOperation):
+        self._require_title(operation)
+        board_id = self._board_of("section", operation.section_id)
+        position = await self._position(Card.position, operation.position, Card.section_id == operation.section_id)
+        row = await self._returning_one(
+            insert(Card)
+            .values(title=operation.title, description=operation.description,
+                    section_id=operation.section_id, board_id=board_id, position=position)
+            .returning(*CARD_COLUMNS),
+            "card",
+        )
+        self.owners[("card", row.id)] = (board_id, self.customer_id)
+        return row.id, await record_change(self.db, board_id, "card", "create", row.id, dict(row._mapping))
+
+    async def _update_card(self, operation: BatchOperation):
+        self._require_title(operation)
+        board_id = self._board_of("card", operation.id)
+        row = await self._returning_one(
+            update(Card)
+            .where(Card.id == operation.id, card_owned_by(self.customer_id))
+            .values(title=operation.title, description=operation.description)
+            .returning(*CARD_COLUMNS),
+            "card",
+        )
+        return row.id, await record_change(self.db, board_id, "card", "update", row.id, dict(row._mapping))
+
+    async def _delete_card(self, operation: BatchOperation):
+        board_id = self._board_of("card", operation.id)
+        row = await self._returning_one(
+            update(Card)
+            .where(Card.id == operation.id, card_owned_by(self.customer_id))
+            .values(deleted_at=datetime.utcnow())
+            .returning(Card.id, Card.section_id),
+            "card",
+        )
+        del self.owners[("card", row.id)]
+        return row.id, await record_change(self.db, board_id, "card", "delete", row.id, dict(row._mapping))
+
+    async def _move_card(self, operation: BatchOperation):
+        board_id = self._board_of("card", operation.id)
+        new_board_id = self._board_of("section", operation.section_id)
+        position = await self._position(
+            Card.position, operation.position,
+            Card.section_id == operation.section_id, Card.id != operation.id,
+        )
+        if new_board_id != board_id:
+            old_section_id = (await self.db.execute(select(Card.section_id).where(Card.id == operation.id))).scalar()
+        row = await self._returning_one(
+            update(Card)
+            .where(Card.id == operation.id, card_owned_by(self.customer_id))
+            .values(section_id=operation.section_id, board_id=new_board_id, position=position)
+            .returning(*CARD_COLUMNS),
+            "card",
+        )
+        if new_board_id != board_id:
+            self.owners[("card", row.id)] = (new_board_id, self.customer_id)
+            await record_change(self.db, board_id, "card", "delete", row.id, {"id": row.id, "section_id": old_section_id})
+            return row.id, await record_change(self.db, new_board_id, "card", "create", row.id, dict(row._mapping))
+        return row.id, await record_change(self.db, board_id, "card", "move", row.id, dict(row._mapping))
+
+    async def _create_section(self, operation: BatchOperation):
+        self._require_title(operation)
+        board_id = self._board_of("board", operation.board_id)
+        position = await self._position(Section.position, operation.position, Section.board_id == board_id)
+        row = await self._returning_one(
+            insert(Section)
+            .values(title=operation.title, board_id=board_id, position=position)
+            .returning(*SECTION_COLUMNS),
+            "section",
+        )
+        self.owners[("section", row.id)] = (board_id, self.customer_id)
+        return row.id, await record_change(self.db, board_id, "section", "create", row.id, dict(row._mapping))
+
+    async def _update_section(self, operation: BatchOperation):
+        self._require_title(operation)
+        board_id = self._board_of("section", operation.id)
+        row = await self._returning_one(
+            update(Section)
+            .where(Section.id == operation.id, *alive(Section))
+            .values(title=operation.title)
+            .returning(*SECTION_COLUMNS),
+            "section",
+        )
+        return row.id, await record_change(self.db, board_id, "section", "update", row.id, dict(row._mapping))
+
+    async def _delete_section(self, operation: BatchOperation):
+        board_id = self._board_of("section", operation.id)
+        # мягкое удаление, карточки секции исчезают вместе с ней (см. app.workers.purger)
+        row = await self._returning_one(
+            update(Section)
+            .where(Section.id == operation.id, *alive(Section))
+            .values(deleted_at=datetime.utcnow())
+            .returning(Section.id),
+            "section",
+        )
+        del self.owners[("section", row.id)]
+        return row.id, await record_change(self.db, board_id, "section", "delete", row.id, {"id": row.id})
+
+    async def _move_section(self, operation: BatchOperation):
+        board_id = self._board_of("section", operation.id)
+        position = await self._position(
+            Section.position, operation.position,
+            Section.board_id == board_id, Section.id != operation.id,
+        )
+        row = await self._returning_one(
+            update(Section)
+            .where(Section.id == operation.id, *alive(Section))
+            .values(position=position)
+            .returning(*SECTION_COLUMNS),
+            "section",
+        )
+        return row.id, await record_change(self.db, board_id, "section", "move", row.id, dict(row._mapping))
+
+
+def _error_result(index: int, exc: Exception) -> dict:
+    if isinstance(exc, HTTPException):
+        return {"status": exc.status_code, "detail": exc.detail}
+    # текст исключений базы и ключей порядка клиенту не отдаём, только в лог
+    logger.warning("batch operation %s failed", index, exc_info=exc)
+    if isinstance(exc, IntegrityError):
+        return {"status": status.HTTP_409_CONFLICT, "detail": "Constraint violation"}
+    if isinstance(exc, DBAPIError):
+        # DataError и т.п.: слишком длинный title, значение вне диапазона
+        return {"status": status.HTTP_422_UNPROCESSABLE_ENTITY, "detail": "Invalid value"}
+    # ValueError (в т.ч. ValidationError pydantic): невалидная позиция или поле
+    return {"status": status.HTTP_422_UNPROCESSABLE_ENTITY, "detail": "Invalid operation"}
+
+
+async def run_batch(
+    db: AsyncSession,
+    operations: list[BatchOperation],
+    customer_id: int,
+    continue_on_error: bool = False,
+) -> tuple[bool, list[dict]]:
+    """
+    Выполняет пакет в одной транзакции. По умолчанию всё или ничего: первая ошибка
+    откатывает весь пакет. С continue_on_error каждая операция идёт в своём SAVEPOINT.
+    Возвращает (закоммичено ли хоть что-то, результаты по операциям).
+    """
+    executor = BatchExecutor(db, customer_id, await resolve_owners(db, operations))
+    results = []
+
+    for index, operation in enumerate(operations):
+        events = db.info.setdefault("board_events", [])
+        events_before = len(events)
+        try:
+            if continue_on_error:
+                async with db.begin_nested():
+                    entity_id, version = await executor.execute(operation)
+            else:
+                entity_id, version = await executor.execute(operation)
+        except (HTTPException, DBAPIError, ValueError) as exc:
+            # события неудавшейся операции подписчикам не отправляем
+            del events[events_before:]
+            results.append({"index": index, "ok": False, **_error_result(index, exc)})
+            if not continue_on_error:
+                await db.rollback()
+                return False, results
+            continue
+
+        results.append({
+            "index": index,
+            "ok": True,
+            "status": status.HTTP_200_OK,
+            "entity_id": entity_id,
+            "version": version,
+        })
+
+    if not any(result["ok"] for result in results):
+        # в режиме continue_on_error упасть могли все операции
+        await db.rollback()
+        return False, results
+    await db.commit()
+    return True, results
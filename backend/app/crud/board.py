@@ -1,46 +1,177 @@
+from datetime import datetime
+
+from sqlalchemy import func, text, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 
-from app.domain import Board, Section
+from app.core import settings
+from app.core.snapshot_cache import SnapshotCache
+from app.crud import loaders
+from app.crud.access import alive, board_owned_by, raise_board_miss
+from app.crud.changes import record_change
+from app.domain import Board, Section, Card
 from app.domain.schemas import BoardCreate, BoardUpdate
-from fastapi import HTTPException, status
 
 
-async def get_board_with_sections(db: AsyncSession, board_id: int):
-    stmt = (
-        select(Board)
-        .where(Board.id == board_id)
-        .options(
-            selectinload(Board.sections)
-              .selectinload(Section.cards)
-        )
+board_snapshot_cache = SnapshotCache(
+    max_entries=settings.cache.snapshot_max_entries,
+    max_bytes=settings.cache.snapshot_max_bytes,
+)
+
+
+# Всё дерево доски собирается в Postgres одним запросом и приходит готовыми
+# UTF-8 байтами — без ORM-объектов и повторной валидации через Pydantic.
+# Форма ответа совпадает с schemas.BoardRead.
+BOARD_SNAPSHOT_SQL = text("""
+    SELECT
+        b.customer_id,
+        b.version,
+        convert_to(json_build_object(
+            'id', b.id,
+            'title', b.title,
+            'sections', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'id', s.id,
+                    'title', s.title,
+                    'position', s.position,
+                    'cards', COALESCE((
+                        SELECT json_agg(json_build_object(
+                            'id', c.id,
+                            'title', c.title,
+                            'position', c.position
+                        ) ORDER BY c.position, c.id)
+                        FROM cards c
+                        WHERE c.section_id = s.id AND c.deleted_at IS NULL
+                    ), '[]'::json)
+                ) ORDER BY s.position, s.id)
+                FROM sections s
+                WHERE s.board_id = b.id AND s.deleted_at IS NULL
+            ), '[]'::json)
+        )::text, 'UTF8') AS snapshot
+    FROM boards b
+    WHERE b.id = :board_id AND b.deleted_at IS NULL
+""")
+
+
+async def get_board_snapshot(db: AsyncSession, board_id: int):
+    """Возвращает (customer_id, version, json-байты доски) или None."""
+    result = await db.execute(BOARD_SNAPSHOT_SQL, {"board_id": board_id})
+    return result.one_or_none()
+
+
+async def get_board_version(db: AsyncSession, board_id: int):
+    """Возвращает (customer_id, version) или None — дешёвая проверка перед снимком."""
+    result = await db.execute(
+        select(Board.customer_id, Board.version).where(Board.id == board_id, *alive(Board))
     )
-    result = await db.execute(stmt)
-    return result.scalar_one_or_none()
+    return result.one_or_none()
 
 
-async def get_board(db: AsyncSession, board_id: int):
-    result = await db.execute(select(Board).filter(Board.id == board_id))
-    db_board = result.scalars().first()
-    return db_board
+async def get_board_snapshot_cached(db: AsyncSession, board_id: int, version: int) -> tuple[int, bytes] | None:
+    """
+    Снимок доски из LRU по (board_id, version), при промахе — из Postgres.
+    Возвращает (version, байты): версия берётся из того же запроса, что и снимок.
+    """
+    data = board_snapshot_cache.get(board_id, version)
+    if data is not None:
+        return version, data
 
+    snapshot = await get_board_snapshot(db, board_id)
+    if snapshot is None:
+        return None
+    board_snapshot_cache.put(board_id, snapshot.version, snapshot.snapshot)
+    return snapshot.version, snapshot.snapshot
 
-async def get_boards_for_user(db: AsyncSession, user_id: int):
+
+async def get_boards_fingerprint(db: AsyncSession, user_id: int) -> str:
+    """Хэш от (id, version) всех досок пользователя — меняется при любой записи в любую из них."""
+    result = await db.execute(
+        select(
+            func.md5(
+                func.coalesce(
+                    func.string_agg(
+                        func.concat(Board.id, ":", Board.version),
+                        aggregate_order_by(",", Board.id),
+                    ),
+                    "",
+                )
+            )
+        ).where(Board.customer_id == user_id, *alive(Board))
+    )
+    return result.scalar_one()
+
+
+async def get_boards_for_user(
+    db: AsyncSession,
+    user_id: int,
+    after_id: int | None = None,
+    limit: int | None = None,
+    template: bool | None = None,
+):
     stmt = (
         select(Board)
-        .where(Board.customer_id == user_id)
-        .options(
-            selectinload(Board.sections)
-                .selectinload(Section.cards)   # <-- и здесь!
-        )
+        .where(Board.customer_id == user_id, *alive(Board))
+        .order_by(Board.id)
+        .options(*loaders.BOARD_TREE)
     )
+    if template is not None:
+        stmt = stmt.where(Board.is_template == template)
+    if after_id is not None:
+        stmt = stmt.where(Board.id > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
     result = await db.execute(stmt)
     return result.scalars().all()
 
 
+async def get_board_summaries_for_user(
+    db: AsyncSession,
+    user_id: int,
+    after_id: int | None = None,
+    limit: int | None = None,
+    template: bool | None = None,
+):
+    """
+    Только id, title и счётчики — без загрузки секций и карточек.
+    Страницы отдаются по ключу (boards.id > after_id), без OFFSET.
+    """
+    section_count = (
+        select(func.count(Section.id))
+        .where(Section.board_id == Board.id, *alive(Section))
+        .correlate(Board)
+        .scalar_subquery()
+    )
+    card_count = (
+        select(func.count(Card.id))
+        .join(Section, Section.id == Card.section_id)
+        .where(Card.board_id == Board.id, *alive(Card, Section))
+        .correlate(Board)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            Board.id,
+            Board.title,
+            section_count.label("section_count"),
+            card_count.label("card_count"),
+            Board.is_template,
+        )
+        .where(Board.customer_id == user_id, *alive(Board))
+        .order_by(Board.id)
+    )
+    if template is not None:
+        stmt = stmt.where(Board.is_template == template)
+    if after_id is not None:
+        stmt = stmt.where(Board.id > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
 async def create_board(db: AsyncSession, board: BoardCreate, customer_id: int):
-    db_board = Board(title=board.title, customer_id=customer_id)
+    db_board = Board(title=board.title, customer_id=customer_id, is_template=board.is_template)
     db.add(db_board)
     await db.commit()
     await db.refresh(db_board)
@@ -48,29 +179,106 @@ async def create_board(db: AsyncSession, board: BoardCreate, customer_id: int):
 
 
 async def update_board(db: AsyncSession, board_id: int, board: BoardUpdate, customer_id: int):
-    db_board = await get_board(db, board_id)
-    if not db_board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    values = board.model_dump(exclude_none=True)
+    res = await db.execute(
+        update(Board)
+        .where(Board.id == board_id, board_owned_by(customer_id))
+        .values(**values)
+        .returning(Board.id, Board.title)
+        .execution_options(synchronize_session=False)
+    )
+    db_board = res.one_or_none()
+    if db_board is None:
+        await raise_board_miss(db, board_id, customer_id)
+
+    await record_change(db, board_id, "board", "update", board_id, {"id": board_id, **values})
+    await db.commit()
+    return db_board
+
+
+# Копия доски целиком в одном запросе. Новые id секций выдаются заранее через
+# nextval в CTE section_map — это и есть отображение старый id -> новый,
+# по которому карточки попадают в свои секции. Строки в Python не проходят.
+CLONE_BOARD_SQL = text("""
+    WITH source AS (
+        SELECT id, title
+        FROM boards
+        WHERE id = :board_id AND customer_id = :customer_id AND deleted_at IS NULL
+    ), new_board AS (
+        INSERT INTO boards (title, customer_id, version, is_template)
+        SELECT coalesce(:title, source.title), :customer_id, 0, :is_template
+        FROM source
+        RETURNING id, title, is_template
+    ), section_map AS (
+        SELECT s.id AS old_id,
+               nextval(pg_get_serial_sequence('sections', 'id')) AS new_id,
+               s.title,
+               s.position
+        FROM sections s
+        JOIN source ON s.board_id = source.id
+        WHERE s.deleted_at IS NULL
+    ), new_sections AS (
+        INSERT INTO sections (id, title, position, board_id)
+        SELECT section_map.new_id, section_map.title, section_map.position, new_board.id
+        FROM section_map, new_board
+        RETURNING id
+    ), new_cards AS (
+        INSERT INTO cards (title, description, position, section_id, board_id)
+        SELECT c.title, c.description, c.position, section_map.new_id, new_board.id
+        FROM cards c
+        JOIN section_map ON section_map.old_id = c.section_id
+        CROSS JOIN new_board
+        WHERE c.deleted_at IS NULL
+        RETURNING id
+    )
+    SELECT
+        new_board.id,
+        new_board.title,
+        (SELECT count(*) FROM new_sections) AS section_count,
+        (SELECT count(*) FROM new_cards) AS card_count,
+        new_board.is_template
+    FROM new_board
+""")
 
-    if db_board.customer_id != customer_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="You do not have permission to edit this board")
 
-    db_board.title = board.title
+async def clone_board(
+    db: AsyncSession,
+    board_id: int,
+    customer_id: int,
+    title: str | None = None,
+    is_template: bool = False,
+):
+    """Копирует доску пользователя со всеми секциями и карточками; возвращает строку как BoardSummary."""
+    result = await db.execute(CLONE_BOARD_SQL, {
+        "board_id": board_id,
+        "customer_id": customer_id,
+        "title": title,
+        "is_template": is_template,
+    })
+    db_board = result.one_or_none()
+    if db_board is None:
+        await raise_board_miss(db, board_id, customer_id)
+
     await db.commit()
-    await db.refresh(db_board)
     return db_board
 
 
 async def delete_board(db: AsyncSession, board_id: int, customer_id: int):
-    db_board = await get_board(db, board_id)
-    if not db_board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
-
-    if db_board.customer_id != customer_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="You do not have permission to delete this board")
+    """
+    Мягкое удаление: одна строка boards, сколько бы ни было секций и карточек.
+    Дерево становится невидимым сразу, физически его удаляет app.workers.purger.
+    """
+    res = await db.execute(
+        update(Board)
+        .where(Board.id == board_id, board_owned_by(customer_id))
+        .values(deleted_at=datetime.utcnow())
+        .returning(Board.id, Board.title)
+        .execution_options(synchronize_session=False)
+    )
+    db_board = res.one_or_none()
+    if db_board is None:
+        await raise_board_miss(db, board_id, customer_id)
 
-    await db.delete(db_board)
+    await record_change(db, board_id, "board", "delete", board_id, {"id": board_id})
     await db.commit()
     return db_board
@@ -1,82 +1,90 @@
+from datetime import datetime
+
+from sqlalchemy import insert, literal, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from fastapi import HTTPException, status
 
+from app.crud.access import alive, card_access, card_owned_by, section_owned_by, raise_card_miss, raise_section_miss
+from app.crud.changes import record_change, card_payload
+from app.crud.ordering import key_for_index, last_key, key_between
 from app.domain import Card, Section
 from app.domain.schemas import CardCreate, CardUpdate
 
-async def get_card(db: AsyncSession, card_id: int) -> Card | None:
-    stmt = (
-        select(Card)
-        .options(selectinload(Card.section).selectinload(Section.board))
-        .where(Card.id == card_id)
-    )
-    res = await db.execute(stmt)
-    return res.scalars().first()
+
+# всё, что нужно ответу и журналу изменений, — без загрузки связей
+CARD_COLUMNS = (Card.id, Card.title, Card.description, Card.position, Card.section_id, Card.board_id)
+
 
 async def create_card(
     db: AsyncSession,
     section_id: int,
     card_in: CardCreate,
     customer_id: int
-) -> Card:
-    res = await db.execute(
-        select(Section).options(selectinload(Section.board)).where(Section.id == section_id)
-    )
-    section = res.scalars().first()
-    if not section:
-        raise HTTPException(status_code=404, detail="Section not found")
-    if section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+):
+    pos = key_between(await last_key(db, Card.position, Card.section_id == section_id, *alive(Card)), None)
 
-    last = await db.execute(
-        select(Card).where(Card.section_id == section_id).order_by(Card.position.desc())
+    # INSERT ... SELECT: строка появится, только если секция принадлежит пользователю
+    source = (
+        select(
+            literal(card_in.title),
+            Section.id,
+            Section.board_id,
+            literal(pos),
+        )
+        .where(Section.id == section_id, section_owned_by(customer_id))
     )
-    last_card = last.scalars().first()
-    pos = (last_card.position + 1) if last_card else 0
-
-    db_card = Card(
-        title=card_in.title,
-        section_id=section_id,
-        position=pos
+    res = await db.execute(
+        insert(Card)
+        .from_select(["title", "section_id", "board_id", "position"], source)
+        .returning(*CARD_COLUMNS)
     )
-    db.add(db_card)
+    card = res.one_or_none()
+    if card is None:
+        await raise_section_miss(db, section_id, customer_id)
+
+    await record_change(db, card.board_id, "card", "create", card.id, card_payload(card))
     await db.commit()
-    await db.refresh(db_card)
-    return db_card
+    return card
 
 async def update_card(
     db: AsyncSession,
     card_id: int,
     card_in: CardUpdate,
     customer_id: int
-) -> Card:
-    card = await get_card(db, card_id)
-    if not card:
-        raise HTTPException(status_code=404, detail="Card not found")
-    if card.section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-    card.title = card_in.title
-    card.description = card_in.description  # ← если ты используешь поле description в модели
+):
+    res = await db.execute(
+        update(Card)
+        .where(Card.id == card_id, card_owned_by(customer_id))
+        .values(title=card_in.title, description=card_in.description)
+        .returning(*CARD_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    card = res.one_or_none()
+    if card is None:
+        await raise_card_miss(db, card_id, customer_id)
 
+    await record_change(db, card.board_id, "card", "update", card.id, card_payload(card))
     await db.commit()
-    await db.refresh(card)
     return card
 
 async def delete_card(
     db: AsyncSession,
     card_id: int,
     customer_id: int
-) -> Card:
-    card = await get_card(db, card_id)
-    if not card:
-        raise HTTPException(status_code=404, detail="Card not found")
-    if card.section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+):
+    # мягкое удаление; строку позже удалит app.workers.purger
+    res = await db.execute(
+        update(Card)
+        .where(Card.id == card_id, card_owned_by(customer_id))
+        .values(deleted_at=datetime.utcnow())
+        .returning(*CARD_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    card = res.one_or_none()
+    if card is None:
+        await raise_card_miss(db, card_id, customer_id)
 
-    await db.delete(card)
+    await record_change(db, card.board_id, "card", "delete", card.id, {"id": card.id, "section_id": card.section_id})
     await db.commit()
     return card
 
@@ -84,17 +92,43 @@ async def move_card(
     db: AsyncSession,
     card_id: int,
     new_section_id: int,
-    new_position: int,
+    index: int,
     customer_id: int
-) -> Card:
-    card = await get_card(db, card_id)
-    if not card:
-        raise HTTPException(status_code=404, detail="Card not found")
-    if card.section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+):
+    # пишем только саму карточку: ключ между будущими соседями
+    position = await key_for_index(
+        db, Card.position, index,
+        Card.section_id == new_section_id, Card.id != card_id, *alive(Card),
+    )
+
+    # old — та же строка до изменения: из RETURNING узнаём, откуда карточка уехала
+    old = Card.__table__.alias("old")
+    target = (
+        select(Section.board_id)
+        .where(Section.id == new_section_id, section_owned_by(customer_id))
+        .scalar_subquery()
+    )
+    res = await db.execute(
+        update(Card)
+        .where(
+            Card.id == card_id,
+            old.c.id == Card.id,
+            card_owned_by(customer_id),
+            target.is_not(None),
+        )
+        .values(section_id=new_section_id, board_id=target, position=position)
+        .returning(*CARD_COLUMNS, old.c.board_id.label("old_board_id"), old.c.section_id.label("old_section_id"))
+        .execution_options(synchronize_session=False)
+    )
+    card = res.one_or_none()
+    if card is None:
+        await card_access(db, card_id, customer_id)
+        await raise_section_miss(db, new_section_id, customer_id)
 
-    card.section_id = new_section_id
-    card.position = new_position
+    if card.board_id != card.old_board_id:
+        await record_change(db, card.old_board_id, "card", "delete", card.id, {"id": card.id, "section_id": card.old_section_id})
+        await record_change(db, card.board_id, "card", "create", card.id, card_payload(card))
+    else:
+        await record_change(db, card.board_id, "card", "move", card.id, card_payload(card))
     await db.commit()
-    await db.refresh(card)
     return card
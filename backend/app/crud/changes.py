@@ -0,0 +1,99 @@
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import settings
+from app.domain import Board, BoardChange, Card, Section
+
+
+def card_payload(card: Card) -> dict:
+    return {
+        "id": card.id,
+        "title": card.title,
+        "description": card.description,
+        "position": card.position,
+        "section_id": card.section_id,
+    }
+
+
+def section_payload(section: Section) -> dict:
+    return {
+        "id": section.id,
+        "title": section.title,
+        "position": section.position,
+        "board_id": section.board_id,
+    }
+
+
+async def bump_board_version(db: AsyncSession, board_id: int) -> int:
+    """Увеличивает версию доски в текущей транзакции и возвращает новое значение."""
+    result = await db.execute(
+        update(Board)
+        .where(Board.id == board_id)
+        .values(version=Board.version + 1)
+        .returning(Board.version)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one()
+
+
+async def record_change(
+    db: AsyncSession,
+    board_id: int,
+    entity: str,
+    op: str,
+    entity_id: int,
+    payload: dict | None = None,
+) -> int:
+    """
+    Поднимает версию доски и пишет запись в журнал в той же транзакции.
+    Все изменения доски должны идти через эту функцию, иначе в журнале будут дыры.
+    """
+    version = await bump_board_version(db, board_id)
+    db.add(BoardChange(
+        board_id=board_id,
+        version=version,
+        entity=entity,
+        entity_id=entity_id,
+        op=op,
+        payload=payload,
+    ))
+
+    # разошлём подписчикам после коммита (см. app.realtime.hub)
+    db.info.setdefault("board_events", []).append({
+        "board_id": board_id,
+        "v": version,
+        "entity": entity,
+        "op": op,
+        "id": entity_id,
+        "payload": payload,
+    })
+
+    if version % settings.changelog.compact_every == 0:
+        await compact_changes(db, board_id, version)
+
+    return version
+
+
+async def compact_changes(db: AsyncSession, board_id: int, version: int):
+    """Оставляет в журнале только последние settings.changelog.retain изменений доски."""
+    await db.execute(
+        delete(BoardChange)
+        .where(
+            BoardChange.board_id == board_id,
+            BoardChange.version <= version - settings.changelog.retain,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_changes_since(db: AsyncSession, board_id: int, since: int, limit: int):
+    result = await db.execute(
+        select(BoardChange)
+        .where(BoardChange.board_id == board_id, BoardChange.version > since)
+        # версия уникальна в пределах доски (каждая запись поднимает boards.version),
+        # поэтому порядок целиком приходит из ix_board_changes_board_id_version
+        .order_by(BoardChange.version)
+        .limit(limit)
+    )
+    return result.scalars().all()
@@ -0,0 +1,112 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.db import db_helper
+from app.crud.access import alive
+from app.domain import Board, Card, Section
+
+
+EXPORT_BATCH_SIZE = 500
+
+CSV_COLUMNS = ("type", "id", "section_id", "title", "description", "position")
+
+
+async def get_board_header(db: AsyncSession, board_id: int):
+    """(id, title, customer_id) одним запросом по колонкам, без ORM-объекта."""
+    result = await db.execute(
+        select(Board.id, Board.title, Board.customer_id).where(Board.id == board_id, *alive(Board))
+    )
+    return result.one_or_none()
+
+
+async def iter_board_rows(board_id: int) -> AsyncIterator[list[dict]]:
+    """
+    Секции и карточки доски пачками, в порядке позиций.
+    Читаем серверным курсором через AsyncSession.stream(), поэтому память
+    не зависит от размера доски. Сессия своя (читающая, как и у роута):
+    StreamingResponse отдаёт тело уже после того, как закрылась сессия из Depends.
+    """
+    stmt = (
+        select(
+            Section.id.label("section_id"),
+            Section.title.label("section_title"),
+            Section.position.label("section_position"),
+            Card.id.label("card_id"),
+            Card.title.label("card_title"),
+            Card.description.label("card_description"),
+            Card.position.label("card_position"),
+        )
+        .outerjoin(Card, and_(Card.section_id == Section.id, *alive(Card)))
+        .where(Section.board_id == board_id, *alive(Section))
+        .order_by(Section.position, Section.id, Card.position, Card.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    current_section = None
+    async with db_helper.read_session_factory() as session:
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            batch = []
+            for row in partition:
+                if row.section_id != current_section:
+                    current_section = row.section_id
+                    batch.append({
+                        "type": "section",
+                        "id": row.section_id,
+                        "section_id": None,
+                        "title": row.section_title,
+                        "description": None,
+                        "position": row.section_position,
+                    })
+                if row.card_id is not None:
+                    batch.append({
+                        "type": "card",
+                        "id": row.card_id,
+                        "section_id": row.section_id,
+                        "title": row.card_title,
+                        "description": row.card_description,
+                        "position": row.card_position,
+                    })
+            yield batch
+
+
+def _encode_ndjson(batch: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(item) + b"\n" for item in batch)
+
+
+def _encode_csv(batch: list[dict]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writerows(batch)
+    return buffer.getvalue().encode()
+
+
+async def stream_board_export(board: dict, fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    """Тело выгрузки: NDJSON или CSV, опционально gzip, кусками по одной пачке строк."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == "csv":
+        encode = _encode_csv
+        head = ",".join(CSV_COLUMNS).encode() + b"\r\n"
+    else:
+        encode = _encode_ndjson
+        head = orjson.dumps({"type": "board", **board}) + b"\n"
+
+    yield emit(head)
+    async for batch in iter_board_rows(board["id"]):
+        chunk = emit(encode(batch))
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
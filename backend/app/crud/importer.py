@@ -0,0 +1,461 @@
+"""
+Массовый импорт доски из экспорта Trello (JSON) или CSV.
+
+Файл разбирается потоково, строки пачками уходят через asyncpg COPY во
+временные таблицы (ON COMMIT DROP), затем тремя INSERT ... SELECT переносятся
+в boards/sections/cards. Ключи порядка тоже заливаются COPY и назначаются
+в SQL через row_number(), поэтому память не зависит от размера доски.
+"""
+import codecs
+import csv
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.ordering import key_between
+from app.domain import Board
+
+logger = logging.getLogger(__name__)
+
+
+IMPORT_BATCH_SIZE = 5000
+
+# один элемент JSON (список или карточка) не может быть больше этого
+MAX_PENDING_CHARS = 16 * 1024 * 1024
+
+TITLE_LENGTH = 255
+
+DEFAULT_TITLE = "Imported board"
+
+CSV_FIELDS = {
+    "section": ("section", "list", "list name"),
+    "title": ("title", "name", "card name"),
+    "description": ("description", "desc", "card description"),
+    "archived": ("archived", "closed"),
+}
+
+STAGING_DDL = (
+    """
+    CREATE TEMP TABLE import_sections (
+        ext_id text, title text, ord float8, seq int, section_id int
+    ) ON COMMIT DROP
+    """,
+    """
+    CREATE TEMP TABLE import_cards (
+        ext_section_id text, title text, description text, ord float8, seq int
+    ) ON COMMIT DROP
+    """,
+    "CREATE TEMP TABLE import_keys (idx int PRIMARY KEY, key text) ON COMMIT DROP",
+)
+
+# сколько ключей нужно: максимум из числа секций и числа карточек в самой большой секции
+KEYS_NEEDED_SQL = text("""
+    SELECT greatest(
+        (SELECT count(*) FROM import_sections),
+        (SELECT coalesce(max(n), 0) FROM (
+            SELECT count(*) AS n FROM import_cards GROUP BY ext_section_id
+        ) AS per_section)
+    )
+""")
+
+MERGE_SECTIONS_SQL = text("""
+    WITH ranked AS (
+        SELECT seq, title, row_number() OVER (ORDER BY ord, seq) AS idx
+        FROM import_sections
+    ), inserted AS (
+        INSERT INTO sections (title, board_id, position)
+        SELECT ranked.title, :board_id, k.key
+        FROM ranked JOIN import_keys AS k ON k.idx = ranked.idx
+        RETURNING id, position
+    )
+    UPDATE import_sections AS s SET section_id = inserted.id
+    FROM inserted
+    JOIN import_keys AS k ON k.key = inserted.position
+    JOIN ranked ON ranked.idx = k.idx
+    WHERE s.seq = ranked.seq
+""")
+
+MERGE_CARDS_SQL = text("""
+    INSERT INTO cards (title, description, section_id, board_id, position)
+    SELECT c.title, c.description, s.section_id, :board_id, k.key
+    FROM (
+        SELECT ext_section_id, title, description,
+               row_number() OVER (PARTITION BY ext_section_id ORDER BY ord, seq) AS idx
+        FROM import_cards
+    ) AS c
+    JOIN import_sections AS s ON s.ext_id = c.ext_section_id
+    JOIN import_keys AS k ON k.idx = c.idx
+""")
+
+
+_INCOMPLETE = object()
+
+
+def _bad_input(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+def _title(value) -> str:
+    return str(value or "")[:TITLE_LENGTH]
+
+
+class TrelloJsonReader:
+    """
+    Потоковый разбор экспорта Trello. Верхний объект читается по ключам,
+    любые массивы (lists, cards, а также огромный actions) — поэлементно,
+    так что в буфере не больше одного элемента.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self.title = None
+        self.skipped = 0
+        # последний корректный pos в каждом списке (и среди самих списков)
+        self._last_pos: dict[str | None, float] = {}
+
+    def feed(self, chunk: str) -> list[tuple]:
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        events = []
+        while self._step(events):
+            pass
+        if len(self._buffer) - self._pos > MAX_PENDING_CHARS:
+            raise _bad_input("Malformed Trello export")
+        return events
+
+    def close(self) -> list[tuple]:
+        if self._state != "end":
+            raise _bad_input("Malformed or truncated Trello export")
+        return []
+
+    def _has_input(self) -> bool:
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode(self):
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            return _INCOMPLETE
+        # число на границе куска могло оборваться — ждём следующий символ
+        if end >= len(self._buffer):
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+    def _step(self, events: list) -> bool:
+        if not self._has_input():
+            return False
+        char = self._buffer[self._pos]
+
+        if self._state == "start":
+            if char != "{":
+                raise _bad_input("Trello export must be a JSON object")
+            self._pos += 1
+            self._state = "key"
+        elif self._state == "key":
+            if char in ",}":
+                self._pos += 1
+                if char == "}":
+                    self._state = "end"
+                return True
+            key = self._decode()
+            if key is _INCOMPLETE:
+                return False
+            self._key = key
+            self._state = "colon"
+        elif self._state == "colon":
+            if char != ":":
+                raise _bad_input("Malformed Trello export")
+            self._pos += 1
+            self._state = "value"
+        elif self._state == "value":
+            if char == "[":
+                self._pos += 1
+                self._state = "array"
+                return True
+            value = self._decode()
+            if value is _INCOMPLETE:
+                return False
+            if self._key == "name":
+                self.title = value
+            self._state = "key"
+        elif self._state == "array":
+            if char in ",]":
+                self._pos += 1
+                if char == "]":
+                    self._state = "key"
+                return True
+            item = self._decode()
+            if item is _INCOMPLETE:
+                return False
+            self._emit(item, events)
+        else:
+            raise _bad_input("Unexpected data after Trello export")
+        return True
+
+    def _position(self, value, parent: str | None) -> float:
+        """
+        pos Trello — число; нечисловой ("bottom") или бесконечный pos заменяется
+        предыдущим корректным в том же списке, и элемент встаёт за ним по порядку в файле.
+        """
+        try:
+            pos = float(value or 0)
+        except (TypeError, ValueError):
+            pos = None
+        if pos is None or not math.isfinite(pos):
+            return self._last_pos.get(parent, 0.0)
+        self._last_pos[parent] = pos
+        return pos
+
+    def _emit(self, item, events: list):
+        if self._key not in ("lists", "cards") or not isinstance(item, dict):
+            return
+        if item.get("closed"):
+            self.skipped += self._key == "cards"
+            return
+        if self._key == "lists":
+            events.append(("section", (
+                str(item.get("id")),
+                _title(item.get("name")),
+                self._position(item.get("pos"), None),
+            )))
+        else:
+            list_id = str(item.get("idList"))
+            events.append(("card", (
+                list_id,
+                _title(item.get("name")),
+                str(item["desc"]) if item.get("desc") else None,
+                self._position(item.get("pos"), list_id),
+            )))
+
+
+class CsvReader:
+    """
+    Потоковый разбор CSV (в том числе CSV-экспорта Trello). Секция — по имени
+    списка, порядок — порядок строк. Многострочные поля в кавычках собираются
+    по чётности кавычек, прежде чем запись уйдёт в csv.reader.
+    """
+
+    def __init__(self):
+        self._tail = ""
+        self._record = ""
+        self._quotes = 0
+        self._columns = None
+        self._sections = set()
+        self._row = 0
+        self.title = None
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> list[tuple]:
+        lines = (self._tail + chunk).split("\n")
+        self._tail = lines.pop()
+        records = []
+        for line in lines:
+            self._record += line + "\n"
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append(self._record)
+                self._record, self._quotes = "", 0
+        if len(self._record) + len(self._tail) > MAX_PENDING_CHARS:
+            raise _bad_input("Malformed CSV: unterminated quoted field")
+        return self._parse(records)
+
+    def close(self) -> list[tuple]:
+        rest = self._record + self._tail
+        self._record = self._tail = ""
+        return self._parse([rest]) if rest.strip() else []
+
+    def _parse(self, records: list[str]) -> list[tuple]:
+        events = []
+        for row in csv.reader(records):
+            if not row:
+                continue
+            if self._columns is None:
+                self._columns = self._map_header(row)
+                continue
+            events.extend(self._emit(row))
+        return events
+
+    @staticmethod
+    def _map_header(row: list[str]) -> dict[str, int]:
+        header = [name.strip().lower() for name in row]
+        columns = {}
+        for field, aliases in CSV_FIELDS.items():
+            for index, name in enumerate(header):
+                if name in aliases:
+                    columns[field] = index
+                    break
+        if "section" not in columns or "title" not in columns:
+            raise _bad_input("CSV header must contain section/list and title/name columns")
+        return columns
+
+    def _emit(self, row: list[str]) -> Iterator[tuple]:
+        def get(field):
+            index = self._columns.get(field)
+            return row[index] if index is not None and index < len(row) else None
+
+        if (get("archived") or "").strip().lower() in ("true", "1", "yes"):
+            self.skipped += 1
+            return
+        self._row += 1
+        section = _title(get("section"))
+        if section not in self._sections:
+            self._sections.add(section)
+            yield "section", (section, section, float(self._row))
+        yield "card", (section, _title(get("title")), get("description") or None, float(self._row))
+
+
+READERS = {"trello": TrelloJsonReader, "csv": CsvReader}
+
+
+@dataclass
+class ImportProgress:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class BoardImporter:
+    """Копит разобранные строки пачками по IMPORT_BATCH_SIZE и льёт их COPY во временные таблицы."""
+
+    def __init__(self, db: AsyncSession, on_progress: Callable[[ImportProgress], None] | None = None):
+        self.db = db
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.cards = 0
+        self.sections = 0
+        self._buffers = {"section": [], "card": []}
+        self._copy = None
+
+    async def start(self):
+        # DDL через сессию открывает транзакцию; COPY идёт в ней же напрямую через asyncpg
+        for ddl in STAGING_DDL:
+            await self.db.execute(text(ddl))
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        self._copy = raw.driver_connection.copy_records_to_table
+
+    async def add(self, events: list[tuple]):
+        for kind, record in events:
+            buffer = self._buffers[kind]
+            buffer.append((*record, self.rows))
+            self.rows += 1
+            if len(buffer) >= IMPORT_BATCH_SIZE:
+                await self._flush(kind)
+
+    async def _flush(self, kind: str):
+        buffer = self._buffers[kind]
+        if not buffer:
+            return
+        if kind == "section":
+            await self._copy("import_sections", records=buffer,
+                             columns=["ext_id", "title", "ord", "seq"])
+            self.sections += len(buffer)
+        else:
+            await self._copy("import_cards", records=buffer,
+                             columns=["ext_section_id", "title", "description", "ord", "seq"])
+            self.cards += len(buffer)
+        buffer.clear()
+
+        progress = self.progress()
+        logger.info("import: staged %s rows, %.0f rows/s", progress.rows, progress.rows_per_second)
+        if self.on_progress:
+            self.on_progress(progress)
+
+    def progress(self) -> ImportProgress:
+        return ImportProgress(rows=self.sections + self.cards, seconds=time.perf_counter() - self.started)
+
+    async def _load_keys(self):
+        needed = (await self.db.execute(KEYS_NEEDED_SQL)).scalar_one()
+        # те же ключи, что keys_between(None, None, n), но без списка в памяти
+        batch, key = [], None
+        for idx in range(1, needed + 1):
+            key = key_between(key, None)
+            batch.append((idx, key))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._copy("import_keys", records=batch, columns=["idx", "key"])
+                batch = []
+        if batch:
+            await self._copy("import_keys", records=batch, columns=["idx", "key"])
+
+    async def finish(self, title: str, customer_id: int) -> dict:
+        await self._flush("section")
+        await self._flush("card")
+        await self._load_keys()
+        # у временных таблиц нет статистики автоанализа, а от неё зависит план слияния
+        await self.db.execute(text("ANALYZE import_sections, import_cards, import_keys"))
+
+        board_id = (await self.db.execute(
+            insert(Board).values(title=_title(title), customer_id=customer_id).returning(Board.id)
+        )).scalar_one()
+        await self.db.execute(MERGE_SECTIONS_SQL, {"board_id": board_id})
+        cards = (await self.db.execute(MERGE_CARDS_SQL, {"board_id": board_id})).rowcount
+        await self.db.commit()
+
+        progress = self.progress()
+        return {
+            "id": board_id,
+            "title": _title(title),
+            "sections": self.sections,
+            "cards": cards,
+            # карточки без (активного) списка
+            "skipped": self.cards - cards,
+            "seconds": round(progress.seconds, 3),
+            "rows_per_second": round(progress.rows_per_second, 1),
+        }
+
+
+async def limit_size(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Обрывает поток с 413, как только он превысил max_bytes (Content-Length может и не быть)."""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Import is larger than {max_bytes} bytes",
+            )
+        yield chunk
+
+
+async def import_board(
+    db: AsyncSession,
+    customer_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    title: str | None = None,
+    on_progress: Callable[[ImportProgress], None] | None = None,
+) -> dict:
+    """Создаёт доску пользователя из потока байтов экспорта; одна транзакция на весь импорт."""
+    reader = READERS[fmt]()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    importer = BoardImporter(db, on_progress)
+    await importer.start()
+
+    async for chunk in chunks:
+        await importer.add(reader.feed(decoder.decode(chunk)))
+    await importer.add(reader.feed(decoder.decode(b"", final=True)))
+    await importer.add(reader.close())
+
+    result = await importer.finish(title or reader.title or DEFAULT_TITLE, customer_id)
+    result["skipped"] += reader.skipped
+    return result
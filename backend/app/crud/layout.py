@@ -0,0 +1,106 @@
+from sqlalchemy import Integer, String, column, or_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi import HTTPException, status
+
+from app.crud.access import alive
+from app.crud.board import get_board_version
+from app.crud.changes import record_change
+from app.crud.ordering import keys_between
+from app.domain import Card, Section
+from app.domain.schemas import BoardLayout
+
+
+def _merge_order(listed: list[int], current: list[int]) -> list[int]:
+    """Перечисленные id в заданном порядке, остальные текущие — следом, в прежнем порядке."""
+    seen = set(listed)
+    return listed + [item_id for item_id in current if item_id not in seen]
+
+
+async def apply_board_layout(db: AsyncSession, board_id: int, layout: BoardLayout, customer_id: int) -> int:
+    """
+    Применяет порядок секций и карточек доски: одна проверка владельца,
+    по одному UPDATE ... FROM (VALUES ...) на таблицу, один коммит.
+    Возвращает новую версию доски.
+    """
+    db_board = await get_board_version(db, board_id)
+    if not db_board:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    if db_board.customer_id != customer_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="You do not have permission to edit this board")
+
+    result = await db.execute(
+        select(Section.id)
+        .where(Section.board_id == board_id, *alive(Section))
+        .order_by(Section.position, Section.id)
+    )
+    board_sections = result.scalars().all()
+    board_section_set = set(board_sections)
+
+    referenced_sections = set(layout.sections or []) | set(layout.cards)
+    if not referenced_sections <= board_section_set:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
+
+    section_keys: dict[int, str] = {}
+    if layout.sections is not None:
+        order = _merge_order(layout.sections, board_sections)
+        section_keys = dict(zip(order, keys_between(None, None, len(order))))
+
+    card_keys: dict[int, tuple[int, str]] = {}
+    if layout.cards:
+        listed_cards = [card_id for card_ids in layout.cards.values() for card_id in card_ids]
+        if len(listed_cards) != len(set(listed_cards)):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Card listed more than once")
+
+        # текущие карточки затронутых секций плюс карточки, переезжающие из других секций доски;
+        # OR собирается из двух bitmap-сканов, порядок которых индекс не даёт, — сортируем здесь
+        result = await db.execute(
+            select(Card.id, Card.section_id, Card.position)
+            .where(
+                Card.board_id == board_id,
+                Card.section_id.in_(board_sections),
+                or_(Card.section_id.in_(list(layout.cards)), Card.id.in_(listed_cards)),
+                *alive(Card),
+            )
+        )
+        rows = sorted(result.all(), key=lambda row: (row.section_id, row.position, row.id))
+        if not set(listed_cards) <= {row.id for row in rows}:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card not found")
+
+        listed_set = set(listed_cards)
+        for section_id, card_ids in layout.cards.items():
+            current = [row.id for row in rows if row.section_id == section_id and row.id not in listed_set]
+            order = card_ids + current
+            for card_id, key in zip(order, keys_between(None, None, len(order))):
+                card_keys[card_id] = (section_id, key)
+
+    if section_keys:
+        new_positions = values(
+            column("id", Integer), column("position", String), name="new_positions"
+        ).data(list(section_keys.items()))
+        await db.execute(
+            update(Section)
+            .where(Section.id == new_positions.c.id)
+            .values(position=new_positions.c.position)
+            .execution_options(synchronize_session=False)
+        )
+
+    if card_keys:
+        new_positions = values(
+            column("id", Integer), column("section_id", Integer), column("position", String),
+            name="new_positions",
+        ).data([(card_id, section_id, key) for card_id, (section_id, key) in card_keys.items()])
+        await db.execute(
+            update(Card)
+            .where(Card.id == new_positions.c.id)
+            .values(section_id=new_positions.c.section_id, position=new_positions.c.position)
+            .execution_options(synchronize_session=False)
+        )
+
+    version = await record_change(db, board_id, "board", "layout", board_id, {
+        "sections": {str(section_id): key for section_id, key in section_keys.items()},
+        "cards": {str(card_id): [section_id, key] for card_id, (section_id, key) in card_keys.items()},
+    })
+    await db.commit()
+    return version
@@ -0,0 +1,19 @@
+"""
+Именованные профили загрузки связей.
+По умолчанию все relationship в моделях lazy="raise": любой неявный запрос
+за связью — ошибка, а не тихий SELECT. Функция CRUD, которой нужны связи,
+явно берёт профиль ниже. Карточки, секции и запись доски профилей
+не требуют: они пишут и читают колонки через UPDATE/INSERT ... RETURNING.
+
+Коллекции в профилях сразу отфильтрованы от мягко удалённых строк.
+"""
+from sqlalchemy.orm import selectinload
+
+from app.domain import Board, Card, Section
+
+
+# доска целиком: секции и их карточки (GET /boards?view=full)
+BOARD_TREE = (
+    selectinload(Board.sections.and_(Section.deleted_at.is_(None)))
+    .selectinload(Section.cards.and_(Card.deleted_at.is_(None))),
+)
@@ -0,0 +1,213 @@
+"""
+Дробные (лексикографические) ключи порядка для карточек и секций.
+
+Ключ — строка из base62-цифр: «целая часть» переменной длины (первый символ
+кодирует её длину) плюс дробная часть. Между любыми двумя ключами всегда есть
+третий, поэтому перемещение пишет ровно одну строку и не трогает соседей.
+Сравнение строк побайтовое — колонки объявлены с COLLATE "C".
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ZERO = DIGITS[0]
+SMALLEST_INTEGER = "A" + ZERO * 26
+
+
+def _midpoint(a: str, b: str | None) -> str:
+    """Дробная часть строго между a и b (b=None — бесконечность)."""
+    if b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+    if a[-1:] == ZERO or (b and b[-1:] == ZERO):
+        raise ValueError("trailing zero")
+
+    if b:
+        n = 0
+        while (a[n] if n < len(a) else ZERO) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[round((digit_a + digit_b) / 2)]
+    if b and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"invalid order key head: {head!r}")
+
+
+def _integer_part(key: str) -> str:
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"invalid order key: {key!r}")
+    return key[:length]
+
+
+def _validate(key: str):
+    if key == SMALLEST_INTEGER:
+        raise ValueError(f"invalid order key: {key!r}")
+    integer = _integer_part(key)
+    if key[len(integer):][-1:] == ZERO:
+        raise ValueError(f"invalid order key: {key!r}")
+
+
+def _increment_integer(x: str) -> str | None:
+    head, digits = x[0], list(x[1:])
+    carry = True
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) + 1
+        if d == len(DIGITS):
+            digits[i] = ZERO
+        else:
+            digits[i] = DIGITS[d]
+            carry = False
+            break
+
+    if carry:
+        if head == "Z":
+            return "a" + ZERO
+        if head == "z":
+            return None
+        head = chr(ord(head) + 1)
+        if head > "a":
+            digits.append(ZERO)
+        else:
+            digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(x: str) -> str | None:
+    head, digits = x[0], list(x[1:])
+    borrow = True
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) - 1
+        if d == -1:
+            digits[i] = DIGITS[-1]
+        else:
+            digits[i] = DIGITS[d]
+            borrow = False
+            break
+
+    if borrow:
+        if head == "a":
+            return "Z" + DIGITS[-1]
+        if head == "A":
+            return None
+        head = chr(ord(head) - 1)
+        if head < "Z":
+            digits.append(DIGITS[-1])
+        else:
+            digits.pop()
+    return head + "".join(digits)
+
+
+def key_between(a: str | None, b: str | None) -> str:
+    """Ключ строго между a и b; None — начало или конец списка."""
+    if a is not None:
+        _validate(a)
+    if b is not None:
+        _validate(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+
+    if a is None:
+        if b is None:
+            return "a" + ZERO
+        integer_b = _integer_part(b)
+        fraction_b = b[len(integer_b):]
+        if integer_b == SMALLEST_INTEGER:
+            return integer_b + _midpoint("", fraction_b)
+        if integer_b < b:
+            return integer_b
+        result = _decrement_integer(integer_b)
+        if result is None:
+            raise ValueError("cannot decrement any more")
+        return result
+
+    if b is None:
+        integer_a = _integer_part(a)
+        fraction_a = a[len(integer_a):]
+        result = _increment_integer(integer_a)
+        return integer_a + _midpoint(fraction_a, None) if result is None else result
+
+    integer_a = _integer_part(a)
+    fraction_a = a[len(integer_a):]
+    integer_b = _integer_part(b)
+    fraction_b = b[len(integer_b):]
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    result = _increment_integer(integer_a)
+    if result is None:
+        raise ValueError("cannot increment any more")
+    if result < b:
+        return result
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def keys_between(a: str | None, b: str | None, n: int) -> list[str]:
+    """n возрастающих ключей между a и b, распределённых равномерно."""
+    if n == 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        keys = [key_between(a, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(keys[-1], b))
+        return keys
+    if a is None:
+        keys = [key_between(a, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(a, keys[-1]))
+        return keys[::-1]
+
+    mid = n // 2
+    c = key_between(a, b)
+    return [*keys_between(a, c, mid), c, *keys_between(c, b, n - mid - 1)]
+
+
+async def last_key(db: AsyncSession, position_column, *criteria) -> str | None:
+    result = await db.execute(
+        select(position_column).where(*criteria).order_by(position_column.desc()).limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def key_for_index(db: AsyncSession, position_column, index: int, *criteria) -> str:
+    """
+    Ключ для вставки на место index среди строк, отобранных criteria
+    (перемещаемую строку нужно исключить в criteria). Читает не больше двух соседей.
+    """
+    index = max(index, 0)
+    stmt = select(position_column).where(*criteria).order_by(position_column)
+    if index == 0:
+        result = await db.execute(stmt.limit(1))
+        before, after = None, result.scalar_one_or_none()
+    else:
+        result = await db.execute(stmt.offset(index - 1).limit(2))
+        neighbours = result.scalars().all()
+        if not neighbours:
+            return key_between(await last_key(db, position_column, *criteria), None)
+        before = neighbours[0]
+        after = neighbours[1] if len(neighbours) > 1 else None
+
+    if before is not None and after is not None and before >= after:
+        # одинаковые ключи (гонка двух перемещений) — встаём после всей группы дублей,
+        # ребалансировщик потом разведёт их
+        result = await db.execute(
+            select(position_column).where(*criteria, position_column > before)
+            .order_by(position_column).limit(1)
+        )
+        after = result.scalar_one_or_none()
+
+    return key_between(before, after)
@@ -0,0 +1,114 @@
+"""
+Быстрый поиск по названиям досок, секций и карточек для подсказок при вводе.
+
+Postgres отбирает кандидатов через ILIKE '%prefix%' по GIN-индексам pg_trgm,
+ранжирование — в Python, чтобы ответ из кэша (app.core.prefix_cache) и из базы
+был упорядочен одинаково. Триграммы не помогают запросам короче трёх символов:
+для них ищется начало названия, lower(title) LIKE 'ab%', по btree-индексам
+*_title_prefix.
+
+Любой коммит пользователя сбрасывает его записи в кэше — только что созданная
+или переименованная карточка находится сразу, а не через ttl.
+"""
+from sqlalchemy import event, func, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.core import settings
+from app.core.db import request_user_id
+from app.core.prefix_cache import PrefixCache
+from app.crud.access import alive
+from app.domain import Board, Card, Section
+
+
+quickfind_cache = PrefixCache(
+    max_users=settings.cache.quickfind_max_users,
+    prefixes_per_user=settings.cache.quickfind_prefixes_per_user,
+    ttl_seconds=settings.cache.quickfind_ttl_seconds,
+)
+
+KIND_ORDER = {"board": 0, "section": 1, "card": 2}
+
+# короче — поиск по началу названия вместо вхождения
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _escape(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _title_matches(column, prefix: str):
+    if len(prefix) < TRIGRAM_MIN_LENGTH:
+        return func.lower(column).like(f"{_escape(prefix)}%", escape="\\")
+    return column.ilike(f"%{_escape(prefix)}%", escape="\\")
+
+
+def _rank(prefix: str):
+    def key(candidate: dict):
+        title = candidate["title"].lower()
+        return (
+            not title.startswith(prefix),
+            f" {prefix}" not in f" {title}",
+            KIND_ORDER[candidate["kind"]],
+            len(title),
+            candidate["id"],
+        )
+    return key
+
+
+async def _fetch_candidates(db: AsyncSession, user_id: int, prefix: str) -> tuple[list[dict], bool]:
+    """
+    Все совпадения пользователя (не больше quickfind_candidates) и признак полноты
+    набора. Набор по началу названия (короткий префикс) не полон в смысле кэша:
+    из него нельзя отфильтровать вхождения более длинного запроса.
+    """
+    limit = settings.cache.quickfind_candidates
+    user_boards = select(Board.id).where(Board.customer_id == user_id, *alive(Board))
+
+    # по одному ветвлению на таблицу, каждое со своим лимитом (+1 — чтобы заметить обрезку)
+    boards = (
+        select(literal("board").label("kind"), Board.id, Board.id.label("board_id"), Board.title)
+        .where(Board.customer_id == user_id, _title_matches(Board.title, prefix), *alive(Board))
+        .limit(limit + 1)
+    )
+    sections = (
+        select(literal("section").label("kind"), Section.id, Section.board_id, Section.title)
+        .where(Section.board_id.in_(user_boards), _title_matches(Section.title, prefix), *alive(Section))
+        .limit(limit + 1)
+    )
+    cards = (
+        select(literal("card").label("kind"), Card.id, Card.board_id, Card.title)
+        .join(Section, Section.id == Card.section_id)
+        .where(Card.board_id.in_(user_boards), _title_matches(Card.title, prefix), *alive(Card, Section))
+        .limit(limit + 1)
+    )
+    result = await db.execute(union_all(boards.subquery().select(), sections.subquery().select(), cards.subquery().select()))
+    rows = [dict(row._mapping) for row in result.all()]
+
+    counts = {}
+    for row in rows:
+        counts[row["kind"]] = counts.get(row["kind"], 0) + 1
+    complete = len(prefix) >= TRIGRAM_MIN_LENGTH and all(count <= limit for count in counts.values())
+    return rows, complete
+
+
+async def quickfind(db: AsyncSession, user_id: int, prefix: str, limit: int = 10) -> list[dict]:
+    prefix = prefix.lower()
+    candidates = quickfind_cache.get(user_id, prefix)
+    if candidates is None:
+        candidates, complete = await _fetch_candidates(db, user_id, prefix)
+        quickfind_cache.put(user_id, prefix, candidates, complete)
+    return sorted(candidates, key=_rank(prefix))[:limit]
+
+
+# пишут только владельцы досок, так что автор коммита — единственный,
+# чьи результаты могли устареть; сессии чтения не коммитят
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    # SAVEPOINT пакета — ещё не коммит
+    if session.in_nested_transaction():
+        return
+    user_id = request_user_id.get()
+    if user_id is not None:
+        quickfind_cache.invalidate_user(user_id)
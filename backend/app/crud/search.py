@@ -0,0 +1,93 @@
+"""
+Полнотекстовый поиск по карточкам пользователя.
+
+Совпадения ищутся по cards.search_vector (GIN, только живые строки),
+сортируются по ts_rank_cd и листаются по ключу (rank, id) без OFFSET.
+ts_headline дорогой, поэтому сниппеты строятся только для строк страницы.
+"""
+import html
+
+from fastapi import HTTPException, status
+from sqlalchemy import Double, cast, func, literal_column, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.crud.access import alive
+from app.domain import Board, Card, Section
+
+
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+# управляющие символы вместо тегов: сниппет экранируется целиком, потом они становятся <mark>
+_START, _STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxFragments=2, MaxWords=18, MinWords=6"
+
+
+def encode_cursor(rank: float, card_id: int) -> str:
+    return f"{rank!r}:{card_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, card_id = cursor.split(":")
+        return float(rank), int(card_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+async def search_cards(
+    db: AsyncSession,
+    user_id: int,
+    q: str,
+    after: tuple[float, int] | None = None,
+    limit: int = 20,
+):
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # ts_rank_cd возвращает real; в double, чтобы курсор из Python сравнивался без потери точности
+    rank = cast(func.ts_rank_cd(Card.search_vector, query), Double)
+
+    user_boards = select(Board.id).where(Board.customer_id == user_id, *alive(Board))
+    page = (
+        select(
+            Card.id,
+            Card.title,
+            Card.description,
+            Card.board_id,
+            Card.section_id,
+            rank.label("rank"),
+        )
+        .join(Section, Section.id == Card.section_id)
+        .where(
+            Card.search_vector.op("@@")(query),
+            Card.board_id.in_(user_boards),
+            *alive(Card, Section),
+        )
+        .order_by(rank.desc(), Card.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        page = page.where(tuple_(rank, Card.id) < tuple_(*after))
+    page = page.subquery()
+
+    stmt = (
+        select(
+            page.c.id,
+            page.c.title,
+            page.c.board_id,
+            page.c.section_id,
+            page.c.rank,
+            func.ts_headline(
+                SEARCH_CONFIG,
+                func.concat_ws(" — ", page.c.title, page.c.description),
+                query,
+                HEADLINE_OPTIONS,
+            ).label("snippet"),
+        )
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    )
+    result = await db.execute(stmt)
+    return [{**row._mapping, "snippet": _highlight(row.snippet)} for row in result.all()]
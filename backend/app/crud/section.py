@@ -1,51 +1,47 @@
+from datetime import datetime
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import delete
+from sqlalchemy import JSON, func, insert, literal, literal_column, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
 
+from app.crud.access import alive, board_owned_by, raise_board_miss, raise_section_miss, section_owned_by
+from app.crud.changes import record_change, section_payload
+from app.crud.ordering import key_for_index, last_key, key_between
 from app.domain import Section, Card, Board
-from app.domain.schemas import SectionCreate, SectionUpdate
-from fastapi import HTTPException, status
-
-async def get_card(db: AsyncSession, card_id: int):
-    result = await db.execute(select(Card).filter(Card.id == card_id))
-    db_card = result.scalars().first()
-    return db_card
+from app.domain.schemas import SectionCreate
 
 
-async def get_section(db: AsyncSession, section_id: int) -> Section | None:
-    stmt = (
-        select(Section)
-        .options(selectinload(Section.board))
-        .where(Section.id == section_id)
-    )
-    res = await db.execute(stmt)
-    return res.scalars().first()
+SECTION_COLUMNS = (Section.id, Section.title, Section.position, Section.board_id)
 
 
 async def create_section(db: AsyncSession, section: SectionCreate, customer_id: int):
-    result = await db.execute(select(Board).filter(Board.id == section.board_id))
-    db_board = result.scalars().first()
-
-    if not db_board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
-
-    if db_board.customer_id != customer_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="You do not have permission to add section to this board")
-
     if section.position is None:
-        result = await db.execute(
-            select(Section).filter(Section.board_id == section.board_id).order_by(Section.position.desc()))
-        last_section = result.scalars().first()
-        position = last_section.position + 1 if last_section else 0
+        position = key_between(
+            await last_key(db, Section.position, Section.board_id == section.board_id, *alive(Section)), None
+        )
     else:
-        position = section.position
+        position = await key_for_index(
+            db, Section.position, section.position, Section.board_id == section.board_id, *alive(Section)
+        )
+
+    # INSERT ... SELECT: строка появится, только если доска принадлежит пользователю
+    source = (
+        select(literal(section.title), Board.id, literal(position))
+        .where(Board.id == section.board_id, board_owned_by(customer_id))
+    )
+    res = await db.execute(
+        insert(Section)
+        .from_select(["title", "board_id", "position"], source)
+        .returning(*SECTION_COLUMNS)
+    )
+    db_section = res.one_or_none()
+    if db_section is None:
+        await raise_board_miss(db, section.board_id, customer_id)
 
-    db_section = Section(title=section.title, board_id=section.board_id, position=position)
-    db.add(db_section)
+    await record_change(db, section.board_id, "section", "create", db_section.id, section_payload(db_section))
     await db.commit()
-    await db.refresh(db_section)
     return db_section
 
 
@@ -55,74 +51,82 @@ async def update_section(
     new_title: str,                # принимаем сразу строку
     customer_id: int
 ):
-    stmt = (
-        select(Section)
-        .options(selectinload(Section.board))
-        .where(Section.id == section_id)
+    # фронтенд заменяет секцию целиком ответом, поэтому карточки возвращаются
+    # тем же UPDATE — подзапросом в RETURNING, без отдельного SELECT
+    cards = (
+        select(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(
+                    func.json_build_object("id", Card.id, "title", Card.title, "position", Card.position),
+                    Card.position, Card.id,
+                )),
+                literal_column("'[]'::json"),
+                type_=JSON,
+            )
+        )
+        .where(Card.section_id == Section.id, *alive(Card))
+        .scalar_subquery()
     )
-    res = await db.execute(stmt)
-    db_section = res.scalars().first()
-    if not db_section:
-        raise HTTPException(status_code=404, detail="Section not found")
-
-    if db_section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    res = await db.execute(
+        update(Section)
+        .where(Section.id == section_id, section_owned_by(customer_id))
+        .values(title=new_title)
+        .returning(*SECTION_COLUMNS, cards.label("cards"))
+        .execution_options(synchronize_session=False)
+    )
+    db_section = res.one_or_none()
+    if db_section is None:
+        await raise_section_miss(db, section_id, customer_id)
 
-    db_section.title = new_title   # присваиваем строку
+    await record_change(db, db_section.board_id, "section", "update", db_section.id, section_payload(db_section))
     await db.commit()
-    await db.refresh(db_section)
     return db_section
 
 async def delete_section(db: AsyncSession, section_id: int, customer_id: int):
-    db_section = await get_section(db, section_id)
-    if not db_section:
-        raise HTTPException(404, "Section not found")
-    if db_section.board.customer_id != customer_id:
-        raise HTTPException(403, "Forbidden")
-
-    await db.execute(delete(Card).where(Card.section_id == section_id))
-    await db.delete(db_section)
-    await db.commit()
-    return db_section
-
-
-async def move_card(db: AsyncSession, card_id: int, section_id: int, position: int, customer_id: int):
-    db_card = await get_card(db, card_id)
-    if not db_card:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card not found")
-
-    if db_card.section.board.customer_id != customer_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to move this card")
+    # мягкое удаление: запрос не зависит от числа карточек, они становятся невидимы
+    # вместе с секцией, а удаляет всё дерево app.workers.purger
+    res = await db.execute(
+        update(Section)
+        .where(Section.id == section_id, section_owned_by(customer_id))
+        .values(deleted_at=datetime.utcnow())
+        .returning(*SECTION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    db_section = res.one_or_none()
+    if db_section is None:
+        await raise_section_miss(db, section_id, customer_id)
 
-    db_card.section_id = section_id
-    db_card.position = position
+    await record_change(db, db_section.board_id, "section", "delete", db_section.id, {"id": db_section.id})
     await db.commit()
-    await db.refresh(db_card)
-    return db_card
+    return db_section
 
 
 async def get_sections_for_board(db: AsyncSession, board_id: int):
-    result = await db.execute(select(Section).filter(Section.board_id == board_id))
+    result = await db.execute(select(Section).filter(Section.board_id == board_id, *alive(Section)))
     db_sections = result.scalars().all()
     return db_sections
 
 
-async def move_section(db: AsyncSession, section_id: int, position: int, customer_id: int):
-    stmt = (
-        select(Section)
-        .options(selectinload(Section.board))
-        .where(Section.id == section_id)
+async def move_section(db: AsyncSession, section_id: int, index: int, customer_id: int):
+    # соседи ищутся по доске самой секции, без отдельной проверки доступа;
+    # алиас — чтобы подзапрос не скоррелировался с внешним select по sections
+    moved = aliased(Section)
+    board_id = select(moved.board_id).where(moved.id == section_id).scalar_subquery()
+    position = await key_for_index(
+        db, Section.position, index,
+        Section.board_id == board_id, Section.id != section_id, *alive(Section),
     )
-    res = await db.execute(stmt)
-    db_section = res.scalars().first()
-
-    if not db_section:
-        raise HTTPException(status_code=404, detail="Section not found")
-
-    if db_section.board.customer_id != customer_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    res = await db.execute(
+        update(Section)
+        .where(Section.id == section_id, section_owned_by(customer_id))
+        .values(position=position)
+        .returning(*SECTION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    db_section = res.one_or_none()
+    if db_section is None:
+        await raise_section_miss(db, section_id, customer_id)
 
-    db_section.position = position
+    await record_change(db, db_section.board_id, "section", "move", db_section.id, section_payload(db_section))
     await db.commit()
-    await db.refresh(db_section)
     return db_section
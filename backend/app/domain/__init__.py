@@ -1,2 +1,2 @@
 from .base import Base
-from .models import Customer, Board, Section, Card
+from .models import Customer, Board, Section, Card, BoardChange
@@ -1,4 +1,5 @@
-from sqlalchemy import String, Integer, Text, ForeignKey, TIMESTAMP
+from sqlalchemy import String, Integer, Boolean, Text, ForeignKey, TIMESTAMP, Index, Computed, false, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -15,65 +16,143 @@ class Customer(Base):
     created_date: Mapped[datetime] = mapped_column(TIMESTAMP, default=datetime.utcnow)
     updated_date: Mapped[datetime] = mapped_column(TIMESTAMP, onupdate=datetime.utcnow)
 
-    boards: Mapped[list["Board"]] = relationship("Board", back_populates="customer")
+    boards: Mapped[list["Board"]] = relationship("Board", back_populates="customer", lazy="raise")
 
 
 class Board(Base):
     __tablename__ = 'boards'
+    __table_args__ = (
+        Index('ix_boards_customer_id_id', 'customer_id', 'id', postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_boards_deleted_at', 'deleted_at', postgresql_where=text('deleted_at IS NOT NULL')),
+        Index('ix_boards_title_trgm', 'title', postgresql_using='gin',
+              postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=text('deleted_at IS NULL')),
+        # префиксы короче триграммы (/quickfind на 1-2 символа)
+        Index('ix_boards_customer_id_title_prefix', 'customer_id', text('lower(title) text_pattern_ops'),
+              postgresql_where=text('deleted_at IS NULL')),
+    )
 
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     customer_id: Mapped[int] = mapped_column(Integer, ForeignKey('customer.id'), nullable=False)
-
-    customer: Mapped["Customer"] = relationship("Customer", back_populates="boards")
+    # растёт при каждом изменении доски, её секций или карточек (ETag, кэш снимков)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # шаблон — доска, с которой клонируют новые (POST /boards/{id}/clone)
+    is_template: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    # мягкое удаление: строку и всё дерево под ней потом удаляет app.workers.purger
+    deleted_at: Mapped[datetime | None] = mapped_column(TIMESTAMP, nullable=True)
+
+    customer: Mapped["Customer"] = relationship("Customer", back_populates="boards", lazy="raise")
     sections: Mapped[list["Section"]] = relationship(
         "Section",
         back_populates="board",
-        order_by="Section.position",
-        lazy="selectin",
+        # с board_id впереди selectin-загрузка по IN (...) идёт по ix_sections_board_id_position без Sort
+        order_by="[Section.board_id, Section.position, Section.id]",
+        lazy="raise",
     )
 
 
 
 class Section(Base):
     __tablename__ = 'sections'
+    __table_args__ = (
+        Index('ix_sections_board_id_position', 'board_id', 'position', 'id', postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_sections_board_id', 'board_id'),
+        Index('ix_sections_deleted_at', 'deleted_at', postgresql_where=text('deleted_at IS NOT NULL')),
+        Index('ix_sections_title_trgm', 'title', postgresql_using='gin',
+              postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_sections_board_id_title_prefix', 'board_id', text('lower(title) text_pattern_ops'),
+              postgresql_where=text('deleted_at IS NULL')),
+    )
 
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    # дробный ключ порядка (app.crud.ordering), сравнивается побайтово
+    position: Mapped[str] = mapped_column(String(255, collation="C"), nullable=False)
     board_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey('boards.id', ondelete='CASCADE'),
         nullable=False
     )
+    deleted_at: Mapped[datetime | None] = mapped_column(TIMESTAMP, nullable=True)
 
     # <-- здесь back_populates="sections" у Board, а у Section указываем cards:
     board: Mapped["Board"] = relationship(
         "Board",
         back_populates="sections",
-        lazy="selectin"
+        lazy="raise"
     )
     cards: Mapped[list["Card"]] = relationship(
         "Card",
         back_populates="section",
+        order_by="[Card.section_id, Card.position, Card.id]",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise"
     )
 
 
 class Card(Base):
     __tablename__ = 'cards'
+    __table_args__ = (
+        Index('ix_cards_section_id_position', 'section_id', 'position', 'id', postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_cards_section_id', 'section_id'),
+        Index('ix_cards_board_id', 'board_id'),
+        Index('ix_cards_deleted_at', 'deleted_at', postgresql_where=text('deleted_at IS NOT NULL')),
+        Index('ix_cards_search_vector', 'search_vector', postgresql_using='gin',
+              postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_cards_title_trgm', 'title', postgresql_using='gin',
+              postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_cards_board_id_title_prefix', 'board_id', text('lower(title) text_pattern_ops'),
+              postgresql_where=text('deleted_at IS NULL')),
+    )
 
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=True)
-    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    position: Mapped[str] = mapped_column(String(255, collation="C"), nullable=False)
     section_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey('sections.id', ondelete='CASCADE'),
         nullable=False
     )
+    # денормализовано из sections.board_id: проверка доступа к карточке в один переход
+    board_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey('boards.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    deleted_at: Mapped[datetime | None] = mapped_column(TIMESTAMP, nullable=True)
+    # полнотекстовый поиск (app.crud.search): заголовок весит больше описания;
+    # конфигурация simple — без стемминга, одинаково для русского и английского
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     # <-- вот этот атрибут должен называться ровно так же, как указан в back_populates:
     section: Mapped["Section"] = relationship(
         "Section",
         back_populates="cards",
-        lazy="joined"
+        lazy="raise"
     )
+
+
+class BoardChange(Base):
+    """Журнал изменений доски для дельта-синхронизации (append-only)."""
+    __tablename__ = 'board_changes'
+    __table_args__ = (
+        Index('ix_board_changes_board_id_version', 'board_id', 'version'),
+    )
+
+    board_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey('boards.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity: Mapped[str] = mapped_column(String(16), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(16), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    created_date: Mapped[datetime] = mapped_column(TIMESTAMP, default=datetime.utcnow)
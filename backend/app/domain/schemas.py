@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
+
+from app.core import settings
 
 class User(BaseModel):
     username: str
@@ -9,12 +11,17 @@ class User(BaseModel):
 class Token(BaseModel):
     token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 
 class CardRead(BaseModel):
     id: int
     title: str
-    position: int
+    position: str
 
     model_config = {"from_attributes": True}
 
@@ -22,7 +29,7 @@ class CardRead(BaseModel):
 class SectionRead(BaseModel):
     id: int
     title: str
-    position: int
+    position: str
     cards: List[CardRead] = []
 
     model_config = {"from_attributes": True}
@@ -33,11 +40,12 @@ class BoardBase(BaseModel):
 
 
 class BoardCreate(BoardBase):
-    pass
+    is_template: bool = False
 
 
 class BoardUpdate(BoardBase):
-    pass
+    # None — не менять
+    is_template: Optional[bool] = None
 
 
 class BoardRead(BaseModel):
@@ -49,6 +57,43 @@ class BoardRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class BoardSummary(BaseModel):
+    id: int
+    title: str
+    section_count: int
+    card_count: int
+    is_template: bool = False
+
+    model_config = {"from_attributes": True}
+
+
+class BoardImportResult(BaseModel):
+    id: int
+    title: str
+    sections: int
+    cards: int
+    # архивные карточки и карточки без списка
+    skipped: int
+    seconds: float
+    rows_per_second: float
+
+
+class BoardChangeRead(BaseModel):
+    version: int
+    entity: str
+    entity_id: int
+    op: str
+    payload: Optional[dict] = None
+
+    model_config = {"from_attributes": True}
+
+
+class BoardChanges(BaseModel):
+    version: int
+    reset: bool = False
+    changes: List[BoardChangeRead] = []
+
+
 class Board(BoardBase):
     id: int
     customer_id: int
@@ -60,6 +105,7 @@ class Board(BoardBase):
 class SectionCreate(BaseModel):
     title: str
     board_id: int = Field(..., alias="boardId")
+    # индекс среди секций доски; None — в конец
     position: Optional[int] = None
 
 
@@ -74,3 +120,66 @@ class CardUpdate(BaseModel):
     title: str
     description: Optional[str] = None  
 
+
+
+class CardSearchHit(BaseModel):
+    id: int
+    title: str
+    board_id: int
+    section_id: int
+    rank: float
+    # HTML-экранированный фрагмент, совпадения обёрнуты в <mark>
+    snippet: str
+
+
+class QuickFindHit(BaseModel):
+    kind: Literal["board", "section", "card"]
+    id: int
+    board_id: int
+    title: str
+
+
+class BoardLayout(BaseModel):
+    # полный порядок секций доски; None — не менять
+    sections: Optional[List[int]] = None
+    # section_id -> порядок карточек в ней (можно передавать только изменившиеся секции)
+    cards: Dict[int, List[int]] = {}
+
+
+class BoardLayoutResult(BaseModel):
+    version: int
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "move"]
+    entity: Literal["card", "section"]
+    id: Optional[int] = None
+    board_id: Optional[int] = Field(None, alias="boardId")
+    section_id: Optional[int] = Field(None, alias="sectionId")
+    title: Optional[str] = None
+    description: Optional[str] = None
+    # индекс среди соседей для create/move; None — в конец
+    position: Optional[int] = None
+
+    model_config = {"populate_by_name": True}
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., max_length=settings.batch.max_operations)
+    continue_on_error: bool = Field(False, alias="continueOnError")
+
+    model_config = {"populate_by_name": True}
+
+
+class BatchResult(BaseModel):
+    index: int
+    ok: bool
+    status: int
+    entity_id: Optional[int] = None
+    version: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchResult]
@@ -1,19 +1,37 @@
+import asyncio
 import uvicorn
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
+from app.api.health import health_router
+from app.api.metrics import metrics_router
 from app.api.router import router
+from app.api.ws import ws_router
 from app.core import settings
 from app.core.db import db_helper
 from app.middleware.cors import setup_cors
+from app.middleware.metrics import setup_metrics
+from app.middleware.profiler import setup_profiler
+from app.middleware.read_your_writes import setup_read_your_writes
+from app.security.utils import password_hasher
+from app.workers.purger import run_purger
+from app.workers.rebalancer import run_rebalancer
+from app.workers.warmup import run_warmup
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     #startup
+    warmup = asyncio.create_task(run_warmup())
+    rebalancer = asyncio.create_task(run_rebalancer())
+    purger = asyncio.create_task(run_purger())
     yield
     #showdown
+    warmup.cancel()
+    rebalancer.cancel()
+    purger.cancel()
+    password_hasher.shutdown()
     await db_helper.dispose()
 
 main_app = FastAPI(
@@ -23,12 +41,31 @@ main_app = FastAPI(
 
 
 setup_cors(main_app)
+setup_read_your_writes(main_app)
+setup_profiler(main_app)
+# последним — снаружи остальных middleware, чтобы мерить и их
+setup_metrics(main_app)
 
 main_app.include_router(
     router,
     tags=['auth']
 )
 
+main_app.include_router(
+    ws_router,
+    tags=['realtime']
+)
+
+main_app.include_router(
+    health_router,
+    tags=['health']
+)
+
+main_app.include_router(
+    metrics_router,
+    tags=['metrics']
+)
+
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -13,4 +13,5 @@ def setup_cors(app: FastAPI):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
\ No newline at end of file
@@ -0,0 +1,76 @@
+import time
+
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db import db_helper
+from app.core.metrics import (
+    HTTP_IN_PROGRESS,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    HTTP_RESPONSE_BYTES,
+    PoolCollector,
+    StatsCollector,
+)
+from app.crud.board import board_snapshot_cache
+from app.crud.quickfind import quickfind_cache
+from app.realtime.hub import board_hub
+from app.security.principal_cache import principal_cache
+from app.security.utils import password_hasher
+
+
+class MetricsMiddleware:
+    """
+    Латентность, статус и размер ответа по шаблону роута (/boards/{board_id}),
+    а не по фактическому пути — иначе число серий растёт с числом досок.
+    Чистый ASGI: тело ответа не буферизуется, байты считаются по ходу отправки.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        body_bytes = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, body_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            # роутер кладёт найденный роут в тот же scope
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(method, template).observe(elapsed)
+            HTTP_REQUESTS.labels(method, template, str(status_code)).inc()
+            HTTP_RESPONSE_BYTES.labels(method, template).observe(body_bytes)
+
+
+def setup_metrics(app: FastAPI):
+    REGISTRY.register(PoolCollector(db_helper.engines))
+    REGISTRY.register(StatsCollector({
+        "db": db_helper.stats,
+        "password_hasher": password_hasher.stats,
+        "principal_cache": principal_cache.stats,
+        "snapshot_cache": board_snapshot_cache.stats,
+        "quickfind_cache": quickfind_cache.stats,
+        "board_hub": board_hub.stats,
+    }))
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,76 @@
+import logging
+import random
+import time
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import settings
+from app.core.profiler import RequestProfile, current_profile, install_request_hooks
+
+logger = logging.getLogger(__name__)
+
+
+def _short(value, limit: int = 500) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class ProfilerMiddleware:
+    """
+    Заводит профиль на запрос, дописывает Server-Timing в ответ и пишет
+    в лог медленные запросы из выборки. Время total — до начала ответа:
+    стриминговый экспорт дальше уже не считается.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(capture=random.random() < settings.profiler.sample_rate)
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        total = None
+
+        async def send_wrapper(message: Message):
+            nonlocal total
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing(total).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            if total is None:
+                total = time.perf_counter() - started
+            if profile.capture and total * 1000 >= settings.profiler.slow_request_ms:
+                self._log_slow(scope, profile, total)
+
+    @staticmethod
+    def _log_slow(scope: Scope, profile: RequestProfile, total: float):
+        route = scope.get("route")
+        lines = [
+            f"{scope['method']} {getattr(route, 'path', scope['path'])} {total * 1000:.1f}ms: "
+            f"{profile.statements} statements, db {profile.db_seconds * 1000:.1f}ms, "
+            f"orm {profile.orm_seconds * 1000:.1f}ms, serialize {profile.serialize_seconds * 1000:.1f}ms"
+        ]
+        for elapsed, statement, parameters in profile.executed:
+            lines.append(f"  {elapsed * 1000:.1f}ms {' '.join(statement.split())} -- {_short(parameters)}")
+        if profile.statements > len(profile.executed):
+            lines.append(f"  ... {profile.statements - len(profile.executed)} more")
+        logger.warning("slow request %s", "\n".join(lines))
+
+
+def setup_profiler(app: FastAPI):
+    if not settings.profiler.enabled:
+        return
+    install_request_hooks()
+    app.add_middleware(ProfilerMiddleware)
@@ -0,0 +1,65 @@
+import time
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import settings
+from app.core.db import WriteMarker, db_helper, request_write_marker
+
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+
+class ReadYourWritesMiddleware:
+    """
+    После коммита ставит клиенту cookie «читать с primary до T». Следующий GET
+    может попасть в другой воркер (или под), где память о записи пуста, —
+    cookie приходит вместе с ним, и ReadSession выбирает primary.
+    Подделка cookie вредит только самому клиенту: лишние чтения с primary.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = WriteMarker(self._read_cookie(scope))
+        token = request_write_marker.set(marker)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and marker.wrote:
+                seconds = settings.db.read_your_writes_seconds
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={time.time() + seconds:.3f}; Max-Age={int(seconds) + 1}; "
+                    f"Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_write_marker.reset(token)
+
+    @staticmethod
+    def _read_cookie(scope: Scope) -> float:
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                try:
+                    return float(cookie_parser(value.decode("latin-1")).get(READ_PRIMARY_COOKIE, 0))
+                except ValueError:
+                    return 0.0
+        return 0.0
+
+
+def setup_read_your_writes(app: FastAPI):
+    # без реплик всё и так читается с primary
+    if not db_helper.replica_engines:
+        return
+    app.add_middleware(ReadYourWritesMiddleware)
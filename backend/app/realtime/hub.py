@@ -0,0 +1,100 @@
+import asyncio
+from collections import defaultdict
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import settings
+
+
+class Subscription:
+    def __init__(self, board_id: int, queue_size: int):
+        self.board_id = board_id
+        # None в очереди означает «подписчик отключён как медленный»
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class BoardHub:
+    """
+    In-process pub/sub: board_id -> подписчики.
+    У каждого подписчика своя ограниченная очередь; кто не успевает её разбирать,
+    того отключаем, а не держим растущий буфер и не тормозим остальных.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, board_id: int) -> Subscription:
+        subscription = Subscription(board_id, self.queue_size)
+        self._subscribers[board_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.board_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.board_id]
+
+    def publish(self, board_id: int, message: dict):
+        subscribers = self._subscribers.get(board_id)
+        if not subscribers:
+            return
+
+        # сериализуем один раз на всех подписчиков
+        data = orjson.dumps(message).decode()
+        self.published += 1
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        self.dropped += 1
+        subscription.dropped = True
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+board_hub = BoardHub(queue_size=settings.realtime.subscriber_queue_size)
+
+
+# События копятся в session.info (см. record_change) и уходят подписчикам
+# только после успешного коммита; при откате выбрасываются.
+# after_commit/after_rollback срабатывают и на SAVEPOINT (begin_nested в пакетах):
+# отпущенный SAVEPOINT ещё не коммит, а откат SAVEPOINT убирает только события
+# своей операции (это делает run_batch), поэтому вложенные транзакции пропускаем.
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session):
+    if session.in_nested_transaction():
+        return
+    events = session.info.pop("board_events", None)
+    if not events:
+        return
+    for item in events:
+        board_id = item.pop("board_id")
+        board_hub.publish(board_id, item)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop("board_events", None)
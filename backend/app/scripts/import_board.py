@@ -0,0 +1,69 @@
+"""
+Импорт доски из файла в обход HTTP:
+
+    python -m app.scripts.import_board board.json --user alice
+    python -m app.scripts.import_board cards.csv --user alice --title "Backlog"
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy.future import select
+
+from app.core.db import db_helper
+from app.crud.importer import ImportProgress, import_board
+from app.domain import Customer
+
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+async def read_chunks(path: Path):
+    with path.open("rb") as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            yield chunk
+
+
+def print_progress(progress: ImportProgress):
+    print(f"\rstaged {progress.rows} rows, {progress.rows_per_second:.0f} rows/s",
+          end="", file=sys.stderr, flush=True)
+
+
+async def main(path: Path, username: str, fmt: str, title: str | None) -> int:
+    try:
+        async with db_helper.session_factory() as session:
+            result = await session.execute(select(Customer.id).where(Customer.username == username))
+            customer_id = result.scalar_one_or_none()
+            if customer_id is None:
+                print(f"user {username!r} not found", file=sys.stderr)
+                return 1
+            try:
+                summary = await import_board(session, customer_id, read_chunks(path), fmt, title, print_progress)
+            except HTTPException as exc:
+                print(f"\nimport failed: {exc.detail}", file=sys.stderr)
+                return 1
+    finally:
+        await db_helper.dispose()
+
+    print(file=sys.stderr)
+    print(
+        f"board {summary['id']} {summary['title']!r}: {summary['sections']} sections, "
+        f"{summary['cards']} cards, {summary['skipped']} skipped "
+        f"in {summary['seconds']}s ({summary['rows_per_second']} rows/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a Trello JSON export or CSV as a new board")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--user", required=True, help="owner username")
+    parser.add_argument("--format", choices=["trello", "csv"],
+                        help="defaults to csv for *.csv files, trello otherwise")
+    parser.add_argument("--title", help="board title (defaults to the Trello board name)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "trello")
+    sys.exit(asyncio.run(main(args.path, args.user, fmt, args.title)))
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.core import settings
+from app.domain import Customer
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Лёгкое представление аутентифицированного пользователя.
+    Роутам нужен только id, поэтому ORM-объект Customer в кэше не держим.
+    """
+    id: int
+    username: str
+
+
+class PrincipalCache:
+    """
+    Ограниченный LRU-кэш токен -> Principal с TTL.
+    Время жизни записи не превышает exp самого токена.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Principal | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return principal
+
+    def put(self, token: str, principal: Principal, token_exp: float | None = None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+
+        self._entries[token] = (expires_at, principal)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_token(self, token: str):
+        self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: int):
+        stale = [token for token, (_, principal) in self._entries.items() if principal.id == user_id]
+        for token in stale:
+            del self._entries[token]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.cache.principal_max_size,
+    ttl_seconds=settings.cache.principal_ttl_seconds,
+)
+
+
+# Любое изменение или удаление пользователя через ORM сбрасывает его записи в кэше
+@event.listens_for(Customer, "after_update")
+@event.listens_for(Customer, "after_delete")
+def _invalidate_customer(mapper, connection, target: Customer):
+    principal_cache.invalidate_user(target.id)
@@ -1,12 +1,25 @@
+import asyncio
+import time
+import uuid
 import jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
 
 from app.core import settings
+from app.core.metrics import PASSWORD_HASH_SECONDS
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds == max_rounds == default_rounds: хэши с другой стоимостью (и дешевле,
+# и дороже) считаются устаревшими и перехэшируются при следующем успешном входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.password.bcrypt_rounds,
+    bcrypt__min_rounds=settings.password.bcrypt_rounds,
+    bcrypt__max_rounds=settings.password.bcrypt_rounds,
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -14,13 +27,89 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+class PasswordHasherBusy(Exception):
+    """Очередь на проверку паролей переполнена."""
+
+
+class PasswordHasher:
+    """
+    bcrypt на отдельном ограниченном пуле потоков.
+    Event loop не блокируется, а всплеск логинов упирается в max_pending
+    и получает отказ вместо того, чтобы тормозить остальные запросы.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(workers)
+        self.max_pending = max_pending
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, op: str, fn, *args):
+        if self.queued >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with PASSWORD_HASH_SECONDS.labels(op).time():
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Возвращает (пароль верный, новый хэш или None, если перехэшировать не нужно)."""
+        return await self._run("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password.hash_workers,
+    max_pending=settings.password.max_pending,
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.jwt.access_token_expire_minutes)
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
+    encoded_jwt = jwt.encode(to_encode, settings.jwt.secret_key, algorithm=settings.jwt.algorithm)
+    return encoded_jwt
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(days=settings.jwt.refresh_token_expire_days)
+    to_encode = data.copy()
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.jwt.secret_key, algorithm=settings.jwt.algorithm)
     return encoded_jwt
 
@@ -32,3 +121,52 @@ def decode_access_token(token: str):
         return None
     except jwt.JWTError:
         return None
+
+
+class RefreshTokenDenylist:
+    """
+    jti использованных (отозванных) refresh-токенов.
+    Запись нужна только до exp токена — после этого его и так не примет jwt.decode.
+
+    Список живёт в памяти процесса: при нескольких воркерах uvicorn/gunicorn
+    каждый знает только свои отзывы, и один и тот же refresh-токен можно
+    предъявить по разу в каждый воркер.
+    """
+
+    purge_interval_seconds = 60
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+        self._next_purge = 0.0
+
+    def revoke(self, jti: str, exp: float):
+        if time.time() >= self._next_purge:
+            self._purge()
+        self._revoked[jti] = exp
+
+    def revoke_if_unrevoked(self, jti: str, exp: float) -> bool:
+        """
+        Проверка и отзыв одним шагом: True только у первого предъявившего токен.
+        Между ними нет await, так что параллельные запросы в одном event loop
+        не могут оба пройти проверку.
+        """
+        if jti in self._revoked:
+            return False
+        self.revoke(jti, exp)
+        return True
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def _purge(self):
+        now = time.time()
+        self._next_purge = now + self.purge_interval_seconds
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+refresh_denylist = RefreshTokenDenylist()
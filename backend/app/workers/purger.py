@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import settings
+from app.core.db import db_helper
+from app.domain import Board, BoardChange, Card, Section
+
+logger = logging.getLogger(__name__)
+
+
+async def _delete_batch(db: AsyncSession, model, *criteria) -> int:
+    """Удаляет не больше batch_size строк в своей транзакции; занятые строки пропускает."""
+    ids = (
+        select(model.id)
+        .where(*criteria)
+        .limit(settings.purge.batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def _drain(db: AsyncSession, model, *criteria) -> int:
+    total = 0
+    while True:
+        deleted = await _delete_batch(db, model, *criteria)
+        total += deleted
+        if deleted < settings.purge.batch_size:
+            return total
+        # между пачками отдаём цикл событий запросам
+        await asyncio.sleep(0)
+
+
+async def purge_boards(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(Board.id).where(Board.deleted_at.is_not(None)).limit(settings.purge.batch_size)
+    )
+    board_ids = result.scalars().all()
+
+    for board_id in board_ids:
+        # снизу вверх, чтобы каскад на последнем DELETE уже ничего не находил
+        await _drain(db, Card, Card.board_id == board_id)
+        await _drain(db, Section, Section.board_id == board_id)
+        await _drain(db, BoardChange, BoardChange.board_id == board_id)
+        await db.execute(delete(Board).where(Board.id == board_id))
+        await db.commit()
+
+    return len(board_ids)
+
+
+async def purge_sections(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(Section.id).where(Section.deleted_at.is_not(None)).limit(settings.purge.batch_size)
+    )
+    section_ids = result.scalars().all()
+
+    for section_id in section_ids:
+        await _drain(db, Card, Card.section_id == section_id)
+        await db.execute(delete(Section).where(Section.id == section_id))
+        await db.commit()
+
+    return len(section_ids)
+
+
+async def purge_cards(db: AsyncSession) -> int:
+    return await _drain(db, Card, Card.deleted_at.is_not(None))
+
+
+async def run_purger():
+    """Фоновая задача: физически удаляет мягко удалённые деревья небольшими транзакциями."""
+    while True:
+        try:
+            async with db_helper.session_factory() as session:
+                boards = await purge_boards(session)
+                sections = await purge_sections(session)
+                cards = await purge_cards(session)
+            if boards or sections or cards:
+                logger.info("purged %s boards, %s sections and %s cards", boards, sections, cards)
+        except Exception:
+            logger.exception("soft delete purge failed")
+        await asyncio.sleep(settings.purge.interval_seconds)
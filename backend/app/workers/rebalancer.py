@@ -0,0 +1,100 @@
+import asyncio
+import logging
+
+from sqlalchemy import distinct, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import settings
+from app.core.db import db_helper
+from app.crud.access import alive
+from app.crud.changes import record_change
+from app.crud.ordering import keys_between
+from app.domain import Card, Section
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_rebalance(position_column):
+    # ключи слишком длинные или есть дубли (два перемещения в одну щель)
+    return or_(
+        func.max(func.length(position_column)) > settings.ordering.max_key_length,
+        func.count() > func.count(distinct(position_column)),
+    )
+
+
+async def rebalance_cards(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(Card.section_id)
+        .where(*alive(Card))
+        .group_by(Card.section_id)
+        .having(_needs_rebalance(Card.position))
+        .limit(settings.ordering.rebalance_batch)
+    )
+    section_ids = result.scalars().all()
+
+    for section_id in section_ids:
+        result = await db.execute(
+            select(Card.id)
+            .where(Card.section_id == section_id, *alive(Card))
+            .order_by(Card.position, Card.id)
+            .with_for_update()
+        )
+        card_ids = result.scalars().all()
+        keys = keys_between(None, None, len(card_ids))
+        await db.execute(
+            update(Card),
+            [{"id": card_id, "position": key} for card_id, key in zip(card_ids, keys)],
+        )
+
+        board_id = (await db.execute(select(Section.board_id).where(Section.id == section_id))).scalar_one()
+        await record_change(db, board_id, "section", "reorder", section_id,
+                            {"cards": dict(zip(map(str, card_ids), keys))})
+        await db.commit()
+
+    return len(section_ids)
+
+
+async def rebalance_sections(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(Section.board_id)
+        .where(*alive(Section))
+        .group_by(Section.board_id)
+        .having(_needs_rebalance(Section.position))
+        .limit(settings.ordering.rebalance_batch)
+    )
+    board_ids = result.scalars().all()
+
+    for board_id in board_ids:
+        result = await db.execute(
+            select(Section.id)
+            .where(Section.board_id == board_id, *alive(Section))
+            .order_by(Section.position, Section.id)
+            .with_for_update()
+        )
+        section_ids = result.scalars().all()
+        keys = keys_between(None, None, len(section_ids))
+        await db.execute(
+            update(Section),
+            [{"id": section_id, "position": key} for section_id, key in zip(section_ids, keys)],
+        )
+
+        await record_change(db, board_id, "board", "reorder", board_id,
+                            {"sections": dict(zip(map(str, section_ids), keys))})
+        await db.commit()
+
+    return len(board_ids)
+
+
+async def run_rebalancer():
+    """Фоновая задача: периодически переписывает ключи порядка, которые стали слишком длинными."""
+    while True:
+        try:
+            async with db_helper.session_factory() as session:
+                sections = await rebalance_cards(session)
+                boards = await rebalance_sections(session)
+            if sections or boards:
+                logger.info("rebalanced %s sections and %s boards", sections, boards)
+        except Exception:
+            logger.exception("order key rebalance failed")
+        await asyncio.sleep(settings.ordering.rebalance_interval_seconds)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core import settings
+from app.core.db import db_helper
+from app.crud.board import (
+    get_board_snapshot,
+    get_board_summaries_for_user,
+    get_board_version,
+    get_boards_fingerprint,
+    get_boards_for_user,
+)
+from app.crud.changes import get_changes_since
+from app.crud.search import search_cards
+from app.domain import Customer, schemas
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.connections = 0
+        self.seconds: float | None = None
+        self.error: str | None = None
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "connections": self.connections,
+            "seconds": self.seconds,
+            "error": self.error,
+        }
+
+
+warmup_state = WarmupState()
+
+
+async def _hot_reads(db: AsyncSession):
+    """
+    Запросы горячих GET-роутов с несуществующими id: строк нет, но SQL
+    компилируется в кэш движка, а asyncpg готовит statement на этом соединении.
+    Параметры — как у роутов по умолчанию, иначе кэш не совпадёт.
+    """
+    await db.get(Customer, 0)
+    await get_board_version(db, 0)
+    await get_board_snapshot(db, 0)
+    await get_boards_fingerprint(db, 0)
+    await get_board_summaries_for_user(db, 0, None, 100, None)
+    await get_boards_for_user(db, 0, None, 100, None)
+    await get_changes_since(db, 0, 0, settings.changelog.retain + 1)
+    await search_cards(db, 0, "warmup")
+
+
+async def _warm_connection(engine: AsyncEngine):
+    async with db_helper.session_factory(bind=engine) as session:
+        # соединение держится до конца, поэтому параллельные сессии открывают разные
+        await session.connection()
+        await _hot_reads(session)
+        await session.rollback()
+
+
+async def warm_pools() -> int:
+    """pool_size соединений на primary и на каждую реплику; prepared statements у asyncpg свои у каждого."""
+    connections = [
+        _warm_connection(engine)
+        for engine in db_helper.engines().values()
+        for _ in range(settings.db.pool_size)
+    ]
+    await asyncio.gather(*connections)
+    return len(connections)
+
+
+def warm_serializers():
+    """Первая валидация и сериализация ответов (from_attributes, jsonable_encoder, orjson)."""
+    card = SimpleNamespace(id=0, title="", position="a")
+    section = SimpleNamespace(id=0, title="", position="a", cards=[card])
+    board = schemas.BoardRead.model_validate(SimpleNamespace(id=0, title="", sections=[section]))
+    summary = schemas.BoardSummary.model_validate(
+        SimpleNamespace(id=0, title="", section_count=1, card_count=1, is_template=False)
+    )
+    ORJSONResponse(jsonable_encoder([board, summary, schemas.CardRead.model_validate(card)]))
+
+
+async def run_warmup():
+    """Фоновая задача старта: до её конца /health/ready отвечает 503."""
+    if not settings.warmup.enabled:
+        warmup_state.ready = True
+        return
+
+    started = time.perf_counter()
+    try:
+        warm_serializers()
+        warmup_state.connections = await asyncio.wait_for(warm_pools(), settings.warmup.timeout_seconds)
+    except Exception as exc:
+        # холодный старт медленнее, но не ломает приложение
+        warmup_state.error = repr(exc)
+        logger.exception("warm-up failed")
+    finally:
+        warmup_state.seconds = round(time.perf_counter() - started, 3)
+        warmup_state.ready = True
+
+    logger.info("warm-up finished in %ss, %s connections", warmup_state.seconds, warmup_state.connections)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from passlib.hash import bcrypt
+
+from app.core import settings
+from app.core.statement_budget import count_queries
+from app.crud.auth import authenticate_token
+from app.domain import Customer
+from app.security.principal_cache import Principal, PrincipalCache, principal_cache
+from app.security.utils import (
+    PasswordHasher, PasswordHasherBusy, create_access_token, create_refresh_token, get_password_hash, password_hasher,
+)
+from conftest import make_account, make_board
+
+
+async def test_sign_in_and_refresh(client, account):
+    response = await client.post("/sign-in", json={"username": account.username, "password": "secret"})
+    assert response.status_code == 200
+    tokens = response.json()
+
+    refreshed = await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+
+    # повторное предъявление того же refresh-токена
+    replayed = await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replayed.status_code == 401
+
+
+async def test_concurrent_refresh_with_one_token_succeeds_once(client, account):
+    token = create_refresh_token({"sub": account.username, "uid": account.id})
+
+    responses = await asyncio.gather(*(
+        client.post("/token/refresh", json={"refresh_token": token}) for _ in range(20)
+    ))
+
+    assert sorted(response.status_code for response in responses) == [200] + [401] * 19
+
+
+async def test_cached_principal_skips_database(db, account):
+    principal_cache.clear()
+
+    with count_queries() as cold:
+        first = await authenticate_token(account.token, db)
+    with count_queries() as warm:
+        second = await authenticate_token(account.token, db)
+
+    assert first == second == Principal(id=account.id, username=account.username)
+    assert (cold.statements, warm.statements) == (1, 0)
+
+
+def test_cache_entry_never_outlives_token(monkeypatch):
+    cache = PrincipalCache(max_size=10, ttl_seconds=60)
+    principal = Principal(id=1, username="user")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.put("short", principal, token_exp=now + 5)
+    cache.put("long", principal, token_exp=now + 3600)
+
+    monkeypatch.setattr(time, "time", lambda: now + 6)
+    # токен истёк раньше TTL — запись ушла вместе с ним
+    assert cache.get("short") is None
+    assert cache.get("long") == principal
+
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("long") is None
+
+
+async def test_customer_update_and_delete_drop_cached_principal(client, db, account):
+    stranger = await make_account(db)
+    for user in (account, stranger):
+        await authenticate_token(user.token, db)
+        assert principal_cache.get(user.token) is not None
+
+    customer = await db.get(Customer, account.id)
+    customer.username = f"{account.username}-renamed"
+    await db.commit()
+    assert principal_cache.get(account.token) is None
+    # новое имя подхватывается из базы
+    assert (await authenticate_token(account.token, db)).username == customer.username
+
+    await db.delete(await db.get(Customer, stranger.id))
+    await db.commit()
+    assert principal_cache.get(stranger.token) is None
+    assert (await client.get("/boards", headers=stranger.headers)).status_code == 401
+
+
+async def test_refresh_token_is_not_an_access_token(client, account):
+    refresh = create_refresh_token({"sub": account.username, "uid": account.id})
+
+    response = await client.get("/boards", headers={"Authorization": f"Bearer {refresh}"})
+
+    assert response.status_code == 401
+    assert principal_cache.get(refresh) is None
+
+
+async def test_legacy_token_without_uid_resolves_by_username(client, db, account):
+    legacy = create_access_token({"sub": account.username})
+    await make_board(db, account, {"Todo": []}, title="Legacy")
+
+    principal = await authenticate_token(legacy, db)
+    response = await client.get("/boards", headers={"Authorization": f"Bearer {legacy}"})
+
+    assert principal == Principal(id=account.id, username=account.username)
+    assert response.status_code == 200
+    assert "Legacy" in [board["title"] for board in response.json()]
+
+
+async def test_hasher_rejects_beyond_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        busy = asyncio.create_task(hasher._run("verify", release.wait))
+        queued = asyncio.create_task(hasher._run("verify", release.wait))
+        await asyncio.sleep(0.05)
+        assert (hasher.in_flight, hasher.queued) == (1, 1)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify_and_update("secret", get_password_hash("secret"))
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        release.set()
+    await asyncio.gather(busy, queued)
+    assert hasher.stats() == {"queued": 0, "in_flight": 0, "completed": 2, "rejected": 1}
+    hasher.shutdown()
+
+
+async def test_sign_in_answers_503_when_hasher_is_busy(client, account, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    response = await client.post("/sign-in", json={"username": account.username, "password": "secret"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+async def stored_hash(db, user_id: int) -> str:
+    db.expire_all()
+    return (await db.get(Customer, user_id)).password
+
+
+async def test_sign_in_rehashes_password_with_other_cost(client, db, account):
+    rounds = settings.password.bcrypt_rounds
+    customer = await db.get(Customer, account.id)
+    customer.password = bcrypt.using(rounds=rounds + 1).hash("secret")
+    await db.commit()
+
+    response = await client.post("/sign-in", json={"username": account.username, "password": "secret"})
+    assert response.status_code == 200
+    rehashed = await stored_hash(db, account.id)
+    assert bcrypt.from_string(rehashed).rounds == rounds
+    assert bcrypt.verify("secret", rehashed)
+
+    # хэш уже нужной стоимости не трогаем, неверный пароль — тоже
+    await client.post("/sign-in", json={"username": account.username, "password": "secret"})
+    await client.post("/sign-in", json={"username": account.username, "password": "wrong"})
+    assert await stored_hash(db, account.id) == rehashed
@@ -0,0 +1,107 @@
+from sqlalchemy import update
+
+from app.core import settings
+from app.domain import Card
+from conftest import make_board
+
+
+async def test_batch_invalid_value_fails_only_its_operation(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+
+    response = await client.post("/batch", headers=account.headers, json={
+        "continueOnError": True,
+        "operations": [
+            # title длиннее String(255) — DataError от Postgres
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "x" * 300},
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "b"},
+        ],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert [(result["ok"], result["status"]) for result in body["results"]] == [(False, 422), (True, 200)]
+
+    board = (await client.get(f"/boards/{tree.id}", headers=account.headers)).json()
+    assert [card["title"] for card in board["sections"][0]["cards"]] == ["a", "b"]
+
+
+async def test_batch_card_of_section_deleted_earlier_is_not_found(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [a] = tree.sections[todo]
+
+    response = await client.post("/batch", headers=account.headers, json={
+        "continueOnError": True,
+        "operations": [
+            {"op": "delete", "entity": "section", "id": todo},
+            {"op": "update", "entity": "card", "id": a, "title": "renamed"},
+            {"op": "delete", "entity": "card", "id": a},
+        ],
+    })
+    assert [result["status"] for result in response.json()["results"]] == [200, 404, 404]
+
+
+async def test_batch_rolls_back_on_first_error_by_default(client, db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    [todo] = tree.sections
+
+    response = await client.post("/batch", headers=account.headers, json={
+        "operations": [
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "a"},
+            {"op": "update", "entity": "card", "id": 0, "title": "missing"},
+        ],
+    })
+    body = response.json()
+    assert body["committed"] is False
+    assert body["results"][-1]["status"] == 404
+
+    board = (await client.get(f"/boards/{tree.id}", headers=account.headers)).json()
+    assert board["sections"][0]["cards"] == []
+
+
+async def test_batch_hides_internal_errors_and_reports_nothing_committed(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [a] = tree.sections[todo]
+    # битый ключ порядка: key_between упадёт с ValueError
+    await db.execute(update(Card).where(Card.id == a).values(position="b000"))
+    await db.commit()
+
+    response = await client.post("/batch", headers=account.headers, json={
+        "continueOnError": True,
+        "operations": [
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "b"},
+            {"op": "update", "entity": "card", "id": 0, "title": "missing"},
+        ],
+    })
+    body = response.json()
+    assert body["committed"] is False
+    assert [(result["status"], result["detail"]) for result in body["results"]] == [
+        (422, "Invalid operation"), (404, "Card not found"),
+    ]
+
+async def test_batch_rejects_too_many_operations(client, account):
+    operation = {"op": "delete", "entity": "card", "id": 0}
+    response = await client.post("/batch", headers=account.headers, json={
+        "operations": [operation] * (settings.batch.max_operations + 1),
+    })
+    assert response.status_code == 422
+
+
+async def test_batch_statement_budget_scales_with_operations(client, db, account):
+    # самый дорогой случай: перенос между досками в режиме continueOnError
+    source = await make_board(db, account, {"From": [f"card {n}" for n in range(settings.batch.max_operations)]})
+    target = await make_board(db, account, {"To": ["first", "second"]})
+    [from_section] = source.sections
+    [to_section] = target.sections
+
+    response = await client.post("/batch", headers=account.headers, json={
+        "continueOnError": True,
+        "operations": [
+            {"op": "move", "entity": "card", "id": card_id, "sectionId": to_section, "position": 1}
+            for card_id in source.sections[from_section]
+        ],
+    })
+    assert response.status_code == 200
+    assert all(result["ok"] for result in response.json()["results"])
@@ -0,0 +1,155 @@
+"""
+Бенчмарки на засеянной базе. По умолчанию пропускаются (addopts в pytest.ini),
+запуск: pytest -m bench -s — цифры печатаются, асерты ловят только регрессию порядка величины.
+"""
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+import httpx
+import orjson
+import pytest
+from sqlalchemy.future import select
+from websockets.asyncio.client import connect
+
+from app.crud.board import get_board_snapshot
+from app.crud.loaders import BOARD_TREE
+from app.crud.search import search_cards
+from app.domain import Board, schemas
+from app.core.db import db_helper
+from app.realtime.hub import board_hub
+from app.workers.warmup import warm_pools
+from conftest import SEED_WORDS, analyze, make_board, seed_boards, seed_customers
+
+pytestmark = pytest.mark.bench
+
+RUNS = 10
+
+IDLE_SOCKETS = 5000
+BROADCASTS = 20
+
+COLD_STARTS = 10
+
+SEARCHES = 200
+SEARCH_P99_SECONDS = 0.1
+
+
+async def measure(call) -> tuple[float, int, object]:
+    """(медиана секунд, пик аллокаций Python в байтах, результат последнего вызова)."""
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = await call()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        result = await call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak, result
+
+
+async def test_board_snapshot_vs_orm(db, account):
+    [board_id] = await seed_boards(db, [account.id], boards=1, sections=20, cards=550)
+
+    async def snapshot() -> bytes:
+        return (await get_board_snapshot(db, board_id)).snapshot
+
+    async def orm() -> bytes:
+        # путь до снимка: доска + два selectin, граф объектов, BoardRead, сериализация
+        result = await db.execute(select(Board).where(Board.id == board_id).options(*BOARD_TREE))
+        board = schemas.BoardRead.model_validate(result.scalar_one())
+        db.expunge_all()
+        return orjson.dumps(board.model_dump())
+
+    snapshot_time, snapshot_peak, snapshot_body = await measure(snapshot)
+    orm_time, orm_peak, orm_body = await measure(orm)
+    print(
+        f"\n11000 cards: snapshot {snapshot_time * 1000:.1f} ms / {snapshot_peak / 2**20:.1f} MiB,"
+        f" orm {orm_time * 1000:.1f} ms / {orm_peak / 2**20:.1f} MiB"
+    )
+
+    assert orjson.loads(snapshot_body) == orjson.loads(orm_body)
+    assert snapshot_time < orm_time / 2
+    assert snapshot_peak < orm_peak / 5
+
+
+async def test_broadcast_latency_with_idle_sockets(live_server, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [card_id] = tree.sections[next(iter(tree.sections))]
+
+    url = f"{live_server}/ws/boards/{tree.id}?token={account.token}"
+    sockets = []
+    # рукопожатие ходит в базу — открываем пачками, чтобы не упереться в пул
+    for _ in range(IDLE_SOCKETS // 250):
+        sockets += await asyncio.gather(*(connect(url, ping_interval=None) for _ in range(250)))
+    await asyncio.gather(*(websocket.recv() for websocket in sockets))  # hello
+    assert board_hub.stats()["subscribers"] == IDLE_SOCKETS
+
+    latencies = []
+    try:
+        async with httpx.AsyncClient(base_url=live_server.replace("ws://", "http://")) as client:
+            for n in range(BROADCASTS):
+                started = time.perf_counter()
+                response = await client.put(f"/cards/{card_id}", json={"title": f"t{n}"}, headers=account.headers)
+                assert response.status_code == 200
+                messages = await asyncio.gather(*(websocket.recv() for websocket in sockets))
+                latencies.append(time.perf_counter() - started)
+                assert {orjson.loads(message)["payload"]["title"] for message in messages} == {f"t{n}"}
+    finally:
+        for start in range(0, len(sockets), 500):
+            await asyncio.gather(*(websocket.close() for websocket in sockets[start:start + 500]))
+
+    # клиенты живут на том же loop-е, что и сервер: в цифре и их разбор кадров
+    p50, worst = statistics.median(latencies), max(latencies)
+    print(f"\n{IDLE_SOCKETS} sockets: write -> last delivery p50 {p50 * 1000:.0f} ms, max {worst * 1000:.0f} ms")
+    assert board_hub.stats()["dropped"] == 0
+    assert worst < 5
+
+
+async def test_search_p99_on_a_million_cards(db, account):
+    # 990 чужих пользователей по 1000 карточек и 10000 у ищущего
+    others = await seed_customers(db, 990)
+    for start in range(0, len(others), 110):
+        await seed_boards(db, others[start:start + 110], boards=4, sections=10, cards=25)
+    await seed_boards(db, [account.id], boards=10, sections=10, cards=100)
+    await analyze(db)
+
+    # частые слова (каждое восьмое), пары слов, вторые страницы по курсору
+    queries = [SEED_WORDS[n % len(SEED_WORDS)] for n in range(SEARCHES // 2)]
+    queries += [f"{SEED_WORDS[n % len(SEED_WORDS)]} {n % 100 + 1}" for n in range(SEARCHES // 2)]
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        page = await search_cards(db, account.id, q, limit=20)
+        if page:
+            await search_cards(db, account.id, q, after=(page[-1]["rank"], page[-1]["id"]), limit=20)
+        latencies.append(time.perf_counter() - started)
+        assert page, q
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    p50, p99 = percentiles[49], percentiles[98]
+    print(f"\n1M cards search (2 pages): p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    assert p99 < SEARCH_P99_SECONDS
+
+
+async def test_first_request_latency_with_and_without_warmup(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Done": ["c"]})
+
+    async def first_request(warm: bool) -> float:
+        # пул с нуля, как у только что поднятого воркера
+        await db_helper.dispose()
+        if warm:
+            await warm_pools()
+        started = time.perf_counter()
+        response = await client.get(f"/boards/{tree.id}/changes", params={"since": 0}, headers=account.headers)
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    cold = statistics.median([await first_request(False) for _ in range(COLD_STARTS)])
+    warm = statistics.median([await first_request(True) for _ in range(COLD_STARTS)])
+    print(f"\nfirst request: cold {cold * 1000:.1f} ms, after warm-up {warm * 1000:.1f} ms")
+    assert warm < cold
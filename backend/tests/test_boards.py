@@ -0,0 +1,102 @@
+import pytest
+
+from conftest import make_account, make_board
+
+
+async def test_board_tree_in_one_query(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Done": ["c"]})
+
+    # бюджет роута — 3 statement-а; в тестах превышение — исключение
+    response = await client.get(f"/boards/{tree.id}", headers=account.headers)
+
+    assert response.status_code == 200
+    board = response.json()
+    assert board["id"] == tree.id
+    assert [section["title"] for section in board["sections"]] == ["Todo", "Done"]
+    assert [card["title"] for card in board["sections"][0]["cards"]] == ["a", "b"]
+    assert [card["id"] for card in board["sections"][1]["cards"]] == list(tree.sections.values())[1]
+
+
+async def test_board_of_another_user_is_forbidden(client, db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    stranger = await make_account(db)
+
+    response = await client.get(f"/boards/{tree.id}", headers=stranger.headers)
+
+    assert response.status_code == 403
+
+
+async def test_missing_board(client, account):
+    response = await client.get("/boards/0", headers=account.headers)
+
+    assert response.status_code == 404
+
+
+async def test_board_etag_and_304(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    first = await client.get(f"/boards/{tree.id}", headers=account.headers)
+    etag = first.headers["ETag"]
+
+    cached = await client.get(f"/boards/{tree.id}", headers={**account.headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    card_id = list(tree.sections.values())[0][0]
+    renamed = await client.put(f"/cards/{card_id}", json={"title": "renamed"}, headers=account.headers)
+    assert renamed.status_code == 200
+
+    # запись поднимает версию доски — старый ETag больше не совпадает
+    fresh = await client.get(f"/boards/{tree.id}", headers={**account.headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert fresh.json()["sections"][0]["cards"][0]["title"] == "renamed"
+
+
+async def test_board_list_etag(client, db, account):
+    await make_board(db, account, {"Todo": []})
+    first = await client.get("/boards", headers=account.headers)
+    assert first.status_code == 200
+
+    cached = await client.get("/boards", headers={**account.headers, "If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+async def test_board_list_summary_counts_live_rows_only(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Done": ["c"], "Gone": ["d"]}, title="Counted")
+    todo, _, gone = tree.sections
+    await client.delete(f"/cards/{tree.sections[todo][0]}", headers=account.headers)
+    await client.delete(f"/sections/{gone}", headers=account.headers)
+
+    response = await client.get("/boards", params={"view": "summary"}, headers=account.headers)
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": tree.id, "title": "Counted", "section_count": 2, "card_count": 2, "is_template": False},
+    ]
+
+
+async def pages(client, account, limit: int, view: str = "summary") -> list[tuple[list[int], str | None]]:
+    """Листает GET /boards по X-Next-Cursor: [(id досок страницы, курсор)]."""
+    result, after = [], None
+    while True:
+        params = {"view": view, "limit": limit} | ({"after": after} if after is not None else {})
+        response = await client.get("/boards", params=params, headers=account.headers)
+        assert response.status_code == 200
+        after = response.headers.get("X-Next-Cursor")
+        result.append(([board["id"] for board in response.json()], after))
+        if after is None:
+            return result
+
+
+@pytest.mark.parametrize("view", ["summary", "full"])
+async def test_board_list_keyset_pages(client, db, account, view):
+    ids = [(await make_board(db, account, {"Todo": ["a"]}, title=f"b{n}")).id for n in range(5)]
+
+    assert await pages(client, account, 2, view) == [
+        (ids[0:2], str(ids[1])), (ids[2:4], str(ids[3])), (ids[4:], None),
+    ]
+    # последняя страница ровно на limit досок — курсора нет, пустой страницы клиент не запросит
+    assert await pages(client, account, 5, view) == [(ids, None)]
+    # страница за последней доской пуста, но не 404
+    response = await client.get("/boards", params={"after": ids[-1]}, headers=account.headers)
+    assert (response.status_code, response.json()) == (200, [])
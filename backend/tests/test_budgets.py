@@ -0,0 +1,100 @@
+"""
+Каждый роут с statement_budget проходит здесь хотя бы раз с включёнными бюджетами
+(в тестах превышение — исключение) и с пустым кэшем пользователей: самый дорогой случай.
+"""
+import pytest
+from fastapi.routing import APIRoute
+
+from app.core import statement_budget as budgets
+from app.main import main_app
+from app.security.principal_cache import principal_cache
+
+
+def budgeted(dependant) -> bool:
+    return any(
+        getattr(dependency.call, "__qualname__", "") == "statement_budget.<locals>.dependency" or budgeted(dependency)
+        for dependency in dependant.dependencies
+    )
+
+
+BUDGETED_ROUTES = {
+    (method, route.path)
+    for route in main_app.routes
+    if isinstance(route, APIRoute) and budgeted(route.dependant)
+    for method in route.methods
+}
+
+
+def route_of(name: str) -> tuple[str, str]:
+    method, path = name.split(" ", 1)
+    [route] = [
+        route for route in main_app.routes
+        if isinstance(route, APIRoute) and method in route.methods and route.path_regex.match(path)
+    ]
+    return method, route.path
+
+
+@pytest.fixture
+def checked_routes(client, monkeypatch):
+    checked = set()
+    check_budget = budgets.check_budget
+
+    def record(counter, name, *args, **kwargs):
+        checked.add(route_of(name))
+        return check_budget(counter, name, *args, **kwargs)
+
+    async def cold_cache(request):
+        principal_cache.clear()
+
+    monkeypatch.setattr(budgets, "check_budget", record)
+    client.event_hooks["request"].append(cold_cache)
+    return checked
+
+
+async def test_every_budgeted_route_stays_within_budget(client, account, checked_routes):
+    async def call(method: str, url: str, **kwargs) -> dict | list:
+        kwargs.setdefault("headers", account.headers)
+        response = await client.request(method, url, **kwargs)
+        assert response.status_code == 200, (method, url, response.text)
+        return response.json() if response.headers["content-type"].startswith("application/json") else {}
+
+    tokens = await call("POST", "/sign-in", json={"username": account.username, "password": "secret"}, headers={})
+    await call("POST", "/token/refresh", json={"refresh_token": tokens["refresh_token"]}, headers={})
+
+    await call("POST", "/boards", params={"title": "Budget"})
+    other = await call("POST", "/boards", params={"title": "Other"})
+    [board, other] = [board for board in await call("GET", "/boards") if board["title"] in ("Budget", "Other")]
+    todo = await call("POST", "/sections", data={"title": "Todo", "boardId": board["id"]})
+    done = await call("POST", "/sections", data={"title": "Done", "boardId": board["id"]})
+    elsewhere = await call("POST", "/sections", data={"title": "Elsewhere", "boardId": other["id"]})
+    cards = [await call("POST", "/cards", params={"sectionId": todo["id"], "title": f"card {n}"}) for n in range(3)]
+
+    await call("PUT", f"/cards/{cards[0]['id']}", json={"title": "renamed"})
+    await call("PUT", f"/cards/{cards[1]['id']}/move", params={"sectionId": done["id"], "position": 0})
+    # перенос между досками — две версии и две записи журнала
+    await call("PUT", f"/cards/{cards[2]['id']}/move", params={"sectionId": elsewhere["id"], "position": 0})
+    await call("PUT", f"/sections/{todo['id']}", params={"newTitle": "Renamed"})
+    await call("PUT", f"/sections/{done['id']}/move", params={"position": 0})
+    await call("PUT", f"/boards/{board['id']}", params={"newTitle": "Budget 2"})
+
+    await call("GET", f"/boards/{board['id']}")
+    await call("GET", "/boards", params={"view": "full"})
+    await call("GET", f"/boards/{board['id']}/changes", params={"since": 0})
+    await call("GET", f"/boards/{board['id']}/export")
+    await call("GET", "/search", params={"q": "renamed"})
+    await call("GET", "/quickfind", params={"prefix": "card"})
+
+    await call("POST", f"/boards/{board['id']}/clone")
+    await call("PUT", f"/boards/{board['id']}/layout", json={
+        "sections": [todo["id"], done["id"]], "cards": {str(done["id"]): [cards[0]["id"], cards[1]["id"]]},
+    })
+    await call("POST", "/boards/import", params={"format": "csv"}, content="list,name\nTodo,a\nDone,b\n")
+    await call("POST", "/batch", json={"operations": [
+        {"op": "create", "entity": "card", "sectionId": todo["id"], "title": "batched"},
+    ]})
+
+    await call("DELETE", f"/cards/{cards[0]['id']}")
+    await call("DELETE", f"/sections/{todo['id']}")
+    await call("DELETE", f"/boards/{board['id']}")
+
+    assert checked_routes == BUDGETED_ROUTES
@@ -0,0 +1,76 @@
+from sqlalchemy import select
+
+from app.core import settings
+from app.domain import BoardChange
+from conftest import make_board
+
+
+async def changes_since(client, account, board_id: int, since: int) -> dict:
+    response = await client.get(f"/boards/{board_id}/changes", params={"since": since}, headers=account.headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+async def rename(client, account, card_id: int, title: str):
+    response = await client.put(f"/cards/{card_id}", json={"title": title}, headers=account.headers)
+    assert response.status_code == 200
+
+
+async def test_changes_come_in_version_order(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Done": []})
+    todo, done = tree.sections
+    a, b = tree.sections[todo]
+    start = (await changes_since(client, account, tree.id, 0))["version"]
+
+    await rename(client, account, a, "renamed")
+    await client.put(f"/cards/{b}/move", params={"sectionId": done, "position": 0}, headers=account.headers)
+    await client.delete(f"/cards/{a}", headers=account.headers)
+
+    delta = await changes_since(client, account, tree.id, start)
+    assert not delta["reset"]
+    assert [(change["version"], change["entity"], change["op"], change["entity_id"]) for change in delta["changes"]] == [
+        (start + 1, "card", "update", a), (start + 2, "card", "move", b), (start + 3, "card", "delete", a),
+    ]
+    assert delta["version"] == start + 3
+    assert delta["changes"][1]["payload"]["section_id"] == done
+    # клиент уже на последней версии
+    assert await changes_since(client, account, tree.id, start + 3) == {"version": start + 3, "reset": False, "changes": []}
+
+
+async def test_client_behind_retain_gets_snapshot(client, db, account, monkeypatch):
+    monkeypatch.setattr(settings.changelog, "retain", 3)
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [card] = tree.sections[todo]
+    start = (await changes_since(client, account, tree.id, 0))["version"]
+    for n in range(4):
+        await rename(client, account, card, f"title {n}")
+
+    # ровно retain изменений ещё отдаются дельтой
+    assert len((await changes_since(client, account, tree.id, start + 1))["changes"]) == 3
+    reset = await changes_since(client, account, tree.id, start)
+
+    assert reset["reset"] and reset["changes"] == [] and reset["version"] == start + 4
+    assert reset["snapshot"]["sections"][0]["cards"][0]["title"] == "title 3"
+
+
+async def test_compaction_keeps_last_retain_changes(client, db, account, monkeypatch):
+    monkeypatch.setattr(settings.changelog, "retain", 2)
+    monkeypatch.setattr(settings.changelog, "compact_every", 4)
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [card] = tree.sections[todo]
+    version = (await changes_since(client, account, tree.id, 0))["version"]
+    # доводим версию до следующего кратного compact_every
+    while version % 4:
+        await rename(client, account, card, f"title {version}")
+        version += 1
+
+    result = await db.execute(select(BoardChange.version).where(BoardChange.board_id == tree.id).order_by(BoardChange.version))
+    assert result.scalars().all() == [version - 1, version]
+
+    await rename(client, account, card, "after compaction")
+    # журнал начинается после since+1 — дыра, значит снимок
+    assert (await changes_since(client, account, tree.id, version - 2))["reset"]
+    delta = await changes_since(client, account, tree.id, version - 1)
+    assert [change["version"] for change in delta["changes"]] == [version, version + 1]
@@ -0,0 +1,89 @@
+from sqlalchemy import func, select, text
+
+from app.core.statement_budget import count_queries
+from app.crud.board import clone_board
+from app.domain import Board, Card
+from conftest import make_account, make_board, seed_boards
+
+
+def tree_of(board: dict) -> list[tuple[str, str, list[tuple[str, str]]]]:
+    return [
+        (section["title"], section["position"], [(card["title"], card["position"]) for card in section["cards"]])
+        for section in board["sections"]
+    ]
+
+
+def ids_of(board: dict) -> tuple[set[int], set[int]]:
+    sections = {section["id"] for section in board["sections"]}
+    cards = {card["id"] for section in board["sections"] for card in section["cards"]}
+    return sections, cards
+
+
+async def test_clone_copies_tree_with_new_ids_and_same_keys(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Empty": [], "Done": ["c"]}, title="Source")
+
+    response = await client.post(f"/boards/{tree.id}/clone", params={"title": "Copy"}, headers=account.headers)
+    assert response.status_code == 200
+    clone = response.json()
+    assert (clone["title"], clone["section_count"], clone["card_count"]) == ("Copy", 3, 3)
+
+    source = (await client.get(f"/boards/{tree.id}", headers=account.headers)).json()
+    copy = (await client.get(f"/boards/{clone['id']}", headers=account.headers)).json()
+    assert tree_of(copy) == tree_of(source)
+    source_sections, source_cards = ids_of(source)
+    copy_sections, copy_cards = ids_of(copy)
+    assert not source_sections & copy_sections and not source_cards & copy_cards
+
+    # денормализованный board_id карточек указывает на копию, а секция — на ту же копию
+    mismatched = await db.execute(text("""
+        SELECT count(*) FROM cards c JOIN sections s ON s.id = c.section_id
+        WHERE c.section_id = ANY(:sections) AND (c.board_id <> :board_id OR s.board_id <> :board_id)
+    """), {"sections": list(copy_sections), "board_id": clone["id"]})
+    assert mismatched.scalar_one() == 0
+
+
+async def test_clone_skips_soft_deleted_rows(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "gone"], "Removed": ["b"]})
+    todo, removed = tree.sections
+    await client.delete(f"/cards/{tree.sections[todo][1]}", headers=account.headers)
+    await client.delete(f"/sections/{removed}", headers=account.headers)
+
+    clone = (await client.post(f"/boards/{tree.id}/clone", headers=account.headers)).json()
+
+    assert (clone["section_count"], clone["card_count"]) == (1, 1)
+    copy = (await client.get(f"/boards/{clone['id']}", headers=account.headers)).json()
+    assert [(title, [card for card, _ in cards]) for title, _, cards in tree_of(copy)] == [("Todo", ["a"])]
+    # мягко удалённые строки не копируются даже невидимыми
+    copied = await db.execute(select(func.count()).select_from(Card).where(Card.board_id == clone["id"]))
+    assert copied.scalar_one() == 1
+
+
+async def test_clone_of_foreign_or_missing_board_copies_nothing(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    stranger = await make_account(db)
+    deleted = await make_board(db, account, {"Todo": []})
+    await client.delete(f"/boards/{deleted.id}", headers=account.headers)
+
+    foreign = await client.post(f"/boards/{tree.id}/clone", headers=stranger.headers)
+    missing = await client.post("/boards/0/clone", headers=account.headers)
+    gone = await client.post(f"/boards/{deleted.id}/clone", headers=account.headers)
+
+    assert (foreign.status_code, missing.status_code, gone.status_code) == (403, 404, 404)
+    boards = await db.execute(select(func.count()).select_from(Board).where(Board.customer_id == stranger.id))
+    assert boards.scalar_one() == 0
+
+
+async def test_clone_statement_count_does_not_grow_with_board(db, account):
+    [small, large] = [
+        (await seed_boards(db, [account.id], boards=1, sections=sections, cards=cards))[0]
+        for sections, cards in ((1, 2), (20, 100))
+    ]
+
+    counts = []
+    for board_id in (small, large):
+        with count_queries() as counter:
+            clone = await clone_board(db, board_id, account.id)
+        counts.append(counter.statements)
+
+    assert (clone.section_count, clone.card_count) == (20, 2000)
+    assert counts == [1, 1]
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import tracemalloc
+
+import orjson
+
+from app.crud.export import EXPORT_BATCH_SIZE, iter_board_rows, stream_board_export
+from conftest import make_board, seed_boards
+
+
+async def test_ndjson_export_streams_tree_in_order(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Empty": [], "Done": ["c"]}, title="Export")
+
+    response = await client.get(f"/boards/{tree.id}/export", headers=account.headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [orjson.loads(line) for line in response.content.splitlines()]
+    assert lines[0] == {"type": "board", "id": tree.id, "title": "Export"}
+    assert [(line["type"], line["title"]) for line in lines[1:]] == [
+        ("section", "Todo"), ("card", "a"), ("card", "b"),
+        ("section", "Empty"),
+        ("section", "Done"), ("card", "c"),
+    ]
+
+
+async def test_gzip_csv_export(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a, with comma"]})
+
+    response = await client.get(
+        f"/boards/{tree.id}/export", params={"format": "csv", "gzip": True}, headers=account.headers,
+    )
+
+    assert response.status_code == 200
+    assert 'filename="board-' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert [(row["type"], row["title"]) for row in rows] == [("section", "Todo"), ("card", "a, with comma")]
+
+
+async def collect_batches(board_id: int) -> list[list[dict]]:
+    return [batch async for batch in iter_board_rows(board_id)]
+
+
+async def export_peak(board_id: int) -> tuple[int, int]:
+    """(пик аллокаций Python за выгрузку, размер тела) — тело не копится, только считается."""
+    size = 0
+    tracemalloc.start()
+    try:
+        async for chunk in stream_board_export({"id": board_id, "title": "Board"}, "ndjson", compress=True):
+            size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, size
+
+
+async def test_large_export_arrives_in_cursor_batches(db, account):
+    [board_id] = await seed_boards(db, [account.id], boards=1, sections=10, cards=500)
+
+    batches = await collect_batches(board_id)
+
+    # строки приходят пачками курсора, а не одним списком на всю доску
+    cards = [[row for row in batch if row["type"] == "card"] for batch in batches]
+    assert len(batches) == 10 * 500 // EXPORT_BATCH_SIZE
+    assert all(len(batch) == EXPORT_BATCH_SIZE for batch in cards)
+    rows = [row for batch in batches for row in batch]
+    assert [row["position"] for row in rows if row["type"] == "section"] == sorted(
+        row["position"] for row in rows if row["type"] == "section"
+    )
+    assert len(rows) == 10 + 10 * 500
+
+
+async def test_export_memory_does_not_grow_with_board(db, account):
+    [small, large] = [
+        (await seed_boards(db, [account.id], boards=1, sections=10, cards=cards))[0]
+        for cards in (200, 2000)
+    ]
+
+    small_peak, small_size = await export_peak(small)
+    large_peak, large_size = await export_peak(large)
+
+    assert large_size > 5 * small_size
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import asyncpg
+
+from app.core import settings
+from app.core.db import db_helper
+from app.workers.warmup import run_warmup, warm_pools, warmup_state
+from conftest import make_board
+
+
+async def test_liveness(client):
+    response = await client.get("/health/live")
+
+    assert response.status_code == 200
+
+
+async def test_ready_only_after_warmup(client, monkeypatch):
+    monkeypatch.setattr(warmup_state, "ready", False)
+    monkeypatch.setattr(warmup_state, "error", None)
+
+    assert (await client.get("/health/ready")).status_code == 503
+
+    await run_warmup()
+
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["error"] is None
+    # pool_size соединений на единственный (primary) движок
+    assert body["connections"] == settings.db.pool_size
+
+
+async def test_disabled_warmup_is_ready_at_once(client, monkeypatch):
+    monkeypatch.setattr(warmup_state, "ready", False)
+    monkeypatch.setattr(settings.warmup, "enabled", False)
+
+    await run_warmup()
+
+    assert (await client.get("/health/ready")).status_code == 200
+
+
+@contextmanager
+def counted_prepares():
+    """SQL, которые asyncpg готовит на сервере (Connection.prepare) внутри блока."""
+    prepared = []
+    original = asyncpg.Connection.prepare
+
+    async def prepare(self, query, *args, **kwargs):
+        prepared.append(query)
+        return await original(self, query, *args, **kwargs)
+
+    asyncpg.Connection.prepare = prepare
+    try:
+        yield prepared
+    finally:
+        asyncpg.Connection.prepare = original
+
+
+async def hot_requests(client, account, board_id: int):
+    for url in (f"/boards/{board_id}", "/boards", "/boards?view=summary", f"/boards/{board_id}/changes?since=0"):
+        response = await client.get(url, headers=account.headers)
+        assert response.status_code == 200, url
+
+
+async def test_warmup_prepares_hot_statements_before_first_request(client, db, account):
+    cold_board = await make_board(db, account, {"Todo": ["a"]})
+    warm_board = await make_board(db, account, {"Todo": ["a"]})
+
+    # новый пул: каждое соединение готовит statement-ы заново
+    await db_helper.dispose()
+    with counted_prepares() as cold:
+        await hot_requests(client, account, cold_board.id)
+
+    await db_helper.dispose()
+    await warm_pools()
+    with counted_prepares() as warm:
+        await hot_requests(client, account, warm_board.id)
+
+    assert cold
+    assert warm == []
@@ -0,0 +1,39 @@
+import json
+
+from app.core import settings
+
+
+async def test_trello_import_tolerates_non_numeric_pos(client, account):
+    export = {
+        "name": "Imported",
+        "lists": [
+            {"id": "l1", "name": "Todo", "pos": 1024},
+            {"id": "l2", "name": "Done", "pos": "bottom"},
+        ],
+        "cards": [
+            {"id": "c1", "idList": "l1", "name": "late", "pos": 300},
+            {"id": "c2", "idList": "l1", "name": "tail", "pos": "bottom", "desc": 42},  # не строка — str()
+            {"id": "c3", "idList": "l1", "name": "early", "pos": 100},
+            {"id": "c4", "idList": "l2", "name": "archived", "pos": 1, "closed": True},
+        ],
+    }
+    response = await client.post("/boards/import", headers=account.headers, content=json.dumps(export))
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["title"], result["sections"], result["cards"], result["skipped"]) == ("Imported", 2, 3, 1)
+
+    board = (await client.get(f"/boards/{result['id']}", headers=account.headers)).json()
+    # "bottom" берёт pos предыдущей карточки списка и встаёт сразу за ней
+    assert [(section["title"], [card["title"] for card in section["cards"]]) for section in board["sections"]] == [
+        ("Todo", ["early", "late", "tail"]),
+        ("Done", []),
+    ]
+
+
+async def test_import_rejects_oversized_upload(client, account, monkeypatch):
+    monkeypatch.setattr(settings.imports, "max_upload_bytes", 64)
+    response = await client.post(
+        "/boards/import", params={"format": "csv"}, headers=account.headers,
+        content="list,name\n" + "Todo,card\n" * 20,
+    )
+    assert response.status_code == 413
@@ -0,0 +1,217 @@
+"""
+Регрессия планов горячих запросов. База засевается так, чтобы у планировщика
+был выбор (тысячи пользователей, досок и секций, сотня тысяч карточек, ANALYZE),
+затем настоящие функции CRUD выполняются под перехватом SQL, и каждый пойманный
+statement идёт в EXPLAIN с теми же параметрами. В плане не должно быть ни Seq Scan,
+ни сортировки: строки находит индекс, и порядок приходит из него же.
+
+Исключения разрешаются явно: поиск ранжирует страницу top-N сортировкой
+(ts_rank_cd не индексируется), выгрузка досортировывает карточки внутри секции.
+"""
+from contextlib import contextmanager
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+
+from app.core.db import db_helper
+from app.crud.batch import resolve_owners
+from app.crud.board import (
+    clone_board,
+    get_board_snapshot,
+    get_board_summaries_for_user,
+    get_board_version,
+    get_boards_fingerprint,
+    get_boards_for_user,
+)
+from app.crud.card import create_card, delete_card, move_card, update_card
+from app.crud.changes import get_changes_since
+from app.crud.export import iter_board_rows
+from app.crud.layout import apply_board_layout
+from app.crud.quickfind import _fetch_candidates
+from app.crud.search import search_cards
+from app.crud.section import create_section, move_section, update_section
+from app.domain.schemas import BatchOperation, BoardLayout, CardCreate, CardUpdate, SectionCreate
+from conftest import analyze, make_account, seed_boards, seed_customers
+
+PLANNER_SETTINGS = {"Seq Scan": "enable_seqscan", "Sort": "enable_sort", "Incremental Sort": "enable_incremental_sort"}
+
+_seed = {}
+
+
+@pytest.fixture
+async def seeded(db):
+    """Засевается один раз на всю сессию тестов: (владелец, его доски, чужая доска)."""
+    if not _seed:
+        account = await make_account(db)
+        others = await seed_customers(db, 2000)
+        board_ids = await seed_boards(db, [account.id], boards=4, sections=5, cards=20)
+        foreign = await seed_boards(db, others[:300], boards=4, sections=5, cards=20)
+        # журнал изменений: по 20 версий на доску
+        await db.execute(text("""
+            INSERT INTO board_changes (board_id, version, entity, entity_id, op, payload, created_date)
+            SELECT b.id, v, 'board', b.id, 'update', '{}'::jsonb, now()
+            FROM boards AS b, generate_series(1, 20) AS v
+        """))
+        await db.execute(text("UPDATE boards SET version = 20"))
+        await db.commit()
+        await analyze(db)
+        _seed.update(account=account, board_ids=board_ids, foreign=foreign[0])
+    return _seed["account"], _seed["board_ids"], _seed["foreign"]
+
+
+async def first_section(db, board_id: int) -> tuple[int, list[int]]:
+    result = await db.execute(text("""
+        SELECT s.id, array_agg(c.id ORDER BY c.position) FROM sections s JOIN cards c ON c.section_id = s.id
+        WHERE s.board_id = :board_id AND s.deleted_at IS NULL AND c.deleted_at IS NULL
+        GROUP BY s.id, s.position ORDER BY s.position LIMIT 1
+    """), {"board_id": board_id})
+    return tuple(result.one())
+
+
+@contextmanager
+def captured_sql():
+    """(statement, parameters) всего, что уходит в primary внутри блока."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "INSERT", "DELETE"):
+            statements.append((statement, parameters))
+
+    engine = db_helper.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def assert_indexed(db, statements, allow: frozenset = frozenset()):
+    """
+    EXPLAIN каждого statement с его параметрами. На нескольких строках под ключом
+    bitmap-скан с сортировкой дешевле упорядоченного индекса при любом объёме таблицы,
+    поэтому по стоимости не отличить «индекс не нужен» от «индекса нет». Запрещённые
+    узлы выключаются в планировщике: он всё равно вставит Seq Scan или Sort, если
+    никакой индекс не даёт нужных строк или порядка, — такие узлы и ищем в плане.
+    allow — типы узлов, которые запросу разрешены (с объяснением у вызова).
+    """
+    assert statements
+    problems = []
+    connection = await db.connection()
+    for node_type, setting in PLANNER_SETTINGS.items():
+        if node_type not in allow:
+            await connection.exec_driver_sql(f"SET LOCAL {setting} = off")
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar_one()
+        plan = (orjson.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+        bad = [
+            f"{node['Node Type']} {node.get('Relation Name', '')}".strip()
+            for node in plan_nodes(plan)
+            if node["Node Type"] in PLANNER_SETTINGS and node["Node Type"] not in allow
+        ]
+        if bad:
+            result = await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            problems.append(", ".join(bad) + f" in:\n{statement}\n" + "\n".join(result.scalars()))
+    await db.rollback()
+    assert not problems, "\n\n".join(problems)
+
+
+async def test_board_read_plans(db, seeded):
+    account, board_ids, _ = seeded
+    with captured_sql() as statements:
+        await get_board_version(db, board_ids[0])
+        await get_board_snapshot(db, board_ids[0])
+        await get_changes_since(db, board_ids[0], 5, 1000)
+    await assert_indexed(db, statements)
+
+
+async def test_board_list_plans(db, seeded):
+    account, board_ids, _ = seeded
+    with captured_sql() as statements:
+        await get_boards_fingerprint(db, account.id)
+        await get_board_summaries_for_user(db, account.id, after_id=board_ids[0], limit=100)
+        await get_boards_for_user(db, account.id, after_id=board_ids[0], limit=100)
+    await assert_indexed(db, statements)
+
+
+async def test_card_write_plans(db, seeded):
+    account, board_ids, _ = seeded
+    section_id, card_ids = await first_section(db, board_ids[0])
+    other_section, _ = await first_section(db, board_ids[1])
+    with captured_sql() as statements:
+        card = await create_card(db, section_id, CardCreate(title="new"), account.id)
+        await update_card(db, card_ids[0], CardUpdate(title="renamed"), account.id)
+        await move_card(db, card_ids[1], section_id, 5, account.id)
+        await move_card(db, card_ids[2], other_section, 0, account.id)
+        await delete_card(db, card.id, account.id)
+    await assert_indexed(db, statements)
+
+
+async def test_section_write_plans(db, seeded):
+    account, board_ids, _ = seeded
+    section_id, _ = await first_section(db, board_ids[2])
+    with captured_sql() as statements:
+        await create_section(db, SectionCreate(title="new", boardId=board_ids[2], position=1), account.id)
+        await update_section(db, section_id, "renamed", account.id)
+        await move_section(db, section_id, 3, account.id)
+    await assert_indexed(db, statements)
+
+
+async def test_ownership_miss_plans(db, seeded):
+    account, _, foreign = seeded
+    foreign_section, foreign_cards = await first_section(db, foreign)
+    with captured_sql() as statements:
+        with pytest.raises(HTTPException):
+            await update_card(db, foreign_cards[0], CardUpdate(title="x"), account.id)
+        await db.rollback()
+        with pytest.raises(HTTPException):
+            await update_section(db, foreign_section, "x", account.id)
+        await db.rollback()
+    await assert_indexed(db, statements)
+
+
+async def test_layout_clone_and_batch_plans(db, seeded):
+    account, board_ids, _ = seeded
+    section_id, card_ids = await first_section(db, board_ids[3])
+    with captured_sql() as statements:
+        await apply_board_layout(db, board_ids[3], BoardLayout(cards={section_id: card_ids[::-1]}), account.id)
+        await clone_board(db, board_ids[3], account.id)
+        await resolve_owners(db, [
+            BatchOperation(op="move", entity="card", id=card_ids[0], section_id=section_id),
+            BatchOperation(op="create", entity="section", board_id=board_ids[3], title="x"),
+        ])
+    await assert_indexed(db, statements)
+
+
+async def test_export_plan(db, seeded):
+    _, board_ids, _ = seeded
+    with captured_sql() as statements:
+        async for _ in iter_board_rows(board_ids[0]):
+            pass
+    # секции идут по индексу в порядке позиций, карточки досортировываются внутри
+    # одной секции — память ограничена размером секции, строки текут сразу
+    await assert_indexed(db, statements, allow=frozenset({"Incremental Sort"}))
+
+
+async def test_quickfind_plans(db, seeded):
+    account, _, _ = seeded
+    with captured_sql() as statements:
+        await _fetch_candidates(db, account.id, "task 1")
+        await _fetch_candidates(db, account.id, "ta")
+    await assert_indexed(db, statements)
+
+
+async def test_search_plan(db, seeded):
+    account, _, _ = seeded
+    with captured_sql() as statements:
+        await search_cards(db, account.id, "gamma", limit=20)
+        await search_cards(db, account.id, "gamma", after=(0.1, 10**9), limit=20)
+    await assert_indexed(db, statements, allow=frozenset({"Sort"}))
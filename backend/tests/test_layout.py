@@ -0,0 +1,102 @@
+from sqlalchemy import text
+
+from app.core.statement_budget import count_queries
+from app.crud.card import move_card
+from app.crud.layout import apply_board_layout
+from app.domain.schemas import BoardLayout
+from conftest import make_account, make_board, seed_boards
+
+
+async def board_cards(db, board_id: int) -> dict[int, list[int]]:
+    """section_id -> id карточек в порядке позиций."""
+    result = await db.execute(text("""
+        SELECT s.id, array_agg(c.id ORDER BY c.position) FROM sections s JOIN cards c ON c.section_id = s.id
+        WHERE s.board_id = :board_id GROUP BY s.id, s.position ORDER BY s.position
+    """), {"board_id": board_id})
+    return dict(result.all())
+
+
+async def layout_statements(db, account, cards_per_section: int) -> int:
+    """Сколько statement-ов уходит на перестановку всех карточек двух секций доски."""
+    [board_id] = await seed_boards(db, [account.id], boards=1, sections=2, cards=cards_per_section)
+    first, second = (await board_cards(db, board_id)).items()
+    # первая секция задом наперёд, половина второй переезжает в её начало
+    layout = BoardLayout(sections=[second[0], first[0]], cards={
+        first[0]: second[1][::2] + first[1][::-1],
+        second[0]: second[1][1::2],
+    })
+    with count_queries() as counter:
+        await apply_board_layout(db, board_id, layout, account.id)
+
+    assert await board_cards(db, board_id) == {second[0]: second[1][1::2], first[0]: second[1][::2] + first[1][::-1]}
+    return counter.statements
+
+
+def titles(board: dict) -> list[tuple[str, list[str]]]:
+    return [(section["title"], [card["title"] for card in section["cards"]]) for section in board["sections"]]
+
+
+async def test_layout_reorders_sections_and_moves_cards(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Doing": ["c"], "Done": []})
+    todo, doing, done = tree.sections
+    a, b = tree.sections[todo]
+    [c] = tree.sections[doing]
+
+    response = await client.put(f"/boards/{tree.id}/layout", headers=account.headers, json={
+        "sections": [done, todo],
+        # b уезжает в Done, в Todo задан порядок c, a — c переезжает из Doing
+        "cards": {str(todo): [c, a], str(done): [b]},
+    })
+    assert response.status_code == 200
+    version = response.json()["version"]
+
+    board = (await client.get(f"/boards/{tree.id}", headers=account.headers)).json()
+    # неупомянутая секция Doing остаётся после перечисленных
+    assert titles(board) == [("Done", ["b"]), ("Todo", ["c", "a"]), ("Doing", [])]
+
+    changes = await client.get(f"/boards/{tree.id}/changes", params={"since": version - 1}, headers=account.headers)
+    assert changes.json()["version"] == version
+
+
+async def test_layout_rejects_foreign_section(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    other = await make_board(db, await make_account(db), {"Other": []})
+
+    response = await client.put(f"/boards/{tree.id}/layout", headers=account.headers, json={
+        "sections": [next(iter(other.sections))],
+    })
+
+    assert response.status_code == 404
+
+
+async def test_layout_rejects_duplicate_cards(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"], "Done": []})
+    todo, done = tree.sections
+    [a] = tree.sections[todo]
+
+    response = await client.put(f"/boards/{tree.id}/layout", headers=account.headers, json={
+        "cards": {str(todo): [a], str(done): [a]},
+    })
+
+    assert response.status_code == 400
+
+
+async def test_layout_statement_count_does_not_depend_on_board_size(db, account):
+    small = await layout_statements(db, account, 5)
+    large = await layout_statements(db, account, 250)
+
+    # столько же, сколько у маленькой доски, и в пределах бюджета PUT /layout
+    assert large == small <= 9
+
+
+async def test_layout_beats_single_moves_on_500_cards(db, account):
+    layout = await layout_statements(db, account, 250)
+
+    [board_id] = await seed_boards(db, [account.id], boards=1, sections=2, cards=250)
+    first, second = (await board_cards(db, board_id)).items()
+    with count_queries() as counter:
+        # те же карточки первой секции в том же порядке — по одному переносу на карточку
+        for index, card_id in enumerate(second[1][::2] + first[1][::-1]):
+            await move_card(db, card_id, first[0], index, account.id)
+
+    assert counter.statements > 100 * layout
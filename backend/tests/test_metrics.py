@@ -0,0 +1,55 @@
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.core import settings
+from conftest import make_board
+
+
+@pytest.fixture
+def metrics_token(monkeypatch) -> dict:
+    monkeypatch.setattr(settings.metrics, "token", "scrape-token")
+    return {"Authorization": "Bearer scrape-token"}
+
+
+def samples(text: str) -> dict[tuple[str, tuple], float]:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+async def test_metrics_are_off_without_token(client):
+    response = await client.get("/metrics")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+async def test_metrics_require_token(client, metrics_token, headers):
+    response = await client.get("/metrics", headers=headers)
+
+    assert response.status_code == 401
+
+
+async def test_metrics_expose_pools_component_stats_and_routes(client, db, account, metrics_token):
+    tree = await make_board(db, account, {"Todo": []})
+    assert (await client.get(f"/boards/{tree.id}", headers=account.headers)).status_code == 200
+
+    response = await client.get("/metrics", headers=metrics_token)
+
+    assert response.status_code == 200
+    exposed = samples(response.text)
+    names = {name for name, _ in exposed}
+    # PoolCollector: занятость пула на момент опроса
+    for gauge in ("db_pool_checked_out", "db_pool_checked_in", "db_pool_overflow", "db_pool_max_overflow"):
+        assert (gauge, (("pool", "primary"),)) in exposed
+    assert exposed[("db_pool_size", (("pool", "primary"),))] == settings.db.pool_size
+    # StatsCollector: stats() компонентов
+    assert {
+        "app_principal_cache_size", "app_password_hasher_rejected", "app_snapshot_cache_hits",
+        "app_quickfind_cache_hits", "app_board_hub_boards", "app_db_recent_writers",
+    } <= names
+    # серии запросов — по шаблону роута, а не по id доски
+    assert exposed[("http_requests_total", (("method", "GET"), ("route", "/boards/{board_id}"), ("status", "200")))] >= 1
+    assert not any(f"/boards/{tree.id}" in dict(labels).get("route", "") for _, labels in exposed)
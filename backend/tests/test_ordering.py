@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.core import settings
+from app.crud.access import alive
+from app.crud.ordering import key_between, key_for_index, keys_between
+from app.domain import Card
+from app.workers.rebalancer import rebalance_cards
+from conftest import make_board
+
+
+def test_key_between_ends_and_neighbours():
+    first = key_between(None, None)
+    assert first == "a0"
+    assert key_between(first, None) > first
+    assert key_between(None, first) < first
+    # соседние «целые» ключи: между ними только дробная часть
+    middle = key_between("a0", "a1")
+    assert "a0" < middle < "a1" and middle.startswith("a0")
+
+
+@pytest.mark.parametrize("a, b", [("a1", "a1"), ("a2", "a1"), ("a0", "a10"), ("b000", None)])
+def test_key_between_rejects_equal_reversed_and_invalid_keys(a, b):
+    with pytest.raises(ValueError):
+        key_between(a, b)
+
+
+def test_repeated_insert_into_same_gap_stays_ordered():
+    low, high = "a0", "a1"
+    for _ in range(200):
+        # каждый раз вставляем вплотную к нижней границе — худший случай для длины ключа
+        middle = key_between(low, high)
+        assert low < middle < high
+        high = middle
+    assert len(high) > settings.ordering.max_key_length
+
+
+def test_long_append_and_prepend_runs_keep_keys_short():
+    appended = [key_between(None, None)]
+    for _ in range(10_000):
+        appended.append(key_between(appended[-1], None))
+    assert appended == sorted(appended) and len(set(appended)) == len(appended)
+    assert max(map(len, appended)) <= 4
+
+    prepended = [key_between(None, None)]
+    for _ in range(10_000):
+        prepended.append(key_between(None, prepended[-1]))
+    assert prepended[::-1] == sorted(prepended)
+    assert max(map(len, prepended)) <= 4
+
+
+@pytest.mark.parametrize("a, b", [(None, None), ("a5", None), (None, "a5"), ("a0", "a1"), ("a0V", "a0W")])
+def test_keys_between_are_increasing_and_inside_bounds(a, b):
+    keys = keys_between(a, b, 500)
+
+    assert len(keys) == 500 and keys == sorted(set(keys))
+    assert a is None or a < keys[0]
+    assert b is None or keys[-1] < b
+
+
+def test_keys_between_spreads_evenly():
+    # ребалансировщик раздаёт ключи пачкой — они должны быть короткими
+    assert max(map(len, keys_between(None, None, 1000))) <= 4
+    assert max(map(len, keys_between("a0", "a1", 1000))) <= 5
+    assert keys_between("a0", "a1", 0) == []
+
+
+async def set_positions(db, card_ids: list[int], positions: list[str]):
+    for card_id, position in zip(card_ids, positions):
+        await db.execute(update(Card).where(Card.id == card_id).values(position=position))
+    await db.commit()
+
+
+async def positions_of(db, section_id: int) -> list[str]:
+    result = await db.execute(
+        select(Card.position).where(Card.section_id == section_id, *alive(Card)).order_by(Card.position, Card.id)
+    )
+    return result.scalars().all()
+
+
+async def test_key_for_index_steps_over_duplicate_keys(db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b", "c", "d"]})
+    [todo] = tree.sections
+    # два перемещения в одну щель оставили одинаковые ключи
+    await set_positions(db, tree.sections[todo], ["a1", "a2", "a2", "a3"])
+
+    criteria = (Card.section_id == todo, *alive(Card))
+    # на место между дублями: ключ встаёт после всей группы, но до следующего
+    between = await key_for_index(db, Card.position, 2, *criteria)
+    assert "a2" < between < "a3"
+    assert await key_for_index(db, Card.position, 0, *criteria) < "a1"
+    assert await key_for_index(db, Card.position, 10, *criteria) > "a3"
+
+
+async def test_rebalancer_rewrites_only_sections_over_threshold(db, account, monkeypatch):
+    monkeypatch.setattr(settings.ordering, "max_key_length", 6)
+    long_keys = await make_board(db, account, {"Long": ["a", "b", "c"]})
+    at_limit = await make_board(db, account, {"Limit": ["a", "b"]})
+    duplicates = await make_board(db, account, {"Dups": ["a", "b", "c"]})
+    [long_section], [limit_section], [dup_section] = long_keys.sections, at_limit.sections, duplicates.sections
+    await set_positions(db, long_keys.sections[long_section], ["a0", "a0V", "a0VVVVV"])
+    await set_positions(db, at_limit.sections[limit_section], ["a0", "a0VVVV"])
+    await set_positions(db, duplicates.sections[dup_section], ["a1", "a1", "a2"])
+
+    # другие тесты тоже могли оставить длинные ключи — крутим, пока есть работа
+    while await rebalance_cards(db):
+        pass
+
+    rebalanced = await positions_of(db, long_section)
+    assert rebalanced == keys_between(None, None, 3)
+    assert await positions_of(db, limit_section) == ["a0", "a0VVVV"]
+    assert len(set(await positions_of(db, dup_section))) == 3
+
+    # порядок карточек сохранился
+    result = await db.execute(
+        select(Card.id).where(Card.section_id == long_section).order_by(Card.position)
+    )
+    assert result.scalars().all() == long_keys.sections[long_section]
@@ -0,0 +1,94 @@
+import logging
+import re
+
+import pytest
+
+from app.core import settings
+from app.middleware import profiler
+from app.security.principal_cache import principal_cache
+from conftest import make_board
+
+
+@pytest.fixture
+def profiles(monkeypatch) -> list[profiler.RequestProfile]:
+    """Профили запросов, которые завёл ProfilerMiddleware."""
+    created = []
+    make_profile = profiler.RequestProfile
+
+    def record(**kwargs):
+        profile = make_profile(**kwargs)
+        created.append(profile)
+        return profile
+
+    monkeypatch.setattr(profiler, "RequestProfile", record)
+    return created
+
+
+def server_timing(header: str) -> dict[str, tuple[float, str | None]]:
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        params = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(params["dur"]), params.get("desc", "").strip('"') or None)
+    return metrics
+
+
+async def test_server_timing_reports_statements_and_phases(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    principal_cache.clear()
+
+    response = await client.get(f"/boards/{tree.id}", headers=account.headers)
+
+    timing = server_timing(response.headers["Server-Timing"])
+    assert set(timing) == {"db", "orm", "serialize", "total"}
+    # пользователь, версия доски, снимок
+    assert timing["db"][1] == "3 statements"
+    assert 0 < timing["db"][0] <= timing["total"][0]
+
+
+async def test_serialize_response_hook_times_response_model(client, db, account, profiles):
+    # проверка, что обёртка fastapi.routing.serialize_response всё ещё вызывается роутами:
+    # если FastAPI перестанет брать её из модуля, serialize останется нулём
+    tree = await make_board(db, account, {"Todo": ["a", "b"]})
+
+    await client.get("/boards", params={"view": "full"}, headers=account.headers)
+    await client.get(f"/boards/{tree.id}", headers=account.headers)
+
+    listed, snapshot = profiles
+    assert listed.serialize_seconds > 0 and listed.orm_seconds > 0
+    # снимок собирается в Postgres и отдаётся готовыми байтами
+    assert snapshot.serialize_seconds == 0
+
+
+async def test_slow_sampled_request_is_logged_with_sql(client, db, account, monkeypatch, caplog):
+    unsampled = await make_board(db, account, {"Todo": ["a"]})
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    monkeypatch.setattr(settings.profiler, "slow_request_ms", 0)
+    monkeypatch.setattr(settings.profiler, "max_logged_statements", 2)
+    caplog.set_level(logging.WARNING, logger=profiler.__name__)
+
+    monkeypatch.setattr(settings.profiler, "sample_rate", 0)
+    await client.get(f"/boards/{unsampled.id}", headers=account.headers)
+    # медленный, но не попал в выборку — в логе ничего
+    assert not caplog.records
+
+    monkeypatch.setattr(settings.profiler, "sample_rate", 1)
+    principal_cache.clear()
+    await client.get(f"/boards/{tree.id}", headers=account.headers)
+
+    [record] = caplog.records
+    header, *statements = record.getMessage().splitlines()
+    assert re.match(r"slow request GET /boards/\{board_id\} [\d.]+ms: 3 statements", header)
+    assert len(statements) == 3 and statements[-1] == "  ... 1 more"
+    assert "FROM customer" in statements[0] and f"({account.id},)" in statements[0]
+
+
+async def test_fast_request_is_not_logged(client, db, account, monkeypatch, caplog):
+    tree = await make_board(db, account, {"Todo": []})
+    monkeypatch.setattr(settings.profiler, "sample_rate", 1)
+    monkeypatch.setattr(settings.profiler, "slow_request_ms", 60_000)
+    caplog.set_level(logging.WARNING, logger=profiler.__name__)
+
+    await client.get(f"/boards/{tree.id}", headers=account.headers)
+
+    assert not caplog.records
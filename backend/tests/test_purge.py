@@ -0,0 +1,101 @@
+from sqlalchemy import func, select
+
+from app.core import settings
+from app.core.statement_budget import count_queries
+from app.domain import Board, BoardChange, Card, Section
+from app.workers.purger import purge_boards, purge_cards, purge_sections
+from conftest import make_board
+
+
+async def visible(client, account, board_id: int, word: str) -> dict:
+    """Где видна строка с word в названии: снимок доски, список, поиск, быстрый поиск."""
+    snapshot = await client.get(f"/boards/{board_id}", headers=account.headers)
+    tree = await client.get("/boards", params={"view": "full"}, headers=account.headers)
+    search = await client.get("/search", params={"q": word}, headers=account.headers)
+    quickfind = await client.get("/quickfind", params={"prefix": word}, headers=account.headers)
+    return {
+        "snapshot": snapshot.status_code == 200 and word in snapshot.text,
+        "list": word in tree.text,
+        "search": bool(search.json()),
+        "quickfind": bool(quickfind.json()),
+    }
+
+
+async def count(db, model, *criteria) -> int:
+    return (await db.execute(select(func.count()).select_from(model).where(*criteria))).scalar_one()
+
+
+async def test_deleted_card_disappears_from_all_reads(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["zebra", "yak"]})
+    [todo] = tree.sections
+    zebra, _ = tree.sections[todo]
+    assert set((await visible(client, account, tree.id, "zebra")).values()) == {True}
+
+    assert (await client.delete(f"/cards/{zebra}", headers=account.headers)).status_code == 200
+
+    assert set((await visible(client, account, tree.id, "zebra")).values()) == {False}
+    assert set((await visible(client, account, tree.id, "yak")).values()) == {True}
+    assert (await client.put(f"/cards/{zebra}", json={"title": "x"}, headers=account.headers)).status_code == 404
+
+
+async def test_deleted_section_hides_its_cards(client, db, account):
+    tree = await make_board(db, account, {"Walrus": ["otter"], "Todo": ["yak"]})
+    walrus, _ = tree.sections
+    await visible(client, account, tree.id, "otter")
+
+    assert (await client.delete(f"/sections/{walrus}", headers=account.headers)).status_code == 200
+
+    for word in ("walrus", "otter"):
+        assert set((await visible(client, account, tree.id, word)).values()) == {False}, word
+    assert set((await visible(client, account, tree.id, "yak")).values()) == {True}
+
+
+async def test_deleted_board_hides_whole_tree(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["narwhal"]}, title="Gone")
+    # без единой живой доски список отвечает 404
+    await make_board(db, account, {"Other": []})
+    await visible(client, account, tree.id, "narwhal")
+
+    assert (await client.delete(f"/boards/{tree.id}", headers=account.headers)).status_code == 200
+
+    assert (await client.get(f"/boards/{tree.id}", headers=account.headers)).status_code == 404
+    assert set((await visible(client, account, tree.id, "narwhal")).values()) == {False}
+    summary = await client.get("/boards", params={"view": "summary"}, headers=account.headers)
+    assert tree.id not in [board["id"] for board in summary.json()]
+
+
+async def test_purger_deletes_in_batches_and_keeps_live_rows(client, db, account, monkeypatch):
+    # сначала вычищаем то, что мягко удалили другие тесты
+    await purge_boards(db)
+    await purge_sections(db)
+    await purge_cards(db)
+    monkeypatch.setattr(settings.purge, "batch_size", 3)
+    doomed = await make_board(db, account, {"A": ["1", "2", "3", "4"], "B": ["5", "6", "7"]})
+    kept = await make_board(db, account, {"Todo": ["a", "b"], "Dropped": ["c"], "Done": []})
+    todo, dropped, _ = kept.sections
+    await client.delete(f"/boards/{doomed.id}", headers=account.headers)
+    await client.delete(f"/sections/{dropped}", headers=account.headers)
+    await client.delete(f"/cards/{kept.sections[todo][0]}", headers=account.headers)
+
+    changes = await count(db, BoardChange, BoardChange.board_id == doomed.id)
+
+    with count_queries() as counter:
+        assert await purge_boards(db) == 1
+    # 7 карточек пачками по 3 (3, 3, 1), две секции, журнал так же пачками, сама доска
+    deletes = [statement.split()[2] for statement in counter.executed if statement.startswith("DELETE")]
+    assert deletes == ["cards"] * 3 + ["sections"] + ["board_changes"] * (changes // 3 + 1) + ["boards"]
+
+    assert await purge_sections(db) == 1
+    assert await purge_cards(db) == 1
+
+    assert await count(db, Board, Board.id == doomed.id) == 0
+    assert await count(db, Section, Section.board_id == doomed.id) == 0
+    assert await count(db, Card, Card.board_id == doomed.id) == 0
+    assert await count(db, BoardChange, BoardChange.board_id == doomed.id) == 0
+    # на живой доске осталось ровно видимое
+    assert await count(db, Section, Section.board_id == kept.id) == 2
+    assert await count(db, Card, Card.board_id == kept.id) == 1
+    board = (await client.get(f"/boards/{kept.id}", headers=account.headers)).json()
+    assert [(section["title"], [card["title"] for card in section["cards"]]) for section in board["sections"]] == [
+        ("Todo", ["b"]), ("Done", []),
+    ]
@@ -0,0 +1,35 @@
+from conftest import make_board
+
+
+async def quickfind(client, account, prefix: str) -> list[tuple[str, str]]:
+    response = await client.get("/quickfind", params={"prefix": prefix}, headers=account.headers)
+    assert response.status_code == 200
+    return [(hit["kind"], hit["title"]) for hit in response.json()]
+
+
+async def test_quickfind_ranks_prefix_matches_first(client, db, account):
+    await make_board(db, account, {"Backlog": ["Fix roadmap", "Roadmap"]}, title="Road trip")
+
+    assert await quickfind(client, account, "road") == [
+        ("board", "Road trip"), ("card", "Roadmap"), ("card", "Fix roadmap"),
+    ]
+
+
+async def test_quickfind_short_prefix_matches_title_start(client, db, account):
+    await make_board(db, account, {"Backlog": ["Roadmap", "Fix roadmap", "R&D"]})
+
+    assert await quickfind(client, account, "ro") == [("card", "Roadmap")]
+    assert await quickfind(client, account, "r") == [("card", "R&D"), ("card", "Roadmap")]
+
+
+async def test_quickfind_sees_card_created_after_cached_query(client, db, account):
+    tree = await make_board(db, account, {"Backlog": ["Roadmap"]})
+    [backlog] = tree.sections
+    assert await quickfind(client, account, "road") == [("card", "Roadmap")]
+
+    response = await client.post("/cards", params={"sectionId": backlog, "title": "Road signs"}, headers=account.headers)
+    assert response.status_code == 200
+
+    # коммит сбросил кэш пользователя — и для того же префикса, и для более длинного
+    assert await quickfind(client, account, "road") == [("card", "Roadmap"), ("card", "Road signs")]
+    assert await quickfind(client, account, "road s") == [("card", "Road signs")]
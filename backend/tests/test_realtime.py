@@ -0,0 +1,145 @@
+import orjson
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+from app.realtime.hub import BoardHub, board_hub
+from conftest import make_account, make_board
+
+
+def drain(subscription) -> list[dict]:
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(orjson.loads(subscription.queue.get_nowait()))
+    return messages
+
+
+async def test_commit_publishes_to_board_subscribers(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    card_id = list(tree.sections.values())[0][0]
+    subscription = board_hub.subscribe(tree.id)
+    try:
+        response = await client.put(f"/cards/{card_id}", json={"title": "b"}, headers=account.headers)
+        assert response.status_code == 200
+
+        [message] = drain(subscription)
+        assert message["entity"] == "card"
+        assert message["op"] == "update"
+        assert message["id"] == card_id
+        assert message["payload"]["title"] == "b"
+    finally:
+        board_hub.unsubscribe(subscription)
+
+
+async def test_rolled_back_batch_publishes_nothing(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    card_id = list(tree.sections.values())[0][0]
+    subscription = board_hub.subscribe(tree.id)
+    try:
+        response = await client.post("/batch", headers=account.headers, json={"operations": [
+            {"op": "update", "entity": "card", "id": card_id, "title": "b"},
+            {"op": "update", "entity": "card", "id": 0, "title": "missing"},
+        ]})
+        assert response.status_code == 200
+        assert response.json()["committed"] is False
+
+        assert drain(subscription) == []
+    finally:
+        board_hub.unsubscribe(subscription)
+
+
+async def test_continue_on_error_batch_publishes_successful_operations(client, db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    [todo] = tree.sections
+    subscription = board_hub.subscribe(tree.id)
+    try:
+        response = await client.post("/batch", headers=account.headers, json={"continueOnError": True, "operations": [
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "a"},
+            {"op": "update", "entity": "card", "id": 0, "title": "missing"},
+            {"op": "create", "entity": "card", "sectionId": todo, "title": "b"},
+        ]})
+        assert [result["ok"] for result in response.json()["results"]] == [True, False, True]
+
+        # откат SAVEPOINT второй операции не теряет событие первой
+        assert [message["payload"]["title"] for message in drain(subscription)] == ["a", "b"]
+    finally:
+        board_hub.unsubscribe(subscription)
+
+
+async def test_continue_on_error_batch_publishes_nothing_if_commit_fails(client, db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    [todo] = tree.sections
+    # отложенный триггер падает на COMMIT, уже после того как все SAVEPOINT отпущены
+    await db.execute(text("""
+        CREATE FUNCTION fail_on_commit() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN RAISE EXCEPTION 'commit failed'; END $$
+    """))
+    await db.execute(text("""
+        CREATE CONSTRAINT TRIGGER fail_on_commit AFTER INSERT ON cards
+        DEFERRABLE INITIALLY DEFERRED FOR EACH ROW
+        WHEN (NEW.title = 'fail on commit') EXECUTE FUNCTION fail_on_commit()
+    """))
+    await db.commit()
+    subscription = board_hub.subscribe(tree.id)
+    try:
+        with pytest.raises(DBAPIError):
+            await client.post("/batch", headers=account.headers, json={"continueOnError": True, "operations": [
+                {"op": "create", "entity": "card", "sectionId": todo, "title": "a"},
+                {"op": "create", "entity": "card", "sectionId": todo, "title": "fail on commit"},
+            ]})
+
+        assert drain(subscription) == []
+    finally:
+        board_hub.unsubscribe(subscription)
+        await db.execute(text("DROP TRIGGER fail_on_commit ON cards"))
+        await db.execute(text("DROP FUNCTION fail_on_commit()"))
+        await db.commit()
+
+
+def test_hub_drops_only_the_slow_subscriber():
+    hub = BoardHub(queue_size=3)
+    slow = hub.subscribe(1)
+    fast = hub.subscribe(1)
+    other_board = hub.subscribe(2)
+
+    received = []
+    for n in range(4):
+        hub.publish(1, {"n": n})
+        # быстрый разбирает очередь после каждого события, медленный — никогда
+        received += drain(fast)
+
+    assert [message["n"] for message in received] == [0, 1, 2, 3]
+    assert slow.dropped and not fast.dropped
+    # накопленное выброшено, в очереди только сигнал отключения
+    assert slow.queue.get_nowait() is None and slow.queue.empty()
+    assert other_board.queue.empty()
+    assert hub.stats() == {"boards": 2, "subscribers": 2, "published": 4, "dropped": 1}
+
+
+async def test_slow_socket_is_closed_with_1013(live_server, db, account, monkeypatch):
+    tree = await make_board(db, account, {"Todo": []})
+    monkeypatch.setattr(board_hub, "queue_size", 2)
+
+    async with connect(f"{live_server}/ws/boards/{tree.id}?token={account.token}") as websocket:
+        assert orjson.loads(await websocket.recv())["type"] == "hello"
+        # три события подряд без await: отправитель не успевает забрать ни одного
+        for n in range(3):
+            board_hub.publish(tree.id, {"n": n})
+
+        with pytest.raises(ConnectionClosed) as closed:
+            await websocket.recv()
+        assert closed.value.rcvd.code == 1013
+    assert board_hub.stats()["subscribers"] == 0
+
+
+async def test_foreign_board_socket_is_rejected(live_server, db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    stranger = await make_account(db)
+
+    # закрытие до accept — отказ в рукопожатии
+    with pytest.raises(InvalidStatus) as rejected:
+        async with connect(f"{live_server}/ws/boards/{tree.id}?token={stranger.token}"):
+            pass
+    assert rejected.value.response.status_code == 403
@@ -0,0 +1,128 @@
+import time
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+
+from app.core.db import DataBaseHelper, ReadSession, WriteMarker, request_user_id, request_write_marker
+from app.middleware.read_your_writes import READ_PRIMARY_COOKIE, ReadYourWritesMiddleware
+from conftest import TEST_DATABASE_URL
+
+
+def make_helper(replicas: int) -> DataBaseHelper:
+    """Движки на несуществующие хосты: выбор движка не открывает соединений."""
+    return DataBaseHelper(
+        url="postgresql+asyncpg://app@primary/app",
+        replica_urls=[f"postgresql+asyncpg://app@replica{number}/app" for number in range(replicas)],
+        read_your_writes_seconds=5.0,
+    )
+
+
+@pytest.fixture
+def marker():
+    marker = WriteMarker()
+    token = request_write_marker.set(marker)
+    yield marker
+    request_write_marker.reset(token)
+
+
+def test_reads_round_robin_over_replicas():
+    helper = make_helper(2)
+    replica0, replica1 = helper.replica_engines
+
+    assert [helper.read_engine(1) for _ in range(4)] == [replica0, replica1, replica0, replica1]
+    assert helper.stats()["reads"] == {"primary": 0, "replica": 4}
+
+
+def test_recent_writer_reads_primary_until_deadline(monkeypatch):
+    helper = make_helper(1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    helper.note_write(1)
+    assert helper.read_engine(1) is helper.engine
+    # память воркера — про конкретного пользователя
+    assert helper.read_engine(2) is helper.replica_engines[0]
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 5.1)
+    assert helper.read_engine(1) is helper.replica_engines[0]
+
+
+def test_cookie_deadline_pins_primary(marker):
+    helper = make_helper(1)
+
+    marker.read_primary_until = time.time() + 1
+    assert helper.read_engine(None) is helper.engine
+
+    marker.read_primary_until = time.time() - 1
+    assert helper.read_engine(None) is helper.replica_engines[0]
+
+
+def test_without_replicas_everything_reads_primary(marker):
+    helper = make_helper(0)
+
+    assert helper.read_engine(1) is helper.engine
+    assert helper.read_engine(None) is helper.engine
+    assert helper.stats()["reads"] == {"primary": 2, "replica": 0}
+
+
+def test_read_session_picks_engine_once_with_request_user():
+    helper = make_helper(2)
+    helper.note_write(1)
+    session = ReadSession(info={"db_helper": helper})
+
+    token = request_user_id.set(1)
+    try:
+        first = session.get_bind()
+    finally:
+        request_user_id.reset(token)
+    # пользователя в контексте уже нет, но движок выбран и не меняется
+    assert first is helper.engine.sync_engine
+    assert session.get_bind() is first
+    assert helper.stats()["reads"] == {"primary": 1, "replica": 0}
+
+
+def make_instance() -> tuple[FastAPI, DataBaseHelper]:
+    """
+    Отдельный «воркер»: свой DataBaseHelper (реплика — та же тестовая база)
+    и своя память о записях. Общего с другим экземпляром — только cookie клиента.
+    """
+    helper = DataBaseHelper(url=TEST_DATABASE_URL, replica_urls=[TEST_DATABASE_URL])
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    def as_user():
+        request_user_id.set(1)
+
+    @app.post("/write", dependencies=[Depends(as_user)])
+    async def write(session=Depends(helper.session_getter)):
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+
+    @app.get("/read", dependencies=[Depends(as_user)])
+    async def read(session=Depends(helper.read_session_getter)):
+        await session.execute(text("SELECT 1"))
+        return {"primary": session.sync_session.info["engine"] is helper.engine}
+
+    return app, helper
+
+
+async def test_cookie_pins_reads_on_another_instance(database):
+    (writer, writer_helper), (reader, reader_helper) = make_instance(), make_instance()
+    try:
+        # оба экземпляра за одним адресом, как воркеры за балансировщиком
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=writer), base_url="http://test") as client_a:
+            response = await client_a.post("/write")
+            assert READ_PRIMARY_COOKIE in response.cookies
+            cookies = client_a.cookies
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=reader), base_url="http://test") as client_b:
+            # второй экземпляр о записи не знает: без cookie — реплика, с cookie — primary
+            assert (await client_b.get("/read")).json() == {"primary": False}
+            client_b.cookies = cookies
+            assert (await client_b.get("/read")).json() == {"primary": True}
+        assert reader_helper.stats()["recent_writers"] == 0
+    finally:
+        await writer_helper.dispose()
+        await reader_helper.dispose()
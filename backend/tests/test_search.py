@@ -0,0 +1,43 @@
+from conftest import make_account, make_board
+
+
+async def test_search_pages_through_all_hits_by_cursor(client, db, account):
+    await make_board(db, account, {"Todo": [f"alpha task {n}" for n in range(5)] + ["beta"]})
+
+    seen, cursor = [], None
+    for _ in range(10):
+        params = {"q": "alpha", "limit": 2, **({"after": cursor} if cursor else {})}
+        response = await client.get("/search", params=params, headers=account.headers)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert len({hit["id"] for hit in seen}) == 5
+    assert [hit["rank"] for hit in seen] == sorted((hit["rank"] for hit in seen), reverse=True)
+
+
+async def test_search_snippet_is_escaped_and_highlighted(client, db, account):
+    # теги ts_headline выбрасывает сам, а остальная разметка должна прийти экранированной
+    await make_board(db, account, {"Todo": ['gamma "launch" 1<2 & more']})
+
+    [hit] = (await client.get("/search", params={"q": "gamma"}, headers=account.headers)).json()
+
+    assert "<mark>gamma</mark>" in hit["snippet"]
+    assert "&quot;launch&quot; 1&lt;2 &amp; more" in hit["snippet"]
+
+
+async def test_search_is_scoped_to_user(client, db, account):
+    await make_board(db, await make_account(db), {"Todo": ["delta secret"]})
+
+    response = await client.get("/search", params={"q": "delta"}, headers=account.headers)
+
+    assert response.json() == []
+
+
+async def test_search_rejects_malformed_cursor(client, account):
+    response = await client.get("/search", params={"q": "alpha", "after": "nope"}, headers=account.headers)
+
+    assert response.status_code == 422
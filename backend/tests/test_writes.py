@@ -0,0 +1,170 @@
+import re
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.core.statement_budget import count_queries
+from app.crud.board import delete_board, update_board
+from app.crud.card import create_card, delete_card, move_card, update_card
+from app.crud.section import delete_section, move_section, update_section
+from app.domain import Board, Card
+from app.domain.schemas import BoardUpdate, CardCreate, CardUpdate
+from conftest import make_account, make_board
+
+STATEMENT = re.compile(r"(SELECT|INSERT INTO|UPDATE|DELETE FROM)\s+(\w+)?")
+
+# каждая запись доски — ещё и версия доски плюс строка журнала изменений
+CHANGE_LOG = ["UPDATE boards", "INSERT INTO board_changes"]
+
+
+def kinds(counter) -> list[str]:
+    """«UPDATE cards», «INSERT INTO board_changes», у SELECT — просто «SELECT»."""
+    result = []
+    for statement in counter.executed:
+        verb, table = STATEMENT.match(statement.lstrip()).groups()
+        result.append(verb if verb == "SELECT" else f"{verb} {table}")
+    return result
+
+
+async def test_card_writes_are_one_statement(db, account):
+    tree = await make_board(db, account, {"Todo": ["a", "b"], "Done": []})
+    todo, done = tree.sections
+    a, b = tree.sections[todo]
+
+    with count_queries() as updated:
+        card = await update_card(db, a, CardUpdate(title="renamed"), account.id)
+    assert (card.title, card.section_id, card.board_id) == ("renamed", todo, tree.id)
+    assert kinds(updated) == ["UPDATE cards", *CHANGE_LOG]
+
+    with count_queries() as moved:
+        card = await move_card(db, b, done, 0, account.id)
+    assert card.section_id == done
+    # соседи для ключа читаются заранее, сама запись — один UPDATE
+    assert kinds(moved) == ["SELECT", "UPDATE cards", *CHANGE_LOG]
+
+    with count_queries() as created:
+        card = await create_card(db, done, CardCreate(title="c"), account.id)
+    assert kinds(created) == ["SELECT", "INSERT INTO cards", *CHANGE_LOG]
+
+    with count_queries() as deleted:
+        await delete_card(db, card.id, account.id)
+    assert kinds(deleted) == ["UPDATE cards", *CHANGE_LOG]
+
+
+async def test_section_and_board_writes_are_one_statement(db, account):
+    tree = await make_board(db, account, {"Todo": ["a"], "Done": []})
+    todo, done = tree.sections
+
+    with count_queries() as updated:
+        section = await update_section(db, todo, "renamed", account.id)
+    assert (section.title, [card["title"] for card in section.cards]) == ("renamed", ["a"])
+    assert kinds(updated) == ["UPDATE sections", *CHANGE_LOG]
+
+    with count_queries() as moved:
+        await move_section(db, done, 0, account.id)
+    assert kinds(moved) == ["SELECT", "UPDATE sections", *CHANGE_LOG]
+
+    with count_queries() as deleted:
+        await delete_section(db, done, account.id)
+    assert kinds(deleted) == ["UPDATE sections", *CHANGE_LOG]
+
+    with count_queries() as renamed:
+        board = await update_board(db, tree.id, BoardUpdate(title="renamed"), account.id)
+    assert board.title == "renamed"
+    assert kinds(renamed) == ["UPDATE boards", *CHANGE_LOG]
+
+    with count_queries() as removed:
+        await delete_board(db, tree.id, account.id)
+    assert kinds(removed) == ["UPDATE boards", *CHANGE_LOG]
+
+
+@pytest.mark.parametrize("write", [
+    lambda db, card_id, customer_id: update_card(db, card_id, CardUpdate(title="x"), customer_id),
+    lambda db, card_id, customer_id: delete_card(db, card_id, customer_id),
+    lambda db, card_id, customer_id: move_card(db, card_id, 0, 0, customer_id),
+])
+async def test_card_write_miss_tells_404_from_403(db, account, write):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [a] = tree.sections[todo]
+    stranger = await make_account(db)
+
+    async def status_of(card_id: int, customer_id: int) -> tuple[int, list[str]]:
+        with count_queries() as counter:
+            with pytest.raises(HTTPException) as miss:
+                await write(db, card_id, customer_id)
+        await db.rollback()
+        return miss.value.status_code, kinds(counter)
+
+    # пустой UPDATE, затем один SELECT, чтобы различить ответы; журнал не пишется
+    status, statements = await status_of(0, account.id)
+    assert status == 404 and "UPDATE boards" not in statements and statements[-1] == "SELECT"
+    status, statements = await status_of(a, stranger.id)
+    assert status == 403 and "UPDATE boards" not in statements and statements[-1] == "SELECT"
+
+    # карточка под мягко удалённой секцией для записи не существует
+    await delete_section(db, todo, account.id)
+    assert (await status_of(a, account.id))[0] == 404
+
+
+async def test_section_write_miss_tells_404_from_403(db, account):
+    tree = await make_board(db, account, {"Todo": []})
+    [todo] = tree.sections
+    stranger = await make_account(db)
+
+    for section_id, customer_id, status in ((0, account.id, 404), (todo, stranger.id, 403)):
+        with count_queries() as counter:
+            with pytest.raises(HTTPException) as miss:
+                await update_section(db, section_id, "x", customer_id)
+        await db.rollback()
+        assert miss.value.status_code == status
+        assert kinds(counter) == ["UPDATE sections", "SELECT"]
+
+
+async def test_foreign_card_and_unknown_card_over_http(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [a] = tree.sections[next(iter(tree.sections))]
+    stranger = await make_account(db)
+
+    foreign = await client.put(f"/cards/{a}", json={"title": "x"}, headers=stranger.headers)
+    unknown = await client.put("/cards/0", json={"title": "x"}, headers=stranger.headers)
+
+    assert (foreign.status_code, unknown.status_code) == (403, 404)
+    board = (await client.get(f"/boards/{tree.id}", headers=account.headers)).json()
+    assert board["sections"][0]["cards"][0]["title"] == "a"
+
+
+async def test_card_with_board_id_of_foreign_board_is_not_found(client, db, account):
+    tree = await make_board(db, account, {"Todo": ["a"]})
+    [todo] = tree.sections
+    [a] = tree.sections[todo]
+    stranger = await make_account(db)
+    other = await make_board(db, stranger, {"Mine": []})
+    [mine] = other.sections
+    # денормализованный board_id указывает на доску чужого пользователя, секция — на доску владельца
+    await db.execute(update(Card).where(Card.id == a).values(board_id=other.id))
+    await db.commit()
+    versions = {board_id: await version_of(db, board_id) for board_id in (tree.id, other.id)}
+
+    for user in (stranger, account):
+        responses = [
+            await client.put(f"/cards/{a}", json={"title": "x"}, headers=user.headers),
+            await client.delete(f"/cards/{a}", headers=user.headers),
+            await client.put(f"/cards/{a}/move", params={"sectionId": todo, "position": 0}, headers=user.headers),
+            await client.put(f"/cards/{a}/move", params={"sectionId": mine, "position": 0}, headers=user.headers),
+        ]
+        batch = await client.post("/batch", json={"operations": [
+            {"op": "update", "entity": "card", "id": a, "title": "x"},
+        ]}, headers=user.headers)
+        assert [response.status_code for response in responses] == [404] * 4, user.username
+        assert batch.json()["results"][0]["status"] == 404
+
+    card = (await db.execute(select(Card.title, Card.section_id, Card.deleted_at).where(Card.id == a))).one()
+    assert tuple(card) == ("a", todo, None)
+    assert {board_id: await version_of(db, board_id) for board_id in versions} == versions
+
+
+async def version_of(db, board_id: int) -> int:
+    db.expire_all()
+    return (await db.get(Board, board_id)).version